@@ -2,24 +2,58 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
-db = SQLAlchemy()
+from app.database import RoutingSession, configure_engines, configure_sites, database_config
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     app.config['SECRET_KEY'] = 'your-secret-key'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///education.db'
+    app.config.update(database_config())
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config or {})
+    configure_sites(app)
 
     db.init_app(app)
+    configure_engines(app, db)
     login_manager.init_app(app)
     @login_manager.user_loader
     def load_user(user_id):
-        from app.models import User
-        return User.query.get(int(user_id))
+        from app.identity import load_identity
+        from app.sites import parse_login_id
+        user_id = parse_login_id(user_id)
+        return load_identity(user_id) if user_id is not None else None
+
+    from app.sites import init_sites
+    init_sites(app)
     
 
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from app.exports import bp as exports_bp
+    app.register_blueprint(exports_bp)
+
+    from app.api import bp as api_bp
+    app.register_blueprint(api_bp)
+
+    from app.events import bp as events_bp
+    app.register_blueprint(events_bp)
+
+    from app.site_report import bp as site_report_bp
+    app.register_blueprint(site_report_bp)
+
+    from app.assets import init_assets
+    init_assets(app)
+
+    from app.metrics import init_metrics
+    init_metrics(app, db)
+
+    from app.nplusone import init_nplusone
+    init_nplusone(app, db)
+
+    from app.cli import register_commands
+    register_commands(app)
+
     return app
\ No newline at end of file
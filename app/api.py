@@ -0,0 +1,227 @@
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Blueprint, abort, current_app, jsonify, request
+from flask_login import current_user
+from sqlalchemy import and_, func, select
+from werkzeug.exceptions import HTTPException
+
+from app import db
+from app.caching import current_version, make_etag, not_modified, with_etag
+from app.daily_points import WINDOWS, get_window_leaderboard, window_start
+from app.database import read_only
+from app.exports import json_value
+from app.leaderboard import get_leaderboard
+from app.models import Group, Transaction, User, WeeklyPerformance
+from app.pagination import decode_cursor, keyset_select
+
+# Версионированный API только для чтения: табло, дашборды, киоск.
+# Все выборки — Core select, строки отдаются кортежами и сразу превращаются в JSON,
+# ORM-объекты не создаются, поэтому память на запрос не зависит от размера страницы
+# сверх самих строк. ?fields=a,b — проекция полей, ?limit= — размер страницы,
+# ?after=/?before= — курсоры из предыдущего ответа.
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+DEFAULT_LIMIT = 50
+
+users = User.__table__
+transactions = Transaction.__table__
+weekly = WeeklyPerformance.__table__
+groups = Group.__table__
+
+LEADERBOARD_FIELDS = ('rank', 'id', 'full_name', 'group_id', 'points')
+
+LEDGER_FIELDS = {
+    'id': transactions.c.id,
+    'created_at': transactions.c.created_at,
+    'points': transactions.c.points,
+    'transaction_type': transactions.c.transaction_type,
+    'reason': transactions.c.reason,
+    'comment': transactions.c.comment,
+    'awarded_by_id': transactions.c.awarded_by_id,
+}
+
+# Ученики без записи за неделю попадают в сетку с нулями; API записи не создаёт
+WEEK_FIELDS = {
+    'user_id': users.c.id,
+    'full_name': users.c.full_name,
+    'group_id': users.c.group_id,
+    'points': func.coalesce(weekly.c.points, 0),
+    'academic_performance': func.coalesce(weekly.c.academic_performance, 0),
+    'mentoring': func.coalesce(weekly.c.mentoring, 0),
+    'teamwork': func.coalesce(weekly.c.teamwork, 0),
+    'discipline': func.coalesce(weekly.c.discipline, 0),
+}
+
+ROSTER_FIELDS = {
+    'id': users.c.id,
+    'username': users.c.username,
+    'full_name': users.c.full_name,
+    'points': users.c.points,
+    'is_confirmed': users.c.is_confirmed,
+}
+
+
+@bp.errorhandler(HTTPException)
+def _http_error(error):
+    return jsonify({'error': error.description}), error.code
+
+
+def _roles(*roles):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_user.is_authenticated:
+                abort(401, 'Требуется вход')
+            if roles and current_user.role not in roles:
+                abort(403, 'Недостаточно прав')
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _fields(available):
+    raw = request.args.get('fields')
+    if not raw:
+        return list(available)
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        abort(400, f'Неизвестные поля: {", ".join(unknown)}; доступны: {", ".join(available)}')
+    return names
+
+
+def _limit():
+    limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+    return max(1, min(limit, current_app.config.get('API_MAX_PAGE_SIZE', 1000)))
+
+
+def _rows(names, rows):
+    width = len(names)
+    return [dict(zip(names, map(json_value, row[:width]))) for row in rows]
+
+
+# Страница выборки stmt с колонками полей names в порядке ordering
+def _page(names, columns, stmt, ordering):
+    page = keyset_select(
+        stmt.with_only_columns(*(columns[name] for name in names)),
+        ordering,
+        _limit(),
+        after=request.args.get('after'),
+        before=request.args.get('before')
+    )
+    return {'items': _rows(names, page.items), 'next': page.next_cursor, 'prev': page.prev_cursor}
+
+
+@bp.route('/leaderboard')
+@read_only
+def leaderboard():
+    names = _fields(LEADERBOARD_FIELDS)
+    group_id = request.args.get('group_id', type=int)
+    window = request.args.get('window', 'all')
+    if window not in WINDOWS:
+        abort(400, f'Период: {", ".join(WINDOWS)}')
+    board = get_leaderboard() if window == 'all' else get_window_leaderboard(window)
+    etag = make_etag('api.leaderboard', board.version, window_start(window), request.full_path)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
+    _, entries, total, next_cursor, prev_cursor = board.window(
+        _limit(),
+        group_id,
+        after=decode_cursor(request.args.get('after'), [int, int]),
+        before=decode_cursor(request.args.get('before'), [int, int])
+    )
+    profiles = {}
+    if entries and set(names) & {'full_name', 'group_id'}:
+        profiles = {
+            row.id: row
+            for row in db.session.execute(
+                select(users.c.id, users.c.full_name, users.c.group_id)
+                .where(users.c.id.in_([user_id for _, user_id, _ in entries]))
+            )
+        }
+
+    items = []
+    for rank, user_id, points in entries:
+        profile = profiles.get(user_id)
+        values = {
+            'rank': rank,
+            'id': user_id,
+            'points': points,
+            'full_name': profile and profile.full_name,
+            'group_id': profile and profile.group_id,
+        }
+        items.append({name: values[name] for name in names})
+    return with_etag(jsonify({'items': items, 'next': next_cursor, 'prev': prev_cursor, 'total': total}), etag)
+
+
+@bp.route('/users/<int:user_id>/transactions')
+@_roles()
+@read_only
+def ledger(user_id):
+    if current_user.role not in ('teacher', 'admin') and current_user.id != user_id:
+        abort(403, 'Недостаточно прав')
+    names = _fields(LEDGER_FIELDS)
+    etag = make_etag('api.ledger', current_version('transactions'), current_user.get_id(), request.full_path)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
+    stmt = select(transactions.c.id).where(transactions.c.user_id == user_id)
+    body = _page(names, LEDGER_FIELDS, stmt,
+                 [(transactions.c.created_at, True), (transactions.c.id, True)])
+    return with_etag(jsonify(body), etag)
+
+
+@bp.route('/weeks/<week>')
+@_roles('teacher', 'admin')
+@read_only
+def week_grid(week):
+    try:
+        day = datetime.strptime(week, '%Y-%m-%d').date()
+    except ValueError:
+        abort(400, 'Дата недели в формате ГГГГ-ММ-ДД')
+    week_start = day - timedelta(days=day.weekday())
+    names = _fields(WEEK_FIELDS)
+
+    stmt = (
+        select(users.c.id)
+        .select_from(users)
+        .outerjoin(weekly, and_(weekly.c.user_id == users.c.id, weekly.c.week_start == week_start))
+        .where(users.c.role == 'student')
+    )
+    group_id = request.args.get('group_id', type=int)
+    if group_id:
+        stmt = stmt.where(users.c.group_id == group_id)
+
+    body = _page(names, WEEK_FIELDS, stmt, [(users.c.id, False)])
+    body['week_start'] = week_start.isoformat()
+    return jsonify(body)
+
+
+@bp.route('/groups')
+@_roles('teacher', 'admin')
+@read_only
+def group_list():
+    size = (
+        select(func.count(users.c.id))
+        .where(users.c.group_id == groups.c.id, users.c.role == 'student')
+        .correlate(groups)
+        .scalar_subquery()
+    )
+    rows = db.session.execute(select(groups.c.id, groups.c.name, size).order_by(groups.c.name)).all()
+    return jsonify({'items': _rows(['id', 'name', 'size'], rows)})
+
+
+@bp.route('/groups/<int:group_id>/roster')
+@_roles('teacher', 'admin')
+@read_only
+def roster(group_id):
+    names = _fields(ROSTER_FIELDS)
+    if db.session.execute(select(groups.c.id).where(groups.c.id == group_id)).first() is None:
+        abort(404, 'Группа не найдена')
+    stmt = select(users.c.id).where(users.c.group_id == group_id, users.c.role == 'student')
+    return jsonify(_page(names, ROSTER_FIELDS, stmt, [(users.c.id, False)]))
@@ -0,0 +1,219 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import urllib.request
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него собираются только .gz
+    brotli = None
+
+# Статика без сторонних CDN. `flask build-assets`:
+#   1. скачивает Bootstrap и шрифты в app/static/vendor (один раз, при сборке);
+#   2. копирует всю статику в app/static/dist с хэшем содержимого в имени,
+#      в CSS ссылки url(...) заменяются на хэшированные имена;
+#   3. рядом кладёт сжатые варианты .gz и .br;
+#   4. пишет dist/manifest.json: логическое имя -> хэшированное.
+# url_for('static', filename='style.css') по манифесту отдаёт хэшированное имя,
+# а такие файлы раздаются с Cache-Control: immutable на год, поэтому при
+# повторных визитах браузер не запрашивает статику вообще.
+# Пока сборки не было, шаблоны берут файлы с CDN (asset_url).
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+BOOTSTRAP = 'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist'
+FONTS_CSS = 'https://fonts.googleapis.com/css2?family=Montserrat:wght@400;700&family=Open+Sans&display=swap'
+
+# Файл в static -> адрес, откуда он скачивается и где его берут без сборки
+VENDOR = {
+    'vendor/bootstrap.min.css': f'{BOOTSTRAP}/css/bootstrap.min.css',
+    'vendor/bootstrap.bundle.min.js': f'{BOOTSTRAP}/js/bootstrap.bundle.min.js',
+    'vendor/fonts.css': FONTS_CSS,
+}
+
+# Google Fonts отдаёт woff2 только современным браузерам
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_SOURCE_MAP = re.compile(rb'/[*/]# sourceMappingURL=[^\n]*')
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+
+
+def _download(url):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+# Скачивает недостающие файлы VENDOR; шрифты из CSS Google Fonts кладутся
+# в vendor/fonts/, а ссылки на них в CSS становятся относительными.
+# Возвращает [(имя, ошибка)] для файлов, которые скачать не удалось.
+def vendor(static_folder, refresh=False):
+    failed = []
+    for name, url in VENDOR.items():
+        path = os.path.join(static_folder, name)
+        if os.path.exists(path) and not refresh:
+            continue
+        try:
+            data = _SOURCE_MAP.sub(b'', _download(url))
+            if name == 'vendor/fonts.css':
+                data = _vendor_fonts(static_folder, data.decode('utf-8')).encode('utf-8')
+        except OSError as exc:
+            failed.append((name, str(exc)))
+            continue
+        _write(path, data)
+    return failed
+
+
+def _vendor_fonts(static_folder, css):
+    def replace(match):
+        url = match.group(2)
+        if not url.startswith('http'):
+            return match.group(0)
+        name = posixpath.basename(url.split('?')[0])
+        _write(os.path.join(static_folder, 'vendor', 'fonts', name), _download(url))
+        return f'url(fonts/{name})'
+    return _URL.sub(replace, css)
+
+
+def _source_files(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        relative_root = os.path.relpath(root, static_folder).replace(os.sep, '/')
+        if relative_root == DIST or relative_root.startswith(DIST + '/'):
+            dirs[:] = []
+            continue
+        for file_name in sorted(files):
+            yield posixpath.normpath(posixpath.join(relative_root, file_name))
+
+
+def _hashed_name(name, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    base, ext = posixpath.splitext(name)
+    return f'{DIST}/{base}.{digest}{ext}'
+
+
+def _rewrite_css(name, hashed, css, manifest):
+    def replace(match):
+        ref = match.group(2)
+        if ref.startswith(('data:', 'http:', 'https:', '//', '#')):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(name), ref.split('?')[0]))
+        if target not in manifest:
+            return match.group(0)
+        return f'url({posixpath.relpath(manifest[target], posixpath.dirname(hashed))})'
+    return _URL.sub(replace, css)
+
+
+def _compress(path, data):
+    _write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(path + '.br', brotli.compress(data, quality=11))
+
+
+# Хэширует и сжимает всю статику. Старые хэшированные файлы не удаляются,
+# чтобы страницы, отданные до выкладки, могли дочитать свои ресурсы.
+def build(static_folder):
+    manifest = {}
+    names = list(_source_files(static_folder))
+    # CSS в конце: к этому моменту известны хэшированные имена шрифтов и картинок
+    for name in sorted(names, key=lambda name: (name.endswith('.css'), name)):
+        with open(os.path.join(static_folder, name), 'rb') as file:
+            data = file.read()
+        if name.endswith('.css'):
+            hashed = _hashed_name(name, data)
+            data = _rewrite_css(name, hashed, data.decode('utf-8'), manifest).encode('utf-8')
+        hashed = _hashed_name(name, data)
+        path = os.path.join(static_folder, hashed)
+        _write(path, data)
+        if name.endswith(COMPRESSIBLE):
+            _compress(path, data)
+        manifest[name] = hashed
+
+    _write(os.path.join(static_folder, DIST, MANIFEST),
+           json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def _load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST), encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+# Хэшированный файл со сжатием по Accept-Encoding и кэшированием на год
+def _serve_static(filename):
+    state = current_app.extensions['assets']
+    if filename not in state['hashed']:
+        return current_app.send_static_file(filename)
+
+    path = filename
+    encoding = None
+    accepted = request.accept_encodings
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        # gzip;q=0 — явный отказ от кодировки, а не согласие
+        if accepted.quality(candidate) > 0 and filename + suffix in state['compressed']:
+            path, encoding = filename + suffix, candidate
+            break
+    response = send_from_directory(
+        current_app.static_folder, path,
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        download_name=posixpath.basename(filename),
+        max_age=IMMUTABLE_MAX_AGE
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    manifest = _load_manifest(app.static_folder)
+    hashed = set(manifest.values())
+    compressed = {
+        name + suffix
+        for name in hashed
+        for suffix in ('.gz', '.br')
+        if os.path.exists(os.path.join(app.static_folder, name + suffix))
+    }
+    available = set(manifest) | {
+        name for name in VENDOR if os.path.exists(os.path.join(app.static_folder, name))
+    }
+    app.extensions['assets'] = {
+        'manifest': manifest,
+        'hashed': hashed,
+        'compressed': compressed,
+        'available': available,
+    }
+
+    @app.url_defaults
+    def _hashed_static(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    app.view_functions['static'] = _serve_static
+
+    # Свой файл, если он собран или скачан, иначе исходный адрес на CDN
+    @app.template_global()
+    def asset_url(filename):
+        if filename in available:
+            return url_for('static', filename=filename)
+        return VENDOR[filename]
@@ -1,11 +1,11 @@
 from flask import session, redirect, url_for, g
 from functools import wraps
-from app.models import User
+from app.identity import load_identity
 
 def get_current_user():
     user_id = session.get('user_id')
     if user_id:
-        return User.query.get(user_id)
+        return load_identity(int(user_id))
     return None
 
 def login_required(f):
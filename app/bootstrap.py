@@ -0,0 +1,126 @@
+import os
+import random
+import secrets
+
+from flask import current_app
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app import db
+from app.caching import bump
+from app.database import DEFAULT_SITE, current_site, site_engine
+from app.migrations import MIGRATIONS, upgrade
+from app.models import Group, SchemaVersion, SeedVersion, User
+from app.passwords import hash_password, hash_passwords
+
+# Запуск приложения: одна проверка версий схемы и начальных данных. Если база
+# актуальна, больше ничего не делается — ни create_all, ни поиска админа, ни
+# хеширования паролей. Начальные данные версионируются как миграции: каждая
+# версия применяется один раз и в одной транзакции вместе с записью в seed_version.
+# Демо-ученики создаются только явной командой `flask seed-demo`.
+
+DEFAULT_GROUP = 'Default Group'
+
+
+# Пароль первого администратора площадки: SITES[site]['admin_password'], для площадки
+# по умолчанию — ADMIN_PASSWORD (конфигурация или окружение). Если он не задан,
+# у каждой площадки свой случайный пароль: он один раз печатается в stdout (как
+# отчёт о миграциях в app.py) и не попадает в журнал, который уходит в сбор логов.
+def _admin_password(site):
+    if site == DEFAULT_SITE:
+        password = current_app.config.get('ADMIN_PASSWORD') or os.environ.get('ADMIN_PASSWORD')
+    else:
+        password = current_app.config['SITES'][site].get('admin_password')
+    return password, password is None
+
+
+def _base_seed(conn):
+    if conn.execute(select(User.id).where(User.username == 'admin').limit(1)).first() is None:
+        site = current_site()
+        password, generated = _admin_password(site)
+        if generated:
+            password = secrets.token_urlsafe(12)
+            print(f'[{site}] Created user admin with password {password}', flush=True)
+            current_app.logger.warning('site %s: created user admin with a generated password '
+                                       '(printed to stdout)', site)
+        conn.execute(insert(User).values(
+            username='admin', full_name='Administrator', email='admin@example.com',
+            password_hash=hash_password(password), role='admin', points=0, is_confirmed=True
+        ))
+    if conn.execute(select(Group.id).where(Group.name == DEFAULT_GROUP)).first() is None:
+        conn.execute(insert(Group).values(name=DEFAULT_GROUP))
+
+
+SEEDS = [
+    (1, 'admin and default group', _base_seed),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+SEED_VERSION = SEEDS[-1][0]
+
+
+# Версии схемы и данных одним запросом; (0, 0), если таблиц ещё нет
+def versions():
+    try:
+        with site_engine(db).connect() as conn:
+            schema, seed = conn.execute(select(
+                select(func.max(SchemaVersion.version)).scalar_subquery(),
+                select(func.max(SeedVersion.version)).scalar_subquery(),
+            )).one()
+    except (OperationalError, ProgrammingError):
+        return 0, 0
+    return schema or 0, seed or 0
+
+
+def seed():
+    version = db.session.query(func.max(SeedVersion.version)).scalar() or 0
+    db.session.commit()
+
+    applied = []
+    for number, name, apply in SEEDS:
+        if number <= version:
+            continue
+        with site_engine(db).begin() as conn:
+            apply(conn)
+            conn.execute(SeedVersion.__table__.insert().values(version=number, name=name))
+        applied.append((number, name))
+    return applied
+
+
+# Возвращает применённые миграции и версии данных
+def bootstrap():
+    if versions() == (SCHEMA_VERSION, SEED_VERSION):
+        return [], []
+    return upgrade(), seed()
+
+
+# Демо-ученики student1..studentN (пароль совпадает с логином) в группе по умолчанию.
+# Уже существующие пропускаются, новые вставляются одной транзакцией.
+def seed_demo(students=10, rng=None):
+    rng = rng or random.Random()
+    bootstrap()
+    group_id = db.session.execute(select(Group.id).where(Group.name == DEFAULT_GROUP)).scalar_one()
+    emails = {i: f'student{i}@example.com' for i in range(1, students + 1)}
+    existing = set(db.session.execute(select(User.email).where(User.email.in_(emails.values()))).scalars())
+    missing = [i for i in emails if emails[i] not in existing]
+    if not missing:
+        return 0
+
+    hashes = hash_passwords([f'student{i}' for i in missing])
+    db.session.execute(insert(User), [
+        dict(
+            username=f'student{i}',
+            full_name=f'Student {i}',
+            email=emails[i],
+            password_hash=password_hash,
+            role='student',
+            group_id=group_id,
+            points=rng.randint(0, 100),
+            is_confirmed=True
+        )
+        for i, password_hash in zip(missing, hashes)
+    ])
+    # Вставка мимо ORM: новая версия 'points' заставит индекс рейтинга пересобраться
+    bump(db.session, 'points')
+    db.session.commit()
+    return len(missing)
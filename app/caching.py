@@ -0,0 +1,219 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context, request, session as flask_session
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models import DataVersion, Transaction
+from app.sites import site_state
+
+# Версии наборов данных и кэш отрендеренных фрагментов.
+# Любое изменение очков или журнала увеличивает счётчик в data_versions в той же
+# транзакции. Процесс держит последние известные значения в памяти и перечитывает
+# их из БД не чаще раза в DATA_VERSION_TTL секунд, так что серия обновлений
+# страницы рейтинга не делает запросов: ETag совпал — 304, иначе фрагмент из кэша.
+
+
+class VersionClock:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.values = {}
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        now = time.monotonic()
+        with self.lock:
+            fresh = self.checked_at is not None and now - self.checked_at < self.ttl
+        if not fresh:
+            rows = db.session.execute(select(DataVersion.name, DataVersion.version)).all()
+            with self.lock:
+                for row_name, version in rows:
+                    self.values[row_name] = max(version, self.values.get(row_name, 0))
+                self.checked_at = now
+        with self.lock:
+            return self.values.get(name, 0)
+
+    def observe(self, name, version):
+        with self.lock:
+            self.values[name] = max(version, self.values.get(name, 0))
+
+    # Следующий get() перечитает версии из БД
+    def expire(self):
+        with self.lock:
+            self.checked_at = None
+
+
+def get_clock():
+    return site_state('data_versions', lambda: VersionClock(
+        ttl=current_app.config.get('DATA_VERSION_TTL', 1)
+    ))
+
+
+def current_version(name):
+    return get_clock().get(name)
+
+
+# Наборы, изменённые в сессии, увеличиваются перед коммитом одним UPDATE на набор.
+# Цена: строка набора в data_versions блокируется до конца транзакции, поэтому на
+# Postgres пишущие транзакции одного набора (например, все начисления — 'points')
+# коммитятся по очереди. Блокировка берётся в before_commit после flush, так что
+# держится она только на время самого COMMIT, а не всего запроса; транзакции
+# разных наборов друг другу не мешают. Увеличивать версию после коммита отдельной
+# транзакцией нельзя: между двумя коммитами (или при падении процесса) страницы
+# отдавали бы по старому ETag и из кэша фрагментов уже изменённые данные.
+def bump(session, *names):
+    session.info.setdefault('versions_pending', set()).update(names)
+
+
+@event.listens_for(Transaction, 'after_insert')
+@event.listens_for(Transaction, 'after_update')
+@event.listens_for(Transaction, 'after_delete')
+def _transaction_changed(mapper, connection, target):
+    bump(object_session(target), 'transactions')
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_pending(session):
+    session.flush()
+    names = session.info.pop('versions_pending', None)
+    if not names:
+        return
+    bumped = {}
+    # Всегда в одном порядке: две транзакции с 'points' и 'transactions' не заблокируют друг друга
+    for name in sorted(names):
+        version = session.execute(
+            update(DataVersion)
+            .where(DataVersion.name == name)
+            .values(version=DataVersion.version + 1)
+            .returning(DataVersion.version)
+        ).scalar()
+        if version is None:
+            session.execute(insert(DataVersion).values(name=name, version=1))
+            version = 1
+        bumped[name] = version
+    session.info['versions_bumped'] = bumped
+
+
+@event.listens_for(Session, 'after_commit')
+def _observe_bumped(session):
+    bumped = session.info.get('versions_bumped')
+    if not bumped or not has_app_context():
+        return
+    clock = get_clock()
+    for name, version in bumped.items():
+        clock.observe(name, version)
+
+
+# versions_bumped читают и другие обработчики after_commit (рейтинг), поэтому
+# убираем его только в конце транзакции
+@event.listens_for(Session, 'after_transaction_end')
+def _clear_bumped(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('versions_bumped', None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('versions_pending', None)
+    session.info.pop('versions_bumped', None)
+
+
+class FragmentCache:
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                self._drop(key)
+            self.misses += 1
+        return None
+
+    def put(self, key, html):
+        cost = len(html.encode('utf-8'))
+        if cost > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (time.monotonic() + self.ttl, html, cost)
+            self.size += cost
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+
+    def _drop(self, key):
+        _, _, cost = self.entries.pop(key)
+        self.size -= cost
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+def get_fragment_cache():
+    return site_state('fragment_cache', lambda: FragmentCache(
+        max_entries=current_app.config.get('FRAGMENT_CACHE_SIZE', 512),
+        max_bytes=current_app.config.get('FRAGMENT_CACHE_BYTES', 8 * 1024 * 1024),
+        ttl=current_app.config.get('FRAGMENT_CACHE_TTL', 300)
+    ))
+
+
+# Фрагмент по ключу (в ключ входят версии данных) или render() при промахе
+def cached_fragment(key, render):
+    cache = get_fragment_cache()
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.put(key, html)
+    return html
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+# 304 без обращения к данным, если у клиента та же версия страницы.
+# Страница с flash-сообщением всегда отдаётся целиком.
+def not_modified(etag):
+    if flask_session.get('_flashes') or not request.if_none_match.contains(etag):
+        return None
+    return with_etag(current_app.response_class(status=304), etag)
+
+
+def with_etag(response, etag):
+    response = current_app.make_response(response)
+    if response.status_code in (200, 304):
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.update(('Accept', 'Cookie'))
+    return response
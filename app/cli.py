@@ -0,0 +1,203 @@
+import os
+import tempfile
+
+import click
+from flask import current_app
+
+from app import db
+
+
+def register_commands(app):
+    app.cli.add_command(upgrade_db)
+    app.cli.add_command(seed_demo_command)
+    app.cli.add_command(check_query_plans)
+    app.cli.add_command(import_students_command)
+    app.cli.add_command(import_weekly_command)
+    app.cli.add_command(run_jobs_command)
+    app.cli.add_command(enqueue_job_command)
+    app.cli.add_command(reconcile_points_command)
+    app.cli.add_command(build_assets_command)
+
+
+def _check_sites(sites):
+    from app.database import site_names
+
+    unknown = set(sites) - set(site_names(current_app))
+    if unknown:
+        raise click.BadParameter(f"unknown site: {', '.join(sorted(unknown))}", param_hint='--site')
+
+
+@click.command('upgrade-db')
+@click.option('--site', 'sites', multiple=True, help='Площадка; по умолчанию все.')
+def upgrade_db(sites):
+    """Создать недостающие таблицы и применить миграции схемы."""
+    from app.database import site_names, use_site
+    from app.migrations import upgrade
+
+    _check_sites(sites)
+    for site in sites or site_names(current_app):
+        with use_site(current_app, site):
+            applied = upgrade()
+        for number, name in applied:
+            click.echo(f'[{site}] Applied migration {number}: {name}')
+        if not applied:
+            click.echo(f'[{site}] Schema is up to date.')
+
+
+@click.command('seed-demo')
+@click.option('--students', default=10, show_default=True, help='Сколько демо-учеников создать.')
+def seed_demo_command(students):
+    """Создать демо-учеников student1..studentN в группе по умолчанию."""
+    from app.bootstrap import seed_demo
+
+    created = seed_demo(students)
+    click.echo(f'Demo students created: {created}')
+
+
+@click.command('check-query-plans')
+@click.option('--database-url', default=None,
+              help='Пустая БД для проверки (по умолчанию временный файл SQLite).')
+@click.option('--students', default=2000, show_default=True)
+@click.option('--transactions', default=50, show_default=True,
+              help='Транзакций на ученика.')
+def check_query_plans(database_url, students, transactions):
+    """Проверить, что горячие маршруты не читают большие таблицы целиком и не делают N+1."""
+    from app import create_app
+    from app.migrations import upgrade
+    from app.query_plans import check_routes
+    from app.synthetic import generate
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{os.path.join(tmp, 'query_plans.db')}"
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': url,
+            'SECRET_KEY': current_app.config['SECRET_KEY'],
+            'TESTING': True,
+        })
+        with app.app_context():
+            upgrade()
+            groups = 20
+            generate(groups=groups, students_per_group=max(students // groups, 1),
+                     transactions_per_student=transactions)
+            db.session.remove()
+
+        problems = check_routes(app)
+        with app.app_context():
+            db.engine.dispose()
+
+    for route, statement, tables, plan in problems:
+        if statement is None:
+            click.echo(f'{route}: {plan[0]}')
+            continue
+        click.echo(f'{route}: full scan of {", ".join(tables)}')
+        click.echo(f'    {statement}')
+        for line in plan:
+            click.echo(f'    | {line}')
+    if problems:
+        raise click.ClickException(f'{len(problems)} problem(s) found on hot routes')
+    click.echo('No full table scans or N+1 queries on hot routes.')
+
+
+def _print_report(report):
+    for line, message in report.errors:
+        click.echo(f'line {line}: {message}', err=True)
+    click.echo(f'created: {report.created}, updated: {report.updated}, errors: {len(report.errors)}')
+
+
+@click.command('import-students')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+def import_students_command(csv_file):
+    """Импорт учеников из CSV: username, full_name, email, password, group."""
+    from app.importer import import_students
+
+    _print_report(import_students(csv_file))
+
+
+@click.command('import-weekly')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--week-start', required=True, type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Любой день недели, к которой относятся оценки.')
+def import_weekly_command(csv_file, week_start):
+    """Импорт недельных оценок из CSV: email, academic_performance, mentoring, teamwork, discipline."""
+    from datetime import timedelta
+
+    from app.importer import import_weekly_scores
+
+    week_start = (week_start - timedelta(days=week_start.weekday())).date()
+    _print_report(import_weekly_scores(csv_file, week_start))
+
+
+@click.command('run-jobs')
+@click.option('--once', is_flag=True, help='Выполнить просроченные задачи и выйти.')
+@click.option('--poll', default=5.0, show_default=True, help='Пауза между проверками очереди, секунды.')
+@click.option('--site', 'sites', multiple=True, help='Площадка; по умолчанию все.')
+def run_jobs_command(once, poll, sites):
+    """Воркер фоновых задач: подготовка недели, итоги года, пересчёты."""
+    from app.jobs import run_worker
+
+    _check_sites(sites)
+    count = run_worker(poll_seconds=poll, once=once, sites=sites)
+    click.echo(f'jobs run: {count}')
+
+
+@click.command('enqueue-job')
+@click.argument('name')
+@click.option('--payload', default='{}', help='Аргументы задачи в JSON.')
+@click.option('--key', default=None, help='Ключ идемпотентности.')
+def enqueue_job_command(name, payload, key):
+    """Поставить задачу в очередь: week_rollover, yearly_rollup, rebuild_summaries."""
+    import json
+
+    from app.jobs import enqueue
+
+    try:
+        enqueue(name, json.loads(payload), key=key)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    db.session.commit()
+    click.echo(f'queued: {name}')
+
+
+@click.command('reconcile-points')
+@click.option('--repair', type=click.Choice(['points', 'ledger']), default=None,
+              help='points — привести балансы к журналу, ledger — дописать в журнал корректировки.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Пользователей в одной пачке.')
+@click.option('--show', default=20, show_default=True, help='Сколько крупнейших расхождений вывести.')
+def reconcile_points_command(repair, chunk_size, show):
+    """Сверить User.points с журналом транзакций и при необходимости исправить."""
+    import time
+
+    from app.reconcile import reconcile
+
+    started = time.perf_counter()
+    report = reconcile(repair=repair, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - started
+
+    click.echo(f'users: {report.users}, drifted: {len(report.drifts)}, '
+               f'total drift: {report.total_delta:+d}, {elapsed:.2f}s')
+    if report.drifts:
+        click.echo(f'{"user":>8} {"balance":>8} {"ledger":>8} {"drift":>7} {"contests":>8} {"weekly":>7}  name')
+        for drift in sorted(report.drifts, key=lambda drift: -abs(drift.delta))[:show]:
+            click.echo(f'{drift.user_id:>8} {drift.points:>8} {drift.ledger:>8} {drift.delta:>+7} '
+                       f'{drift.competitions:>8} {drift.weekly:>7}  {drift.full_name}')
+    if report.repaired:
+        click.echo(f'repaired ({repair}): {report.repaired}')
+    elif report.drifts:
+        raise click.ClickException('balances differ from the ledger; rerun with --repair points|ledger')
+
+
+@click.command('build-assets')
+@click.option('--offline', is_flag=True, help='Не скачивать Bootstrap и шрифты, собрать то, что уже есть.')
+@click.option('--refresh', is_flag=True, help='Скачать сторонние файлы заново.')
+def build_assets_command(offline, refresh):
+    """Скачать Bootstrap и шрифты в static/vendor, собрать хэшированную и сжатую статику."""
+    from app.assets import brotli, build, vendor
+
+    static_folder = current_app.static_folder
+    if not offline:
+        for name, error in vendor(static_folder, refresh=refresh):
+            click.echo(f'not vendored, CDN will be used: {name} ({error})', err=True)
+    manifest = build(static_folder)
+    for name, hashed in sorted(manifest.items()):
+        click.echo(f'{name} -> {hashed}')
+    click.echo(f'assets: {len(manifest)}, compressed: gzip{", brotli" if brotli else ""}')
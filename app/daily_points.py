@@ -0,0 +1,195 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import has_app_context
+from sqlalchemy import Date, cast, delete, event, func, insert, select
+from sqlalchemy.orm import Session, object_session, scoped_session
+
+from app import db
+from app.caching import current_version
+from app.database import site_engine
+from app.leaderboard import Leaderboard, needs_rebuild
+from app.models import DailyPoints, Transaction, User
+from app.sites import site_state
+from app.summaries import academic_year, year_bounds
+
+# Очки по дням: строка (user_id, день) на каждый день, когда у пользователя были
+# транзакции. Запись в журнал сразу прибавляет изменение к строке дня одним
+# INSERT ... ON CONFLICT, поэтому рейтинг за окно — это сумма не более чем
+# ~365 строк на пользователя, сколько бы ни было транзакций.
+# Дни считаются в UTC, как и Transaction.created_at.
+
+WINDOWS = {
+    'all': 'За всё время',
+    'week': 'За неделю',
+    'month': 'За месяц',
+    'year': 'За учебный год',
+}
+
+_lock = threading.Lock()
+
+
+def today():
+    return datetime.utcnow().date()
+
+
+def window_start(window, day=None):
+    day = day or today()
+    if window == 'week':
+        return day - timedelta(days=day.weekday())
+    if window == 'month':
+        return day.replace(day=1)
+    if window == 'year':
+        return year_bounds(academic_year(day))[0]
+    return None
+
+
+def _upsert_statement():
+    if site_engine(db).dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(DailyPoints.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=['user_id', 'day'],
+        set_={'points': DailyPoints.__table__.c.points + stmt.excluded.points}
+    )
+
+
+# Прибавляет {user_id: изменение} к строкам дня day (по умолчанию — сегодня).
+# Если conn — сессия, изменения после коммита попадут и в рейтинги за окно.
+def record(conn, deltas, day=None):
+    day = day or today()
+    rows = [
+        dict(user_id=user_id, day=day, points=delta)
+        for user_id, delta in sorted(deltas.items()) if delta
+    ]
+    if rows:
+        conn.execute(_upsert_statement(), rows)
+        if isinstance(conn, (Session, scoped_session)):
+            _stage(conn, [('delta', row['user_id'], row['points'], day) for row in rows])
+
+
+# Транзакции, добавленные через ORM, а не через app.points
+@event.listens_for(Transaction, 'after_insert')
+def _transaction_inserted(mapper, connection, target):
+    day = target.created_at.date() if target.created_at else today()
+    record(connection, {target.user_id: target.points}, day)
+    _stage(object_session(target), [('delta', target.user_id, target.points, day)])
+
+
+# Изменения для рейтингов за окно копятся в сессии, как и для общего рейтинга,
+# и попадают в уже построенные индексы после коммита
+def _stage(session, changes):
+    session.info.setdefault('window_pending', []).extend(changes)
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+def _user_changed(mapper, connection, target):
+    _stage(object_session(target), [('group', target.id, target.group_id)])
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _stage(object_session(target), [('remove', target.id)])
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    pending = session.info.pop('window_pending', None)
+    if not pending or not has_app_context():
+        return
+    version = session.info.get('versions_bumped', {}).get('points')
+    boards = site_state('window_leaderboards', dict)
+    with _lock:
+        cached = list(boards.values())
+    for start, board, _ in cached:
+        with board.lock:
+            for action, user_id, *values in pending:
+                if action == 'delta':
+                    delta, day = values
+                    if day >= start:
+                        board.set_points(user_id, (board.points_of(user_id) or 0) + delta)
+                elif action == 'group':
+                    board.set(user_id, board.points_of(user_id) or 0, *values)
+                else:
+                    board.remove(user_id)
+            if version == board.version + 1:
+                board.version = version
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('window_pending', None)
+
+
+def _day_column():
+    if site_engine(db).dialect.name == 'sqlite':
+        return func.date(Transaction.created_at)
+    return cast(Transaction.created_at, Date)
+
+
+def _from_ledger(conn, *conditions):
+    day = _day_column()
+    conn.execute(insert(DailyPoints).from_select(
+        ['user_id', 'day', 'points'],
+        select(Transaction.user_id, day, func.sum(Transaction.points))
+        .where(*conditions)
+        .group_by(Transaction.user_id, day)
+    ))
+
+
+# Полное заполнение из журнала: миграция, синтетические данные
+def rebuild(conn):
+    conn.execute(delete(DailyPoints.__table__))
+    _from_ledger(conn)
+
+
+# Пересчёт дней day пользователей user_ids из журнала (после пакетных записей мимо record)
+def refresh(conn, user_ids, day):
+    start = datetime.combine(day, datetime.min.time())
+    conn.execute(delete(DailyPoints.__table__).where(
+        DailyPoints.user_id.in_(user_ids),
+        DailyPoints.day == day
+    ))
+    _from_ledger(
+        conn,
+        Transaction.user_id.in_(user_ids),
+        Transaction.created_at >= start,
+        Transaction.created_at < start + timedelta(days=1)
+    )
+
+
+# Суммы за окно читают только строки окна по индексу (day, user_id, points).
+# Группировка по user_id + 0, а не по самой колонке: иначе SQLite берёт для GROUP BY
+# готовый порядок ux_daily_points_user_id_day и проходит по всей истории.
+# Суммы и ученики читаются отдельно и соединяются здесь: соединение с подзапросом
+# SQLite выполнил бы вложенным циклом по всем парам.
+def _window_rows(start):
+    user_id = (DailyPoints.user_id + 0).label('user_id')
+    totals = dict(db.session.execute(
+        select(user_id, func.sum(DailyPoints.points))
+        .where(DailyPoints.day >= start)
+        .group_by(user_id)
+    ).all())
+    return [
+        (row.id, totals.get(row.id, 0), row.group_id)
+        for row in db.session.execute(select(User.id, User.group_id))
+    ]
+
+
+# Рейтинг за окно ('week', 'month', 'year') — тот же Leaderboard, что и общий,
+# построенный по суммам дневных строк. Свои коммиты применяются к нему сразу
+# (_apply_pending), изменения других процессов — пересборкой по тем же правилам,
+# что и у общего рейтинга (needs_rebuild); при смене начала окна — всегда.
+def get_window_leaderboard(window):
+    start = window_start(window)
+    version = current_version('points')
+    boards = site_state('window_leaderboards', dict)
+    with _lock:
+        cached = boards.get(window)
+        if cached is None or cached[0] != start or needs_rebuild(cached[1].version, cached[2], version):
+            cached = boards[window] = (start, Leaderboard(_window_rows(start), version), time.monotonic())
+        return cached[1]
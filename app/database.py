@@ -0,0 +1,196 @@
+import json
+import os
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+
+# Настройки подключения к БД берутся из окружения:
+#   DATABASE_URL          — основная база (по умолчанию sqlite:///education.db)
+#   DATABASE_REPLICA_URL  — реплика только для чтения (необязательно)
+#   DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_PRE_PING — пул соединений
+#   SQLITE_BUSY_TIMEOUT   — сколько миллисекунд SQLite ждёт снятия блокировки
+#   SITES                 — площадки со своими базами, JSON (см. configure_sites)
+#   SITE                  — площадка для CLI-команд и воркеров вне запроса
+
+DEFAULT_DATABASE_URL = 'sqlite:///education.db'
+
+
+def _env_int(name, default=None):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def _normalize_url(url):
+    # Heroku и многие хостинги отдают postgres://, а SQLAlchemy 2 понимает только postgresql://
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def _is_sqlite_memory(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+# Параметры пула. Для SQLite в памяти Flask-SQLAlchemy ставит StaticPool,
+# которому размеры пула не передаются.
+def engine_options(url):
+    if _is_sqlite_memory(url):
+        return {}
+    options = {'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True)}
+    for key, name in (('pool_size', 'DB_POOL_SIZE'),
+                      ('max_overflow', 'DB_MAX_OVERFLOW'),
+                      ('pool_recycle', 'DB_POOL_RECYCLE')):
+        value = _env_int(name)
+        if value is not None:
+            options[key] = value
+    return options
+
+
+def database_config():
+    url = _normalize_url(os.environ.get('DATABASE_URL')) or DEFAULT_DATABASE_URL
+    config = {
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(url),
+        'SQLITE_BUSY_TIMEOUT': _env_int('SQLITE_BUSY_TIMEOUT', 5000),
+    }
+    replica_url = _normalize_url(os.environ.get('DATABASE_REPLICA_URL'))
+    if replica_url:
+        config['SQLALCHEMY_BINDS'] = {'replica': dict(engine_options(replica_url), url=replica_url)}
+    sites = os.environ.get('SITES')
+    if sites:
+        config['SITES'] = json.loads(sites)
+    return config
+
+
+# Площадки (кампусы) в одном развёртывании, у каждой своя база:
+#   SITES = {"north": {"url": "postgresql://.../north", "hosts": ["north.example.com"],
+#                      "prefix": "/north", "replica_url": "...", "admin_password": "..."}}
+# Каждая база — отдельный bind 'site:<name>' (и 'site:<name>:replica') со своим
+# пулом соединений, поэтому запись в одном кампусе не ждёт блокировки другого.
+# Запросы, не попавшие ни на одну площадку, идут в основную базу — площадку 'default'.
+DEFAULT_SITE = 'default'
+SITE_ENVIRON_KEY = 'app.site'
+
+
+def _site_bind(name, replica=False):
+    if name == DEFAULT_SITE:
+        return 'replica' if replica else None
+    return f'site:{name}:replica' if replica else f'site:{name}'
+
+
+def configure_sites(app):
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for name, site in app.config.get('SITES', {}).items():
+        if name == DEFAULT_SITE or ':' in name:
+            raise ValueError(f'invalid site name: {name!r}')
+        for replica, key in ((False, 'url'), (True, 'replica_url')):
+            url = _normalize_url(site.get(key))
+            if url:
+                binds[_site_bind(name, replica)] = dict(engine_options(url), url=url)
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def site_names(app):
+    return [DEFAULT_SITE, *app.config.get('SITES', {})]
+
+
+# Площадка текущего запроса (её выбирает SiteMiddleware по хосту или префиксу URL),
+# вне запроса — заданная use_site или переменной окружения SITE
+def current_site():
+    if has_request_context():
+        return request.environ.get(SITE_ENVIRON_KEY, DEFAULT_SITE)
+    if has_app_context() and 'site' in g:
+        return g.site
+    return os.environ.get('SITE') or DEFAULT_SITE
+
+
+# Отдельный контекст приложения, а значит и отдельная сессия, для работы с площадкой
+@contextmanager
+def use_site(app, name):
+    if name not in site_names(app):
+        raise LookupError(f'unknown site: {name}')
+    with app.app_context():
+        g.site = name
+        yield name
+
+
+def site_engine(db, name=None, replica=False):
+    name = name or current_site()
+    if replica:
+        engine = db.engines.get(_site_bind(name, replica=True))
+        if engine is not None:
+            return engine
+    try:
+        return db.engines[_site_bind(name)]
+    except KeyError:
+        raise LookupError(f'unknown site: {name}') from None
+
+
+# WAL позволяет читать во время записи из другого процесса, busy_timeout заставляет
+# писателя подождать вместо мгновенного "database is locked", а synchronous=NORMAL
+# в режиме WAL безопасен и заметно ускоряет коммиты.
+def _sqlite_pragmas(busy_timeout):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout)}')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+    return on_connect
+
+
+def configure_engines(app, db):
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _sqlite_pragmas(app.config['SQLITE_BUSY_TIMEOUT']))
+
+
+# Маршруты, помеченные read_only, читают с реплики (если она настроена).
+# Запись внутри такого запроса и flush всё равно уходят на основную базу.
+def read_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only_db = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _use_replica():
+    return has_request_context() and g.get('read_only_db', False)
+
+
+# Все запросы сессии идут в базу текущей площадки; чтения read_only-маршрутов —
+# в её реплику, если она есть. После первой записи (flush или не-SELECT) и до конца
+# транзакции чтения тоже идут в основную базу: реплика своих записей ещё не видит.
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or not isinstance(clause, Select):
+                self.info['wrote_primary'] = True
+            replica = 'wrote_primary' not in self.info and isinstance(clause, Select) and _use_replica()
+            return site_engine(self._db, replica=replica)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _forget_writes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('wrote_primary', None)
+
+
+def read_engine(db):
+    return site_engine(db, replica=_use_replica())
@@ -0,0 +1,245 @@
+import itertools
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+from flask import Blueprint, Response, abort, current_app, has_app_context, request
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.sites import site_state
+
+# Server-sent events: небольшие изменения для открытых страниц вместо перезагрузки.
+# Обработчики ставят события в session.info, после коммита они уходят в локальный
+# хаб процесса. Каналы:
+#   leaderboard, leaderboard:<group_id> — изменения балансов и мест ('balance');
+#   grid, grid:<group_id>              — изменённые ячейки недельной сетки ('cells').
+# У каждого подписчика своя ограниченная очередь. Если клиент не успевает читать
+# и очередь переполнилась, ему отправляется 'reset' (перечитать страницу целиком)
+# и подписка закрывается — медленный клиент не держит память хаба.
+# Поток живёт не дольше SSE_MAX_SECONDS, затем браузер переподключается сам
+# (EventSource) с Last-Event-ID и получает пропущенное из кольцевого буфера.
+# Так соединение занимает воркер ограниченное время, а их число ограничено
+# SSE_MAX_STREAMS; база данных во время потока не используется.
+# Поток всё равно держит воркер целиком, поэтому SSE нужен сервер с асинхронными
+# воркерами (gunicorn -k gevent или -k eventlet). SSE_ENABLED:
+#   None (по умолчанию) — SSE включается сам, если сокеты пропатчены gevent/eventlet;
+#   True/False          — явно, например за прокси, который сам держит соединения.
+# Без SSE страницы раз в LIVE_POLL_SECONDS опрашивают свои JSON-версии
+# с If-None-Match и в основном получают пустой 304.
+
+bp = Blueprint('events', __name__, url_prefix='/events')
+
+RESET = object()
+
+
+class Subscriber:
+    def __init__(self, channels, size):
+        self.channels = channels
+        self.queue = queue.Queue(maxsize=size)
+
+
+class Hub:
+    def __init__(self, queue_size, buffer_size, max_streams):
+        self.queue_size = queue_size
+        self.max_streams = max_streams
+        self.lock = threading.Lock()
+        self.channels = {}
+        self.buffer = deque(maxlen=buffer_size)
+        self.ids = itertools.count(1)
+        self.streams = 0
+        self.dropped = 0
+
+    # Подписка и пропущенные события после last_id под одной блокировкой, чтобы
+    # ничего не потерять и не получить дважды. backlog = None — часть пропущенного
+    # уже вытеснена из буфера, клиенту нужно перечитать страницу.
+    def subscribe(self, channels, last_id=None):
+        subscriber = Subscriber(channels, self.queue_size)
+        with self.lock:
+            if self.streams >= self.max_streams:
+                return None, None
+            self.streams += 1
+            for channel in channels:
+                self.channels.setdefault(channel, set()).add(subscriber)
+            if last_id is None:
+                backlog = []
+            elif self.buffer and self.buffer[0][0] > last_id + 1:
+                backlog = None
+            else:
+                backlog = [item for item in self.buffer if item[0] > last_id and item[1] in channels]
+        return subscriber, backlog
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self._detach(subscriber)
+
+    def _detach(self, subscriber):
+        attached = False
+        for channel in subscriber.channels:
+            members = self.channels.get(channel)
+            if members and subscriber in members:
+                attached = True
+                members.discard(subscriber)
+                if not members:
+                    del self.channels[channel]
+        if attached:
+            self.streams -= 1
+
+    def publish(self, channel, name, data):
+        with self.lock:
+            item = (next(self.ids), channel, name, json.dumps(data, ensure_ascii=False))
+            self.buffer.append(item)
+            for subscriber in list(self.channels.get(channel, ())):
+                try:
+                    subscriber.queue.put_nowait(item)
+                except queue.Full:
+                    self._overflow(subscriber)
+
+    def _overflow(self, subscriber):
+        self._detach(subscriber)
+        self.dropped += 1
+        while True:
+            try:
+                subscriber.queue.get_nowait()
+            except queue.Empty:
+                break
+        subscriber.queue.put_nowait(RESET)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'streams': self.streams,
+                'channels': len(self.channels),
+                'buffered': len(self.buffer),
+                'dropped': self.dropped,
+            }
+
+
+def get_hub():
+    return site_state('event_hub', lambda: Hub(
+        queue_size=current_app.config.get('SSE_QUEUE_SIZE', 100),
+        buffer_size=current_app.config.get('SSE_BUFFER_SIZE', 1000),
+        max_streams=current_app.config.get('SSE_MAX_STREAMS', 50)
+    ))
+
+
+# Для кода, который уже выполняется после коммита
+def publish(channel, name, data):
+    get_hub().publish(channel, name, data)
+
+
+# Событие уйдёт подписчикам только после успешного коммита
+def stage(session, channel, name, data):
+    session.info.setdefault('events_pending', []).append((channel, name, data))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending(session):
+    pending = session.info.pop('events_pending', None)
+    if not pending or not has_app_context():
+        return
+    for channel, name, data in pending:
+        publish(channel, name, data)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('events_pending', None)
+
+
+def _format(item):
+    event_id, _, name, data = item
+    return f'id: {event_id}\nevent: {name}\ndata: {data}\n\n'
+
+
+def _stream(hub, subscriber, backlog, heartbeat, lifetime):
+    try:
+        yield 'retry: 3000\n\n'
+        if backlog is None:
+            yield 'event: reset\ndata: {}\n\n'
+            return
+        for item in backlog:
+            yield _format(item)
+        deadline = time.monotonic() + lifetime
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                item = subscriber.queue.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+                continue
+            if item is RESET:
+                yield 'event: reset\ndata: {}\n\n'
+                return
+            yield _format(item)
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+# Сервер запущен с воркерами gevent/eventlet: они патчат сокеты при старте
+def _async_workers():
+    gevent = sys.modules.get('gevent.monkey')
+    if gevent is not None and gevent.is_module_patched('socket'):
+        return True
+    eventlet = sys.modules.get('eventlet.patcher')
+    return eventlet is not None and eventlet.is_monkey_patched('socket')
+
+
+def sse_enabled():
+    enabled = current_app.config.get('SSE_ENABLED')
+    return _async_workers() if enabled is None else enabled
+
+
+def _open(channels):
+    if not sse_enabled():
+        abort(404)
+    hub = get_hub()
+    subscriber, backlog = hub.subscribe(channels, request.headers.get('Last-Event-ID', type=int))
+    if subscriber is None:
+        abort(503)
+    response = Response(
+        _stream(
+            hub, subscriber, backlog,
+            heartbeat=current_app.config.get('SSE_HEARTBEAT_SECONDS', 15),
+            lifetime=current_app.config.get('SSE_MAX_SECONDS', 60)
+        ),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # Если клиент ушёл до первого чтения, генератор не запустится и не отпишется сам
+    response.call_on_close(lambda: hub.unsubscribe(subscriber))
+    return response
+
+
+@bp.app_context_processor
+def _live_updates():
+    return {
+        'sse_enabled': sse_enabled(),
+        'poll_seconds': current_app.config.get('LIVE_POLL_SECONDS', 10),
+    }
+
+
+@bp.errorhandler(503)
+def _busy(error):
+    return Response('too many streams', status=503, headers={'Retry-After': '10'})
+
+
+@bp.route('/leaderboard')
+def leaderboard():
+    group_id = request.args.get('group_id', type=int)
+    return _open({f'leaderboard:{group_id}' if group_id else 'leaderboard'})
+
+
+@bp.route('/weekly')
+def weekly():
+    if not current_user.is_authenticated or current_user.role not in ['teacher', 'admin']:
+        abort(403)
+    group_id = request.args.get('group_id', type=int)
+    return _open({f'grid:{group_id}' if group_id else 'grid'})
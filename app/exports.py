@@ -0,0 +1,183 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, Response, abort, request, stream_with_context
+from flask_login import current_user, login_required
+from sqlalchemy import select
+
+from app import db
+from app.database import read_engine, read_only
+from app.models import Competition, Transaction, User, WeeklyPerformance, YearlyPerformance
+
+bp = Blueprint('exports', __name__, url_prefix='/export')
+
+BATCH_SIZE = 2000
+
+# Набор данных: (модель, колонки выгрузки, колонка для фильтра по датам)
+DATASETS = {
+    'transactions': (
+        Transaction,
+        ['id', 'created_at', 'user_id', 'points', 'transaction_type', 'reason', 'comment', 'awarded_by_id'],
+        'created_at',
+    ),
+    'competitions': (
+        Competition,
+        ['id', 'date', 'user_id', 'name', 'level', 'project_quality', 'place', 'communication', 'awarded_by_id'],
+        'date',
+    ),
+    'weekly_performances': (
+        WeeklyPerformance,
+        ['id', 'week_start', 'week', 'year', 'user_id', 'points',
+         'academic_performance', 'mentoring', 'teamwork', 'discipline'],
+        'week_start',
+    ),
+    'yearly_performances': (
+        YearlyPerformance,
+        ['id', 'year', 'user_id', 'points', 'projects_score', 'tech_dictation_score',
+         'initial_monitoring_score', 'intermediate_certification_score', 'final_certification_score'],
+        'year',
+    ),
+}
+
+
+def _parse_date(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        abort(400, f'Некорректная дата: {name}')
+
+
+def _build_query(model, columns, date_column):
+    table = model.__table__
+    users = User.__table__
+    stmt = (
+        select(*(table.c[name] for name in columns), users.c.full_name, users.c.group_id)
+        .join(users, users.c.id == table.c.user_id)
+    )
+
+    date_from = _parse_date('date_from')
+    date_to = _parse_date('date_to')
+    column = table.c[date_column]
+    if date_column == 'year':
+        date_from = date_from and date_from.year
+        date_to = date_to and date_to.year
+    elif date_column == 'week_start':
+        date_from = date_from and date_from.date()
+        date_to = date_to and date_to.date()
+    if date_from is not None:
+        stmt = stmt.where(column >= date_from)
+    if date_to is not None:
+        if isinstance(date_to, datetime):
+            # Колонка с временем: date_to включается целиком, до полуночи следующего дня
+            stmt = stmt.where(column < date_to + timedelta(days=1))
+        else:
+            stmt = stmt.where(column <= date_to)
+
+    group_ids = request.args.getlist('group_id', type=int)
+    if group_ids:
+        stmt = stmt.where(users.c.group_id.in_(group_ids))
+    return stmt, table.c.id
+
+
+# Строки читаются пачками. На Postgres — серверным курсором (yield_per),
+# на SQLite — короткими запросами по ключу id, чтобы долгая выгрузка
+# не держала блокировку чтения и не мешала записи из других воркеров.
+def _iter_batches(stmt, id_column):
+    engine = read_engine(db)
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as conn:
+            result = conn.execution_options(yield_per=BATCH_SIZE).execute(stmt.order_by(id_column))
+            for batch in result.partitions():
+                yield batch
+        return
+
+    last_id = None
+    while True:
+        batch_stmt = stmt.order_by(id_column).limit(BATCH_SIZE)
+        if last_id is not None:
+            batch_stmt = batch_stmt.where(id_column > last_id)
+        with engine.connect() as conn:
+            batch = conn.execute(batch_stmt).all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(header, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(header, batches):
+    for batch in batches:
+        yield ''.join(
+            json.dumps(dict(zip(header, map(json_value, row))), ensure_ascii=False) + '\n'
+            for row in batch
+        )
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@bp.route('/<dataset>')
+@login_required
+@read_only
+def export(dataset):
+    if current_user.role not in ['teacher', 'admin']:
+        abort(403)
+    if dataset not in DATASETS:
+        abort(404)
+
+    output = request.args.get('format', 'csv')
+    if output not in ('csv', 'ndjson'):
+        abort(400, 'Поддерживаются форматы csv и ndjson')
+
+    model, columns, date_column = DATASETS[dataset]
+    stmt, id_column = _build_query(model, columns, date_column)
+    header = columns + ['full_name', 'group_id']
+
+    batches = _iter_batches(stmt, id_column)
+    if output == 'csv':
+        chunks = _csv_chunks(header, batches)
+        mimetype = 'text/csv'
+    else:
+        chunks = _ndjson_chunks(header, batches)
+        mimetype = 'application/x-ndjson'
+
+    headers = {
+        'Content-Disposition': f'attachment; filename={dataset}.{output}',
+        'Vary': 'Accept-Encoding',
+    }
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        body = _gzip(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    else:
+        body = (chunk.encode('utf-8') for chunk in chunks)
+
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
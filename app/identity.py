@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models import User
+from app.sites import login_id, site_state
+
+# Кэш личности пользователя в памяти процесса: id, роль, группа, подтверждение и имя.
+# Этого хватает для проверки входа и прав без запроса к БД. Очки и связи не кэшируются:
+# при обращении к ним CachedUser один раз загружает полноценный объект User.
+
+IDENTITY_FIELDS = ('id', 'username', 'full_name', 'role', 'group_id', 'is_confirmed')
+
+
+class CachedUser(UserMixin):
+    def __init__(self, fields):
+        self.__dict__.update(fields)
+
+    def _load(self):
+        user = self.__dict__.get('_user')
+        if user is None:
+            user = self.__dict__['_user'] = db.session.get(User, self.id)
+        return user
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def get_id(self):
+        return login_id(self.id)
+
+    def __repr__(self):
+        return f'<CachedUser {self.full_name}>'
+
+
+class IdentityCache:
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def put(self, user_id, fields):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.ttl, fields)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            if self.entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+            }
+
+
+def get_cache():
+    return site_state('identity_cache', lambda: IdentityCache(
+        ttl=current_app.config.get('IDENTITY_CACHE_TTL', 60),
+        max_size=current_app.config.get('IDENTITY_CACHE_SIZE', 10000)
+    ))
+
+
+def load_identity(user_id):
+    cache = get_cache()
+    fields = cache.get(user_id)
+    if fields is None:
+        row = db.session.execute(
+            select(*(getattr(User, name) for name in IDENTITY_FIELDS)).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        fields = dict(row._mapping)
+        cache.put(user_id, fields)
+    return CachedUser(fields)
+
+
+# Удаление, подтверждение, смена роли или группы сбрасывают запись после коммита
+def _stage(session, user_id):
+    session.info.setdefault('identity_invalidate', set()).add(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    _stage(object_session(target), target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_invalidations(session):
+    user_ids = session.info.pop('identity_invalidate', None)
+    if not user_ids or not has_app_context():
+        return
+    cache = get_cache()
+    for user_id in user_ids:
+        cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('identity_invalidate', None)
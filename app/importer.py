@@ -0,0 +1,157 @@
+import csv
+import re
+
+from sqlalchemy import func, insert, select
+
+from app import db
+from app.caching import bump
+from app.models import Group, User
+from app.passwords import hash_passwords
+from app.performance import WEEK_FIELD_LIMITS, WEEK_FIELDS, upsert_week_rows
+
+# Массовый импорт из CSV. Строки проверяются и пишутся пачками по CHUNK_SIZE:
+# один запрос на проверку пачки, одна пакетная вставка и один коммит на пачку.
+
+CHUNK_SIZE = 2000
+
+STUDENT_COLUMNS = ('username', 'full_name', 'email', 'password', 'group')
+WEEKLY_COLUMNS = ('email',) + WEEK_FIELDS
+
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def _read(stream, columns, report):
+    reader = csv.DictReader(stream)
+    missing = [column for column in columns if column not in (reader.fieldnames or [])]
+    if missing:
+        report.error(1, f"Нет колонок: {', '.join(missing)}")
+        return
+    chunk = []
+    for row in reader:
+        # Строка 1 — заголовок
+        chunk.append((reader.line_num, {key: (value or '').strip() for key, value in row.items() if key}))
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Все группы из файла находятся одним запросом, недостающие создаются одной вставкой
+def _resolve_groups(names):
+    names = set(names)
+    if not names:
+        return {}
+    groups = dict(db.session.execute(select(Group.name, Group.id).where(Group.name.in_(names))).all())
+    missing = names - groups.keys()
+    if missing:
+        db.session.execute(insert(Group), [{'name': name} for name in sorted(missing)])
+        groups.update(db.session.execute(select(Group.name, Group.id).where(Group.name.in_(missing))).all())
+    return groups
+
+
+def import_students(stream):
+    report = ImportReport()
+    seen_emails = set()
+
+    for chunk in _read(stream, STUDENT_COLUMNS, report):
+        valid = []
+        for line, row in chunk:
+            if not all(row[column] for column in ('username', 'full_name', 'email', 'password')):
+                report.error(line, 'Не заполнены обязательные поля')
+            elif not _EMAIL.match(row['email']):
+                report.error(line, f"Некорректный email: {row['email']}")
+            elif row['email'].lower() in seen_emails:
+                report.error(line, f"Email повторяется в файле: {row['email']}")
+            else:
+                seen_emails.add(row['email'].lower())
+                valid.append((line, row))
+
+        # Email сравниваются без учёта регистра и в файле, и с уже заведёнными пользователями
+        existing = set(db.session.execute(
+            select(func.lower(User.email))
+            .where(func.lower(User.email).in_([row['email'].lower() for _, row in valid]))
+        ).scalars())
+        rows = []
+        for line, row in valid:
+            if row['email'].lower() in existing:
+                report.error(line, f"Пользователь с email {row['email']} уже существует")
+            else:
+                rows.append(row)
+        if not rows:
+            continue
+
+        groups = _resolve_groups(row['group'] for row in rows if row['group'])
+        hashes = hash_passwords([row['password'] for row in rows])
+        db.session.execute(insert(User), [
+            dict(
+                username=row['username'],
+                full_name=row['full_name'],
+                email=row['email'],
+                password_hash=password_hash,
+                role='student',
+                points=0,
+                group_id=groups.get(row['group']),
+                is_confirmed=True
+            )
+            for row, password_hash in zip(rows, hashes)
+        ])
+        # Вставка мимо ORM: новая версия 'points' заставит индекс рейтинга пересобраться
+        bump(db.session, 'points')
+        db.session.commit()
+        report.created += len(rows)
+
+    return report
+
+
+def _parse_score(row, field):
+    value = int(row[field] or 0)
+    if not 0 <= value <= WEEK_FIELD_LIMITS[field]:
+        raise ValueError(f'{field} должно быть от 0 до {WEEK_FIELD_LIMITS[field]}')
+    return value
+
+
+def import_weekly_scores(stream, week_start):
+    report = ImportReport()
+
+    for chunk in _read(stream, WEEKLY_COLUMNS, report):
+        students = dict(db.session.execute(
+            select(func.lower(User.email), User.id).where(
+                func.lower(User.email).in_([row['email'].lower() for _, row in chunk]),
+                User.role == 'student'
+            )
+        ).all())
+
+        rows = {}
+        for line, row in chunk:
+            student_id = students.get(row['email'].lower())
+            if student_id is None:
+                report.error(line, f"Ученик не найден: {row['email']}")
+                continue
+            try:
+                scores = {field: _parse_score(row, field) for field in WEEK_FIELDS}
+            except ValueError as e:
+                report.error(line, str(e))
+                continue
+            # При повторе ученика в файле побеждает последняя строка
+            rows[student_id] = dict(user_id=student_id, week_start=week_start, **scores)
+
+        upsert_week_rows(list(rows.values()))
+        db.session.commit()
+        report.updated += len(rows)
+
+    return report
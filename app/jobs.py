@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, or_, select, update
+
+from app import db
+from app.database import site_engine, site_names, use_site
+from app.models import Job
+from app.performance import precreate_week
+from app.summaries import YEAR_START_MONTH, academic_year, rebuild, rebuild_year
+
+# Фоновые задачи в таблице jobs той же БД. Воркер (flask run-jobs) забирает
+# просроченные задачи условным UPDATE ... WHERE status = ..., поэтому несколько
+# воркеров не выполнят одну задачу дважды. Упавшая задача повторяется с
+# экспоненциальной задержкой до max_attempts раз; задача, чей воркер умер,
+# возвращается в работу через JOB_LOCK_TIMEOUT секунд, а если попытки уже
+# исчерпаны — помечается failed.
+# Время в таблице локальное, как и границы недель в weekly_performance.
+
+log = logging.getLogger('app.jobs')
+
+HANDLERS = {}
+
+
+def job(name):
+    def decorator(handler):
+        HANDLERS[name] = handler
+        return handler
+    return decorator
+
+
+def _insert_statement():
+    if site_engine(db).dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(Job.__table__).on_conflict_do_nothing(index_elements=['idempotency_key'])
+
+
+# Ставит задачу в очередь в текущей сессии (коммит за вызывающим).
+# С ключом идемпотентности повторная постановка ничего не делает.
+def enqueue(name, payload=None, run_at=None, key=None, max_attempts=3):
+    if name not in HANDLERS:
+        raise ValueError(f'Неизвестная задача: {name}')
+    now = datetime.now()
+    db.session.execute(_insert_statement(), [dict(
+        name=name,
+        payload=json.dumps(payload or {}, sort_keys=True),
+        idempotency_key=key,
+        status='pending',
+        run_at=run_at or now,
+        attempts=0,
+        max_attempts=max_attempts,
+        created_at=now,
+    )])
+
+
+def _claim(worker_id, now):
+    stale = now - timedelta(seconds=current_app.config.get('JOB_LOCK_TIMEOUT', 600))
+    # Воркер умер на последней попытке: повторять задачу больше нельзя
+    abandoned = and_(Job.status == 'running', Job.locked_at < stale, Job.attempts >= Job.max_attempts)
+    for job_id, in db.session.execute(select(Job.id).where(abandoned)).all():
+        failed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, abandoned)
+            .values(status='failed', finished_at=now, last_error='Воркер не завершил последнюю попытку')
+        ).rowcount
+        if failed:
+            log.warning('job %s failed: worker lock expired on the last attempt', job_id)
+    db.session.commit()
+
+    due = or_(
+        and_(Job.status == 'pending', Job.run_at <= now),
+        and_(Job.status == 'running', Job.locked_at < stale, Job.attempts < Job.max_attempts),
+    )
+    candidates = db.session.execute(
+        select(Job.id, Job.status).where(due).order_by(Job.run_at, Job.id).limit(10)
+    ).all()
+    for job_id, status in candidates:
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == status, due)
+            .values(status='running', locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id, populate_existing=True)
+    return None
+
+
+def _finish(job_id, **values):
+    db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+
+
+# Работа задачи и отметка о выполнении попадают в один коммит
+def run_job(job):
+    handler = HANDLERS.get(job.name)
+    job_id, attempts, max_attempts = job.id, job.attempts, job.max_attempts
+    try:
+        if handler is None:
+            raise LookupError(f'Нет обработчика для задачи {job.name}')
+        result = handler(**json.loads(job.payload))
+        _finish(job_id, status='done', finished_at=datetime.now(), last_error=None)
+        db.session.commit()
+        log.info('job %s %s done: %s', job_id, job.name, result)
+        return True
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc(limit=5)
+        if attempts < max_attempts:
+            delay = current_app.config.get('JOB_RETRY_SECONDS', 30) * 2 ** (attempts - 1)
+            _finish(job_id, status='pending', locked_by=None,
+                    run_at=datetime.now() + timedelta(seconds=delay), last_error=error)
+        else:
+            _finish(job_id, status='failed', finished_at=datetime.now(), last_error=error)
+        db.session.commit()
+        log.warning('job %s failed (attempt %s of %s)\n%s', job_id, attempts, max_attempts, error)
+        return False
+
+
+# Выполняет все задачи, срок которых наступил; возвращает их число
+def run_pending(worker_id):
+    count = 0
+    while True:
+        job = _claim(worker_id, datetime.now())
+        if job is None:
+            return count
+        run_job(job)
+        count += 1
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+# У каждой площадки своя очередь в своей базе; воркер обходит их по очереди
+def run_worker(poll_seconds=5, once=False, sites=None):
+    app = current_app._get_current_object()
+    ident = worker_id()
+    while True:
+        count = 0
+        for site in sites or site_names(app):
+            with use_site(app, site):
+                schedule_periodic()
+                count += run_pending(ident)
+        if once:
+            return count
+        if not count:
+            time.sleep(poll_seconds)
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+# Регулярные задачи. Ключи идемпотентности делают постановку безопасной
+# на каждом цикле воркера и из нескольких воркеров сразу.
+def schedule_periodic(today=None):
+    today = today or date.today()
+    this_week = _week_start(today)
+    next_week = this_week + timedelta(days=7)
+    lead = timedelta(hours=current_app.config.get('WEEK_ROLLOVER_LEAD_HOURS', 6))
+
+    enqueue('week_rollover', {'week_start': this_week.isoformat()},
+            key=f'week_rollover:{this_week}')
+    enqueue('week_rollover', {'week_start': next_week.isoformat()},
+            run_at=datetime.combine(next_week, datetime.min.time()) - lead,
+            key=f'week_rollover:{next_week}')
+
+    # Итоги года подводятся в ночь на 1 сентября; прошлый год — на случай,
+    # если воркер тогда не работал
+    year = academic_year(today)
+    for rollup_year in (year - 1, year):
+        enqueue('yearly_rollup', {'year': rollup_year},
+                run_at=datetime(rollup_year + 1, YEAR_START_MONTH, 1, 1),
+                key=f'yearly_rollup:{rollup_year}')
+    db.session.commit()
+
+
+@job('week_rollover')
+def week_rollover(week_start):
+    return precreate_week(date.fromisoformat(week_start))
+
+
+# Итоги учебного года из конкурсов, недельных и годовых оценок. Итоги обновляются
+# и при каждой записи; полная перестройка после конца года убирает накопившийся дрейф.
+@job('yearly_rollup')
+def yearly_rollup(year):
+    rebuild_year(db.session, year)
+
+
+@job('rebuild_summaries')
+def rebuild_summaries():
+    rebuild(db.session)
@@ -0,0 +1,306 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from math import ceil
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.caching import bump, current_version
+from app.events import publish
+from app.models import User
+from app.pagination import encode_cursor
+from app.sites import site_state
+
+
+# Индекс порядковых статистик: отсортированный список ключей (-очки, id), то есть
+# очки по убыванию, id по возрастанию. Поиск — O(log N), вставка и удаление — сдвиг
+# списка; память растёт только с числом пользователей, а не с разбросом очков.
+class RankIndex:
+    def __init__(self, entries=()):
+        self.points = {user_id: points or 0 for user_id, points in entries}
+        self.keys = sorted((-points, user_id) for user_id, points in self.points.items())
+
+    def __len__(self):
+        return len(self.points)
+
+    def set(self, user_id, points):
+        points = points or 0
+        if self.points.get(user_id) == points:
+            return
+        self.remove(user_id)
+        self.points[user_id] = points
+        insort(self.keys, (-points, user_id))
+
+    def remove(self, user_id):
+        points = self.points.pop(user_id, None)
+        if points is None:
+            return
+        del self.keys[bisect_left(self.keys, (-points, user_id))]
+
+    # Место с учётом равенства очков: у одинаковых очков одинаковое место
+    def rank(self, user_id):
+        points = self.points.get(user_id)
+        if points is None:
+            return None
+        return self._greater(points) + 1
+
+    # Сколько записей с очками строго больше points
+    def _greater(self, points):
+        return bisect_left(self.keys, (-points,))
+
+    def position(self, user_id):
+        points = self.points.get(user_id)
+        if points is None:
+            return None
+        return self.position_of(points, user_id)
+
+    # Сколько записей стоит строго перед ключом (points, user_id); сам ключ может отсутствовать
+    def position_of(self, points, user_id):
+        return bisect_left(self.keys, (-points, user_id))
+
+    # Срез рейтинга [offset, offset + limit) в виде [(место, user_id)]
+    def slice(self, offset, limit):
+        result = []
+        ranks = {}
+        for negative, user_id in self.keys[offset:offset + max(limit, 0)]:
+            if negative not in ranks:
+                ranks[negative] = self._greater(-negative) + 1
+            result.append((ranks[negative], user_id))
+        return result
+
+
+class LeaderboardPage:
+    def __init__(self, items, ranks, points, offset, per_page, total, next_cursor, prev_cursor):
+        self.items = items
+        self.ranks = ranks
+        # Очки из индекса: для рейтингов за период они отличаются от User.points
+        self.points = points
+        self.per_page = per_page
+        self.total = total
+        self.page = offset // per_page + 1
+        self.pages = ceil(total / per_page) if total else 0
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.has_next = next_cursor is not None
+        self.has_prev = prev_cursor is not None
+
+
+# Общий рейтинг плюс отдельный индекс на каждую группу
+class Leaderboard:
+    def __init__(self, rows, version=0):
+        self.lock = threading.RLock()
+        # Версия 'points', которой соответствует содержимое индекса
+        self.version = version
+        self.groups = {}
+        self.members = {}
+        self.overall = RankIndex()
+        for user_id, points, group_id in rows:
+            self.set(user_id, points, group_id)
+
+    def _index(self, group_id):
+        if group_id is None:
+            return self.overall
+        return self.groups.get(group_id)
+
+    def set(self, user_id, points, group_id):
+        old_group_id = self.members.get(user_id)
+        if old_group_id is not None and old_group_id != group_id:
+            self.groups[old_group_id].remove(user_id)
+        self.members[user_id] = group_id
+        self.overall.set(user_id, points)
+        if group_id is not None:
+            self.groups.setdefault(group_id, RankIndex()).set(user_id, points)
+
+    def set_points(self, user_id, points):
+        if user_id in self.members:
+            self.set(user_id, points, self.members[user_id])
+
+    def remove(self, user_id):
+        group_id = self.members.pop(user_id, None)
+        self.overall.remove(user_id)
+        if group_id is not None:
+            self.groups[group_id].remove(user_id)
+
+    def rank(self, user_id, group_id=None):
+        with self.lock:
+            index = self._index(group_id)
+            return index.rank(user_id) if index else None
+
+    def position(self, user_id, group_id=None):
+        with self.lock:
+            index = self._index(group_id)
+            return index.position(user_id) if index else None
+
+    def points_of(self, user_id):
+        with self.lock:
+            return self.overall.points.get(user_id)
+
+    def size(self, group_id=None):
+        with self.lock:
+            index = self._index(group_id)
+            return len(index) if index else 0
+
+    def slice(self, offset, limit, group_id=None):
+        with self.lock:
+            index = self._index(group_id)
+            return index.slice(offset, limit) if index else []
+
+    # Окно рейтинга по курсору (points, id): after — строки после ключа, before — перед ним.
+    # Возвращает (offset, [(место, user_id, points)], всего).
+    def _window(self, per_page, group_id, after, before, page):
+        with self.lock:
+            index = self._index(group_id)
+            if index is None:
+                return 0, [], 0
+            if before:
+                end = index.position_of(*before)
+                offset = max(end - per_page, 0)
+                limit = end - offset
+            else:
+                if after:
+                    offset = index.position_of(after[0], after[1] + 1)
+                else:
+                    offset = (max(page, 1) - 1) * per_page
+                limit = per_page
+            entries = [
+                (rank, user_id, index.points[user_id])
+                for rank, user_id in index.slice(offset, limit)
+            ]
+            return offset, entries, len(index)
+
+    # Окно вместе с курсорами соседних страниц:
+    # (offset, [(место, user_id, points)], всего, next_cursor, prev_cursor)
+    def window(self, per_page, group_id=None, after=None, before=None, page=1):
+        offset, entries, total = self._window(per_page, group_id, after, before, page)
+        next_cursor = prev_cursor = None
+        if entries and offset + len(entries) < total:
+            next_cursor = encode_cursor([entries[-1][2], entries[-1][1]])
+        if entries and offset > 0:
+            prev_cursor = encode_cursor([entries[0][2], entries[0][1]])
+        return offset, entries, total, next_cursor, prev_cursor
+
+    def page(self, per_page, group_id=None, after=None, before=None, page=1):
+        offset, entries, total, next_cursor, prev_cursor = self.window(per_page, group_id, after, before, page)
+        users = {}
+        if entries:
+            users = {
+                user.id: user
+                for user in User.query.filter(User.id.in_([user_id for _, user_id, _ in entries]))
+            }
+
+        entries = [entry for entry in entries if entry[1] in users]
+        return LeaderboardPage(
+            items=[users[user_id] for _, user_id, _ in entries],
+            ranks=[rank for rank, _, _ in entries],
+            points=[points for _, _, points in entries],
+            offset=offset,
+            per_page=per_page,
+            total=total,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor
+        )
+
+
+_lock = threading.Lock()
+
+
+def _state():
+    return site_state('leaderboard', lambda: {'board': None, 'built_at': 0})
+
+
+# Нужна ли пересборка индекса, построенного built_at (time.monotonic()) для версии
+# board_version. Свои коммиты попадают в индекс сразу (_apply_pending), а версия
+# 'points' в БД уходит вперёд из-за других процессов и пакетных импортов: такие
+# изменения подхватываются пересборкой не чаще раза в LEADERBOARD_STALE_SECONDS,
+# чтобы при постоянных записях из соседних воркеров каждое чтение не строило
+# индекс заново. Раз в LEADERBOARD_REBUILD_SECONDS индекс пересобирается в любом случае.
+def needs_rebuild(board_version, built_at, version):
+    age = time.monotonic() - built_at
+    if age > current_app.config.get('LEADERBOARD_REBUILD_SECONDS', 300):
+        return True
+    return board_version != version and age > current_app.config.get('LEADERBOARD_STALE_SECONDS', 5)
+
+
+def get_leaderboard():
+    state = _state()
+    version = current_version('points')
+    with _lock:
+        board = state['board']
+        if board is None or needs_rebuild(board.version, state['built_at'], version):
+            rows = db.session.execute(select(User.id, User.points, User.group_id)).all()
+            state['board'] = Leaderboard(rows, version)
+            state['built_at'] = time.monotonic()
+        return state['board']
+
+
+# Изменения копятся в сессии и попадают в индекс только после успешного коммита
+def _stage(session, change):
+    session.info.setdefault('leaderboard_pending', []).append(change)
+    bump(session, 'points')
+
+
+def stage_points(session, user_id, points):
+    _stage(session, ('points', user_id, points))
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+def _user_changed(mapper, connection, target):
+    _stage(object_session(target), ('set', target.id, target.points, target.group_id))
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _stage(object_session(target), ('remove', target.id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    pending = session.info.pop('leaderboard_pending', None)
+    if not pending or not has_app_context():
+        return
+    board = _state()['board']
+    if board is None:
+        return
+    version = session.info.get('versions_bumped', {}).get('points')
+    with board.lock:
+        changed = {user_id for _, user_id, *_ in pending}
+        before = {user_id: board.rank(user_id) for user_id in changed}
+        for action, user_id, *values in pending:
+            if action == 'set':
+                board.set(user_id, *values)
+            elif action == 'points':
+                board.set_points(user_id, *values)
+            else:
+                board.remove(user_id)
+        # Если между нашими коммитами версию увеличил другой процесс, индекс
+        # остаётся со старой версией и пересоберётся, когда устареет (needs_rebuild)
+        if version == board.version + 1:
+            board.version = version
+        balances = [_balance_event(board, user_id, before[user_id]) for user_id in sorted(changed)]
+
+    for balance in balances:
+        publish('leaderboard', 'balance', balance)
+        if balance['group_id'] is not None:
+            publish(f"leaderboard:{balance['group_id']}", 'balance', balance)
+
+
+# Новый баланс и сдвиг места для страниц рейтинга, открытых через /events/leaderboard
+def _balance_event(board, user_id, previous_rank):
+    group_id = board.members.get(user_id)
+    return {
+        'user_id': user_id,
+        'points': board.points_of(user_id),
+        'group_id': group_id,
+        'rank': board.rank(user_id),
+        'previous_rank': previous_rank,
+        'group_rank': board.rank(user_id, group_id) if group_id is not None else None,
+    }
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('leaderboard_pending', None)
@@ -0,0 +1,35 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, load_only, raiseload
+
+from app.models import Transaction, User
+
+# Профили загрузки для списков, которые выводят шаблоны. Каждый представление
+# явно говорит, какие колонки и связи ему нужны; остальные связи запрещены
+# (raiseload), чтобы случайное обращение из шаблона падало сразу, а не превращалось
+# в запрос на каждую строку.
+
+
+# Выпадающие списки и таблицы учеников: только id, имя и группа
+def user_list():
+    return (load_only(User.id, User.full_name, User.group_id), raiseload('*'))
+
+
+# Управление пользователями: группа подгружается тем же запросом
+def user_admin_list():
+    return (joinedload(User.group), raiseload('*'))
+
+
+# Журнал: имя ученика тем же запросом через JOIN
+def ledger():
+    return (joinedload(Transaction.user).load_only(User.id, User.full_name), raiseload('*'))
+
+
+# Число транзакций пользователя как коррелированный подзапрос по индексу (user_id, created_at)
+def transaction_count():
+    return (
+        select(func.count(Transaction.id))
+        .where(Transaction.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+        .label('transaction_count')
+    )
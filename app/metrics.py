@@ -0,0 +1,218 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from flask import (Blueprint, Response, before_render_template, current_app, g, has_request_context,
+                   request, template_rendered)
+from flask_login import current_user, login_required
+from sqlalchemy import event
+
+# Метрики по маршрутам: время ответа, число SQL-запросов и их суммарное время,
+# время рендеринга шаблонов и размер ответа. Данные хранятся в памяти процесса
+# и отдаются на /metrics в текстовом формате Prometheus (при нескольких воркерах
+# Prometheus опрашивает каждый процесс отдельно или суммирует по instance).
+
+bp = Blueprint('metrics', __name__)
+
+slow_query_log = logging.getLogger('app.slow_query')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, label_values, value):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total, count) in sorted(self.series.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.series = {}
+
+    def inc(self, label_values, value=1):
+        self.series[label_values] = self.series.get(label_values, 0) + value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{{{_labels(self.labels, label_values)}}} {value}')
+        return lines
+
+
+def _labels(names, values):
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter(
+            'app_requests_total', 'Requests by endpoint and status', ('endpoint', 'method', 'status'))
+        self.latency = Histogram(
+            'app_request_duration_seconds', 'Request latency', ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.sql_statements = Histogram(
+            'app_request_sql_statements', 'SQL statements per request', ('endpoint',), COUNT_BUCKETS)
+        self.sql_time = Histogram(
+            'app_request_sql_duration_seconds', 'Total SQL time per request', ('endpoint',), LATENCY_BUCKETS)
+        self.render_time = Histogram(
+            'app_request_render_duration_seconds', 'Template rendering time per request', ('endpoint',),
+            LATENCY_BUCKETS)
+        self.response_size = Histogram(
+            'app_response_size_bytes', 'Response body size', ('endpoint',), SIZE_BUCKETS)
+        self.slow_queries = Counter(
+            'app_slow_queries_total', 'Statements slower than SLOW_QUERY_SECONDS', ('endpoint',))
+
+    def record(self, endpoint, method, status, stats, size):
+        with self.lock:
+            self.requests.inc((endpoint, method, status))
+            self.latency.observe((endpoint, method), stats['duration'])
+            self.sql_statements.observe((endpoint,), stats['sql_count'])
+            self.sql_time.observe((endpoint,), stats['sql_time'])
+            self.render_time.observe((endpoint,), stats['render_time'])
+            if size is not None:
+                self.response_size.observe((endpoint,), size)
+
+    def slow_query(self, endpoint):
+        with self.lock:
+            self.slow_queries.inc((endpoint,))
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for metric in (self.requests, self.latency, self.sql_statements, self.sql_time,
+                           self.render_time, self.response_size, self.slow_queries):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _endpoint():
+    if not has_request_context():
+        return 'cli'
+    return request.endpoint or 'unmatched'
+
+
+def _request_stats():
+    if not has_request_context():
+        return None
+    return g.get('metrics')
+
+
+def _start_request():
+    g.metrics = {'start': time.perf_counter(), 'sql_count': 0, 'sql_time': 0.0,
+                 'render_time': 0.0, 'render_started': []}
+
+
+def _finish_request(response):
+    stats = g.pop('metrics', None)
+    if stats is None:
+        return response
+    stats['duration'] = time.perf_counter() - stats['start']
+    # У потоковых ответов (выгрузки) размер заранее неизвестен
+    size = None if response.is_streamed else response.calculate_content_length()
+    current_app.extensions['metrics'].record(_endpoint(), request.method, response.status_code, stats, size)
+    return response
+
+
+# Форма параметров без самих значений: в журнал не должны попадать пароли и персональные данные
+def _parameter_shape(parameters, executemany):
+    if executemany:
+        rows = list(parameters or ())
+        return f'{len(rows)} x {_parameter_shape(rows[0], False)}' if rows else '[]'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+    return type(parameters).__name__
+
+
+def _listen_engine(app, engine):
+    # Начало хранится в контексте выполнения: если запрос упадёт, after_cursor_execute
+    # не вызовется, и стек на соединении сдвинул бы время всех следующих запросов
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context.metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.metrics_started
+        stats = _request_stats()
+        if stats is not None:
+            stats['sql_count'] += 1
+            stats['sql_time'] += elapsed
+        if elapsed >= app.config.get('SLOW_QUERY_SECONDS', 0.2):
+            endpoint = _endpoint()
+            app.extensions['metrics'].slow_query(endpoint)
+            slow_query_log.warning(
+                'slow query %.1f ms on %s [%s]: %s | params %s',
+                elapsed * 1000, endpoint, engine.url.render_as_string(hide_password=True),
+                ' '.join(statement.split()), _parameter_shape(parameters, executemany)
+            )
+
+
+def _render_started(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None:
+        stats['render_started'].append(time.perf_counter())
+
+
+def _render_finished(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None and stats['render_started']:
+        elapsed = time.perf_counter() - stats['render_started'].pop()
+        # Вложенный render_template уже учтён во внешнем
+        if not stats['render_started']:
+            stats['render_time'] += elapsed
+
+
+def init_metrics(app, db):
+    app.extensions['metrics'] = Registry()
+    with app.app_context():
+        for engine in db.engines.values():
+            _listen_engine(app, engine)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+    app.register_blueprint(bp)
+
+
+@bp.route('/metrics')
+@login_required
+def metrics():
+    if current_user.role != 'admin':
+        return Response('Недостаточно прав\n', status=403, mimetype='text/plain')
+    body = current_app.extensions['metrics'].render()
+    return Response(body, mimetype='text/plain; version=0.0.4')
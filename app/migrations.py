@@ -0,0 +1,111 @@
+import logging
+
+from sqlalchemy import func, inspect, text
+
+from app import db
+from app.daily_points import rebuild as rebuild_daily_points
+from app.database import site_engine
+from app.models import SchemaVersion
+from app.summaries import YEARLY_FIELDS, rebuild as rebuild_summaries
+
+log = logging.getLogger('app.migrations')
+
+# Версионированные миграции схемы. Новые таблицы создаёт metadata.create_all() в базе
+# текущей площадки, а всё, что нужно поменять в уже существующих таблицах, описывается здесь.
+# Каждая миграция идемпотентна и выполняется в отдельной транзакции.
+
+# Перед уникальным индексом убираем дубли недель. Остаётся последняя запись
+# (её учитель сохранил позже всех), каждая удалённая строка с оценками пишется в лог,
+# чтобы её можно было восстановить вручную. Возвращает удалённые строки.
+def _drop_duplicate_weeks(conn):
+    duplicates = conn.execute(text(
+        "SELECT w.id, w.user_id, w.week_start, w.points, w.academic_performance, w.mentoring, "
+        "w.teamwork, w.discipline, latest.id AS kept_id "
+        "FROM weekly_performances w JOIN ("
+        "SELECT user_id, week_start, MAX(id) AS id FROM weekly_performances "
+        "GROUP BY user_id, week_start HAVING COUNT(*) > 1) latest "
+        "ON latest.user_id = w.user_id AND latest.week_start = w.week_start "
+        "WHERE w.id <> latest.id ORDER BY w.user_id, w.week_start, w.id"
+    )).all()
+    for row in duplicates:
+        log.warning(
+            'weekly_performances: dropped duplicate row %s (user %s, week %s, points %s, scores %s/%s/%s/%s), kept row %s',
+            row.id, row.user_id, row.week_start, row.points, row.academic_performance, row.mentoring,
+            row.teamwork, row.discipline, row.kept_id
+        )
+    if duplicates:
+        conn.execute(
+            text("DELETE FROM weekly_performances WHERE id = :id"),
+            [{'id': row.id} for row in duplicates]
+        )
+    return duplicates
+
+
+def _secondary_indexes(conn):
+    _drop_duplicate_weeks(conn)
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_users_username ON users (username)",
+        "CREATE INDEX IF NOT EXISTS ix_users_points ON users (points)",
+        "CREATE INDEX IF NOT EXISTS ix_users_role_group_id ON users (role, group_id)",
+        "CREATE INDEX IF NOT EXISTS ix_users_is_confirmed ON users (is_confirmed)",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_user_id_created_at ON transactions (user_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_transactions_created_at ON transactions (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_competitions_user_id ON competitions (user_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_weekly_performances_user_id_week_start "
+        "ON weekly_performances (user_id, week_start)",
+    ):
+        conn.execute(text(statement))
+
+
+def _yearly_summaries(conn):
+    # Годовые оценки по разделам: форма /award их уже отправляла, а колонок не было
+    existing = {column['name'] for column in inspect(conn).get_columns('yearly_performances')}
+    for field in YEARLY_FIELDS:
+        if field not in existing:
+            conn.execute(text(f"ALTER TABLE yearly_performances ADD COLUMN {field} INTEGER DEFAULT 0"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_yearly_performances_user_id_year ON yearly_performances (user_id, year)"
+    ))
+    # Таблицу user_year_summaries уже создал create_all, здесь только начальное заполнение
+    rebuild_summaries(conn)
+
+
+def _daily_points(conn):
+    # Таблицу daily_points создал create_all, заполняем её из журнала
+    rebuild_daily_points(conn)
+
+
+def _daily_points_window_index(conn):
+    # Индекс по дню, покрывающий суммы за окно; прежний индекс только по дню ему не нужен
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_daily_points_day_user_id_points ON daily_points (day, user_id, points)"
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_daily_points_day"))
+
+
+MIGRATIONS = [
+    (1, 'secondary indexes', _secondary_indexes),
+    (2, 'yearly summaries', _yearly_summaries),
+    (3, 'daily points', _daily_points),
+    (4, 'daily points window index', _daily_points_window_index),
+]
+
+
+def current_version():
+    return db.session.query(func.max(SchemaVersion.version)).scalar() or 0
+
+
+def upgrade():
+    db.metadata.create_all(site_engine(db))
+    version = current_version()
+    db.session.commit()
+
+    applied = []
+    for number, name, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with site_engine(db).begin() as conn:
+            migrate(conn)
+            conn.execute(SchemaVersion.__table__.insert().values(version=number, name=name))
+        applied.append((number, name))
+    return applied
@@ -3,6 +3,8 @@ from datetime import datetime
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
+from app.sites import login_id
+
 class Project(db.Model):
     __tablename__ = 'projects'
     id = db.Column(db.Integer, primary_key=True)
@@ -30,6 +32,12 @@ class Group(db.Model):
 
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_username', 'username'),
+        db.Index('ix_users_points', 'points'),
+        db.Index('ix_users_role_group_id', 'role', 'group_id'),
+        db.Index('ix_users_is_confirmed', 'is_confirmed'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), nullable=False)
     full_name = db.Column(db.String(300), nullable=False)
@@ -53,6 +61,9 @@ class User(db.Model, UserMixin):
     def __repr__(self):
         return f'<User {self.full_name}>'
 
+    def get_id(self):
+        return login_id(self.id)
+
     def set_password(self, password):
         self.password = generate_password_hash(password)
 
@@ -61,6 +72,10 @@ class User(db.Model, UserMixin):
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_transactions_created_at', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     points = db.Column(db.Integer, nullable=False)
@@ -78,6 +93,9 @@ class Transaction(db.Model):
 
 class Competition(db.Model):
     __tablename__ = 'competitions'
+    __table_args__ = (
+        db.Index('ix_competitions_user_id', 'user_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     level = db.Column(db.Integer)
@@ -96,6 +114,9 @@ class Competition(db.Model):
 
 class WeeklyPerformance(db.Model):
     __tablename__ = 'weekly_performances'
+    __table_args__ = (
+        db.Index('ux_weekly_performances_user_id_week_start', 'user_id', 'week_start', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     points = db.Column(db.Integer, nullable=False)
@@ -114,15 +135,119 @@ class WeeklyPerformance(db.Model):
 
 class YearlyPerformance(db.Model):
     __tablename__ = 'yearly_performances'
+    __table_args__ = (
+        db.Index('ix_yearly_performances_user_id_year', 'user_id', 'year'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     points = db.Column(db.Integer, nullable=False)
-    year = db.Column(db.Integer, nullable=False)
+    year = db.Column(db.Integer, nullable=False)  # Учебный год по году начала: 2025 = 2025/2026
+    projects_score = db.Column(db.Integer, default=0)
+    tech_dictation_score = db.Column(db.Integer, default=0)
+    initial_monitoring_score = db.Column(db.Integer, default=0)
+    intermediate_certification_score = db.Column(db.Integer, default=0)
+    final_certification_score = db.Column(db.Integer, default=0)
 
     user = db.relationship("User", back_populates="yearly_performances", foreign_keys=[user_id])
 
     def __repr__(self):
         return f'<YearlyPerformance {self.id}>'
-    
 
-    
\ No newline at end of file
+# Итоги ученика за учебный год. Поддерживаются app.summaries при каждой записи
+# конкурсов, недельных и годовых оценок, страница наград читает только их.
+class UserYearSummary(db.Model):
+    __tablename__ = 'user_year_summaries'
+    __table_args__ = (
+        db.Index('ux_user_year_summaries_user_id_academic_year', 'user_id', 'academic_year', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    academic_year = db.Column(db.Integer, nullable=False)
+    competitions_count = db.Column(db.Integer, nullable=False, default=0)
+    competitions_points = db.Column(db.Integer, nullable=False, default=0)
+    weeks_count = db.Column(db.Integer, nullable=False, default=0)
+    academic_performance = db.Column(db.Integer, nullable=False, default=0)
+    mentoring = db.Column(db.Integer, nullable=False, default=0)
+    teamwork = db.Column(db.Integer, nullable=False, default=0)
+    discipline = db.Column(db.Integer, nullable=False, default=0)
+    weekly_points = db.Column(db.Integer, nullable=False, default=0)
+    projects_score = db.Column(db.Integer, nullable=False, default=0)
+    tech_dictation_score = db.Column(db.Integer, nullable=False, default=0)
+    initial_monitoring_score = db.Column(db.Integer, nullable=False, default=0)
+    intermediate_certification_score = db.Column(db.Integer, nullable=False, default=0)
+    final_certification_score = db.Column(db.Integer, nullable=False, default=0)
+    yearly_points = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UserYearSummary {self.user_id} {self.academic_year}>'
+
+# Сумма изменений очков пользователя за день (по created_at транзакций, UTC).
+# Поддерживается app.daily_points при каждой записи в журнал; рейтинги за
+# неделю, месяц и учебный год суммируют эти строки, а не весь журнал.
+class DailyPoints(db.Model):
+    __tablename__ = 'daily_points'
+    __table_args__ = (
+        db.Index('ux_daily_points_user_id_day', 'user_id', 'day', unique=True),
+        # Рейтинг за окно читает диапазон дней из индекса, не трогая таблицу
+        db.Index('ix_daily_points_day_user_id_points', 'day', 'user_id', 'points'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    points = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailyPoints {self.user_id} {self.day}={self.points}>'
+
+# Счётчики изменений наборов данных ('points', 'transactions'): растут в той же
+# транзакции, что и сами данные, и служат ключом для ETag и кэша фрагментов.
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DataVersion {self.name}={self.version}>'
+
+# Фоновые задачи (app.jobs). idempotency_key уникален: повторная постановка задачи
+# с тем же ключом ничего не делает, даже если первая уже выполнена.
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    idempotency_key = db.Column(db.String(200), unique=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    last_error = db.Column(db.Text)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.name} {self.status}>'
+
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_version'
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SchemaVersion {self.version}>'
+
+class SeedVersion(db.Model):
+    __tablename__ = 'seed_version'
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SeedVersion {self.version}>'
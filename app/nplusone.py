@@ -0,0 +1,66 @@
+import logging
+import re
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Детектор N+1: считает запросы одной формы в рамках HTTP-запроса. Если одна и та же
+# форма выполнилась больше N_PLUS_ONE_THRESHOLD раз, это почти наверняка ленивая
+# загрузка в цикле. Режим N_PLUS_ONE:
+#   'raise' — сразу бросить NPlusOneDetected (по умолчанию при TESTING), трассировка
+#             указывает на место в шаблоне или коде, где идёт загрузка;
+#   'log'   — предупреждение в журнал app.nplusone (по умолчанию в debug);
+#   None    — выключено.
+
+log = logging.getLogger('app.nplusone')
+
+_PARAMS = re.compile(r'%\(\w+\)s|\$\d+|\?')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+class NPlusOneDetected(Exception):
+    pass
+
+
+# Форма запроса: параметры заменены на ?, списки IN (?, ?, ...) свёрнуты
+def statement_shape(statement):
+    shape = _PARAMS.sub('?', statement)
+    shape = _IN_LIST.sub('(?)', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+def _mode(app):
+    if 'N_PLUS_ONE' in app.config:
+        return app.config['N_PLUS_ONE']
+    if app.testing:
+        return 'raise'
+    if app.debug:
+        return 'log'
+    return None
+
+
+def _listen_engine(app, engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not has_request_context():
+            return
+        mode = _mode(app)
+        if not mode:
+            return
+        shapes = g.setdefault('statement_shapes', {})
+        shape = statement_shape(statement)
+        count = shapes[shape] = shapes.get(shape, 0) + 1
+        threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 5)
+        if count != threshold + 1:
+            return
+        message = f'{request.method} {request.path} ({request.endpoint}) ran {count} times: {shape}'
+        if mode == 'raise':
+            raise NPlusOneDetected(message)
+        log.warning('possible N+1: %s', message)
+
+
+def init_nplusone(app, db):
+    with app.app_context():
+        for engine in db.engines.values():
+            _listen_engine(app, engine)
@@ -0,0 +1,141 @@
+import base64
+import json
+import threading
+import time
+from datetime import date, datetime
+
+from flask import current_app, request
+from sqlalchemy import and_, or_
+
+from app import db
+from app.sites import site_state
+
+
+# Постраничный вывод по ключу (keyset): вместо OFFSET следующая страница начинается
+# сразу после последней строки текущей, поэтому глубокие страницы не дороже первой.
+
+def encode_cursor(values):
+    raw = json.dumps([value.isoformat() if isinstance(value, (date, datetime)) else value
+                      for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, types):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+        if len(values) != len(types):
+            return None
+        return [
+            python_type.fromisoformat(value) if python_type in (date, datetime) else python_type(value)
+            for python_type, value in zip(types, values)
+        ]
+    except (ValueError, TypeError):
+        return None
+
+
+# Условие «строка стоит после ключа» для порядка ordering = [(колонка, по убыванию)]
+def _beyond(ordering, values, reverse):
+    (column, descending), *rest = ordering
+    value, *rest_values = values
+    beyond = column < value if descending != reverse else column > value
+    if not rest:
+        return beyond
+    return or_(beyond, and_(column == value, _beyond(rest, rest_values, reverse)))
+
+
+def _order_by(ordering, reverse):
+    return [
+        column.desc() if descending != reverse else column.asc()
+        for column, descending in ordering
+    ]
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, prev_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.has_next = next_cursor is not None
+        self.has_prev = prev_cursor is not None
+
+
+# Общая часть постраничного вывода: fetch(условие, порядок, limit) читает строки,
+# key_of(строка) возвращает значения ключа для курсора
+def _paginate(fetch, key_of, ordering, per_page, after, before):
+    types = [column.type.python_type for column, _ in ordering]
+
+    before_values = decode_cursor(before, types)
+    after_values = None if before_values else decode_cursor(after, types)
+
+    if before_values:
+        rows = fetch(_beyond(ordering, before_values, reverse=True), _order_by(ordering, reverse=True), per_page + 1)
+        has_prev = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        has_next = True
+    else:
+        condition = _beyond(ordering, after_values, reverse=False) if after_values else None
+        rows = fetch(condition, _order_by(ordering, reverse=False), per_page + 1)
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev = after_values is not None
+
+    return KeysetPage(
+        items=items,
+        next_cursor=encode_cursor(key_of(items[-1])) if items and has_next else None,
+        prev_cursor=encode_cursor(key_of(items[0])) if items and has_prev else None
+    )
+
+
+# after/before — курсоры из предыдущего ответа; без них отдаётся первая страница
+def keyset_paginate(query, ordering, per_page, after=None, before=None):
+    def fetch(condition, order_by, limit):
+        filtered = query if condition is None else query.filter(condition)
+        return filtered.order_by(*order_by).limit(limit).all()
+
+    def key_of(item):
+        return [getattr(item, column.key) for column, _ in ordering]
+
+    return _paginate(fetch, key_of, ordering, per_page, after, before)
+
+
+# То же для Core select: строки возвращаются кортежами без создания ORM-объектов.
+# Колонки ключа добавляются в конец выборки под своими метками, так что
+# первые колонки строки — ровно то, что запросил вызывающий.
+def keyset_select(stmt, ordering, per_page, after=None, before=None):
+    labels = [f'cursor_{i}' for i in range(len(ordering))]
+    stmt = stmt.add_columns(*(column.label(label) for (column, _), label in zip(ordering, labels)))
+
+    def fetch(condition, order_by, limit):
+        filtered = stmt if condition is None else stmt.where(condition)
+        return db.session.execute(filtered.order_by(*order_by).limit(limit)).all()
+
+    def key_of(row):
+        return [getattr(row, label) for label in labels]
+
+    return _paginate(fetch, key_of, ordering, per_page, after, before)
+
+
+# Общее число строк считается не на каждой странице, а раз в PAGINATION_COUNT_TTL секунд
+def cached_count(name, query):
+    ttl = current_app.config.get('PAGINATION_COUNT_TTL', 60)
+    now = time.monotonic()
+    counts = site_state('pagination_counts', lambda: {'lock': threading.Lock(), 'values': {}})
+    with counts['lock']:
+        cached = counts['values'].get(name)
+        if cached and now - cached[1] < ttl:
+            return cached[0]
+    total = query.order_by(None).count()
+    with counts['lock']:
+        counts['values'][name] = (total, now)
+    return total
+
+
+def wants_json():
+    if request.args.get('format') == 'json':
+        return True
+    best = request.accept_mimetypes.best_match(['text/html', 'application/json'])
+    return best == 'application/json' and request.accept_mimetypes[best] > request.accept_mimetypes['text/html']
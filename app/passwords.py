@@ -0,0 +1,103 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Хеширование и проверка паролей в отдельном пуле процессов. KDF из werkzeug
+# намеренно тяжёлый для процессора, и без пула волна входов в начале урока
+# занимает воркер целиком. Очередь ограничена: если все места заняты дольше
+# PASSWORD_POOL_WAIT секунд, запрос получает PoolBusy вместо бесконечного ожидания.
+#
+# Пакетное хеширование (импорт из /import) идёт через ту же очередь, но держит
+# в ней не больше PASSWORD_POOL_BATCH задач, так что вход не ждёт весь файл.
+#
+# PASSWORD_POOL_WORKERS = 0 отключает пул (хеширование прямо в запросе).
+
+
+class PoolBusy(Exception):
+    pass
+
+
+class PasswordPool:
+    def __init__(self, workers, queue_size, wait, batch):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(queue_size)
+        self.wait = wait
+        # Хотя бы одно место в очереди всегда остаётся входам
+        self.batch = max(min(batch, queue_size - 1), 1)
+
+    # timeout=None — ждать места в очереди сколько потребуется
+    def _submit(self, fn, *args, timeout=None):
+        if not self.slots.acquire(timeout=timeout):
+            raise PoolBusy()
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def run(self, fn, *args):
+        return self._submit(fn, *args, timeout=self.wait).result()
+
+    # Пакет не отказывает по PoolBusy, а ждёт своей очереди; в пуле одновременно
+    # не больше self.batch его задач, остальные места остаются входам
+    def map(self, fn, items):
+        results = []
+        pending = deque()
+        for item in items:
+            if len(pending) >= self.batch:
+                results.append(pending.popleft().result())
+            pending.append(self._submit(fn, item))
+        results.extend(future.result() for future in pending)
+        return results
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool():
+    workers = current_app.config.get('PASSWORD_POOL_WORKERS', os.cpu_count() or 1)
+    if not workers:
+        return None
+    # Пул создаётся лениво в каждом процессе (после fork у gunicorn) и не переживает fork
+    key = (os.getpid(), id(current_app._get_current_object()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = PasswordPool(
+                workers=workers,
+                queue_size=current_app.config.get('PASSWORD_POOL_QUEUE', workers * 4),
+                wait=current_app.config.get('PASSWORD_POOL_WAIT', 2),
+                batch=current_app.config.get('PASSWORD_POOL_BATCH', max(workers // 2, 1))
+            )
+    return pool
+
+
+def hash_password(password):
+    pool = _get_pool()
+    if pool is None:
+        return generate_password_hash(password)
+    return pool.run(generate_password_hash, password)
+
+
+def verify_password(password_hash, password):
+    pool = _get_pool()
+    if pool is None:
+        return check_password_hash(password_hash, password)
+    return pool.run(check_password_hash, password_hash, password)
+
+
+# Пакетное хеширование (импорт, начальное заполнение): параллельно, но не больше
+# PASSWORD_POOL_BATCH паролей в пуле одновременно (см. PasswordPool.map)
+def hash_passwords(passwords):
+    pool = _get_pool()
+    if pool is None:
+        return [generate_password_hash(password) for password in passwords]
+    return pool.map(generate_password_hash, passwords)
@@ -0,0 +1,195 @@
+from app import db
+from app.caching import bump
+from app.database import site_engine
+from app.events import stage as stage_event
+from app.models import User, WeeklyPerformance
+from app.summaries import academic_year, mark
+from sqlalchemy import and_, exists, insert, select
+from sqlalchemy.exc import IntegrityError
+
+
+def _grid_query(students_query, week_start):
+    # Один запрос: ученики + их запись за неделю (если есть)
+    return (
+        students_query
+        .outerjoin(
+            WeeklyPerformance,
+            and_(
+                WeeklyPerformance.user_id == User.id,
+                WeeklyPerformance.week_start == week_start
+            )
+        )
+        .add_entity(WeeklyPerformance)
+        .order_by(User.id)
+    )
+
+
+def empty_week_row(user_id, week_start):
+    return dict(
+        user_id=user_id,
+        week_start=week_start,
+        week=week_start.isocalendar()[1],
+        year=week_start.year,
+        points=0,
+        academic_performance=0,
+        mentoring=0,
+        teamwork=0,
+        discipline=0
+    )
+
+
+# Возвращает [(student, weekly_perf)] за неделю, недостающие записи создаются одной вставкой
+def load_week_grid(students_query, week_start):
+    rows = _grid_query(students_query, week_start).all()
+
+    missing = [student.id for student, weekly_perf in rows if weekly_perf is None]
+    if missing:
+        try:
+            db.session.execute(
+                insert(WeeklyPerformance),
+                [empty_week_row(user_id, week_start) for user_id in missing]
+            )
+            db.session.commit()
+        except IntegrityError:
+            # Параллельный запрос уже создал эти записи — просто перечитываем
+            db.session.rollback()
+        rows = _grid_query(students_query, week_start).all()
+
+    return rows
+
+
+WEEK_FIELDS = ('academic_performance', 'mentoring', 'teamwork', 'discipline')
+
+# Допустимые значения оценок, как в форме weekly_performance.html
+WEEK_FIELD_LIMITS = {'academic_performance': 2, 'mentoring': 2, 'teamwork': 1, 'discipline': 1}
+
+
+def week_row_json(weekly_perf):
+    result = {'student_id': weekly_perf.user_id, 'points': weekly_perf.points}
+    for field in WEEK_FIELDS:
+        result[field] = getattr(weekly_perf, field)
+    return result
+
+
+# Изменённые ячейки уходят после коммита открытым сеткам (/events/weekly):
+# всем сразу и каждой группе — только её ученики. Без SSE сетки опрашивают
+# страницу по ETag, поэтому любое изменение ячеек сдвигает версию 'grid'.
+def stage_cells(week_start, rows):
+    if not rows:
+        return
+    bump(db.session, 'grid')
+    rows = [dict(row, student_id=int(row['student_id'])) for row in rows]
+    groups = dict(db.session.execute(
+        select(User.id, User.group_id).where(User.id.in_({row['student_id'] for row in rows}))
+    ).all())
+    stage_event(db.session, 'grid', 'cells', {'week_start': week_start.isoformat(), 'rows': rows})
+    by_group = {}
+    for row in rows:
+        if groups.get(row['student_id']) is not None:
+            by_group.setdefault(groups[row['student_id']], []).append(row)
+    for group_id, group_rows in sorted(by_group.items()):
+        stage_event(db.session, f'grid:{group_id}', 'cells',
+                    {'week_start': week_start.isoformat(), 'rows': group_rows})
+
+
+# Применяет пачку правок [(student_id, field, value)] за неделю одной транзакцией.
+# Возвращает затронутые записи WeeklyPerformance с пересчитанными очками.
+def apply_week_edits(week_start, edits):
+    student_ids = {student_id for student_id, _, _ in edits}
+
+    # Недостающие записи создаются через ON CONFLICT DO NOTHING: если параллельный
+    # запрос успел вставить ту же неделю, вставка просто пропускается, а не падает
+    # на уникальном индексе (user_id, week_start)
+    db.session.execute(
+        _insert_missing_statement(),
+        [empty_week_row(student_id, week_start) for student_id in sorted(student_ids)]
+    )
+    rows = {
+        weekly_perf.user_id: weekly_perf
+        for weekly_perf in WeeklyPerformance.query.filter(
+            WeeklyPerformance.user_id.in_(student_ids),
+            WeeklyPerformance.week_start == week_start
+        )
+    }
+
+    for student_id, field, value in edits:
+        setattr(rows[student_id], field, value)
+
+    touched = [rows[student_id] for student_id in sorted(student_ids)]
+    for weekly_perf in touched:
+        weekly_perf.points = sum(getattr(weekly_perf, field) or 0 for field in WEEK_FIELDS)
+
+    stage_cells(week_start, [week_row_json(weekly_perf) for weekly_perf in touched])
+    db.session.commit()
+    return touched
+
+
+def _upsert_statement():
+    if site_engine(db).dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(WeeklyPerformance.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=['user_id', 'week_start'],
+        set_={field: stmt.excluded[field] for field in WEEK_FIELDS + ('points',)}
+    )
+
+
+# Вставка или обновление готовых строк недели (dict с user_id, week_start и оценками)
+# одним пакетным INSERT ... ON CONFLICT по уникальному индексу (user_id, week_start)
+def upsert_week_rows(rows):
+    if not rows:
+        return
+    values = []
+    for row in rows:
+        value = empty_week_row(row['user_id'], row['week_start'])
+        value.update({field: row[field] for field in WEEK_FIELDS})
+        value['points'] = sum(value[field] for field in WEEK_FIELDS)
+        values.append(value)
+    db.session.execute(_upsert_statement(), values)
+    weeks = {}
+    for value in values:
+        mark(db.session, [value['user_id']], academic_year(value['week_start']))
+        weeks.setdefault(value['week_start'], []).append(
+            dict({field: value[field] for field in WEEK_FIELDS}, student_id=value['user_id'], points=value['points'])
+        )
+    for week_start, week_rows in sorted(weeks.items()):
+        stage_cells(week_start, week_rows)
+
+
+CHUNK_SIZE = 500
+
+
+def _insert_missing_statement():
+    if site_engine(db).dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(WeeklyPerformance.__table__).on_conflict_do_nothing(
+        index_elements=['user_id', 'week_start']
+    )
+
+
+# Создаёт пустые записи недели для всех учеников, у которых их ещё нет.
+# Выполняется фоновой задачей перед началом недели, чтобы первый учитель,
+# открывший сетку, не платил за вставку записей всего потока.
+def precreate_week(week_start):
+    missing = db.session.execute(
+        select(User.id)
+        .where(
+            User.role == 'student',
+            ~exists().where(
+                WeeklyPerformance.user_id == User.id,
+                WeeklyPerformance.week_start == week_start
+            )
+        )
+        .order_by(User.id)
+    ).scalars().all()
+    for start in range(0, len(missing), CHUNK_SIZE):
+        db.session.execute(
+            _insert_missing_statement(),
+            [empty_week_row(user_id, week_start) for user_id in missing[start:start + CHUNK_SIZE]]
+        )
+    return len(missing)
+
@@ -0,0 +1,128 @@
+from datetime import datetime
+
+from sqlalchemy import case, insert, select, update
+
+from app import db
+from app.caching import bump
+from app.daily_points import record as record_daily
+from app.leaderboard import stage_points
+from app.models import Competition, Transaction, User
+from app.summaries import academic_year, mark
+
+
+# Все изменения очков идут через этот модуль: атомарный UPDATE points = points + delta
+# и запись в журнал транзакций в той же транзакции БД. Коммит делает вызывающий код.
+
+def _new_points(delta, floor):
+    value = User.points + delta
+    if floor is None:
+        return value
+    return case((value < floor, floor), else_=value)
+
+
+# Балансы до изменения нужны только при нижней границе: если она срезала изменение,
+# в журнал пишется фактически применённая разница, а не запрошенная.
+# Строки блокируются до UPDATE (на SQLite транзакция с устаревшим снимком
+# просто не получит блокировку записи).
+def _balances_before(user_ids, floor):
+    if floor is None:
+        return None
+    return dict(db.session.execute(
+        select(User.id, User.points).where(User.id.in_(user_ids)).with_for_update()
+    ).all())
+
+
+def _applied(user_id, points, delta, before):
+    if before is None:
+        return delta
+    return points - (before.get(user_id) or 0)
+
+
+# deltas — {user_id: изменение}
+def _log(deltas, transaction_type, reason, comment, awarded_by_id):
+    if not deltas:
+        return
+    bump(db.session, 'points', 'transactions')
+    db.session.execute(insert(Transaction), [
+        dict(
+            user_id=user_id,
+            points=delta,
+            transaction_type=transaction_type,
+            reason=reason,
+            comment=comment,
+            awarded_by_id=awarded_by_id
+        )
+        for user_id, delta in sorted(deltas.items())
+    ])
+    record_daily(db.session, deltas)
+
+
+# Меняет очки одного пользователя. Возвращает строку (id, points, full_name)
+# с новым балансом или None, если пользователь не найден.
+def change_points(user_id, delta, transaction_type, reason=None, comment=None,
+                  awarded_by_id=None, floor=None):
+    before = _balances_before([user_id], floor)
+    row = db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(points=_new_points(delta, floor))
+        .returning(User.id, User.points, User.full_name)
+    ).first()
+    if row is None:
+        return None
+
+    _log({row.id: _applied(row.id, row.points, delta, before)},
+         transaction_type, reason, comment, awarded_by_id)
+    stage_points(db.session, row.id, row.points)
+    return row
+
+
+# Одинаковое изменение очков сразу для многих пользователей: один UPDATE ... WHERE id IN (...)
+# и одна пакетная вставка транзакций. Возвращает {user_id: новый баланс}.
+def change_points_many(user_ids, delta, transaction_type, reason=None, comment=None,
+                       awarded_by_id=None, floor=None):
+    if not user_ids:
+        return {}
+
+    before = _balances_before(user_ids, floor)
+    rows = db.session.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(points=_new_points(delta, floor))
+        .returning(User.id, User.points)
+    ).all()
+    balances = {row.id: row.points for row in rows}
+
+    _log({user_id: _applied(user_id, points, delta, before) for user_id, points in balances.items()},
+         transaction_type, reason, comment, awarded_by_id)
+    for user_id, points in balances.items():
+        stage_points(db.session, user_id, points)
+    return balances
+
+
+# Награждение за конкурс сразу многих учеников: пакетная вставка Competition,
+# затем одно изменение очков для всех. Возвращает {user_id: новый баланс}.
+def award_competition(student_ids, name, level, quality, place, comment=None, awarded_by_id=None):
+    if not student_ids:
+        return {}
+
+    db.session.execute(insert(Competition), [
+        dict(
+            name=name,
+            level=level,
+            project_quality=quality,
+            place=place,
+            user_id=student_id,
+            awarded_by_id=awarded_by_id
+        )
+        for student_id in student_ids
+    ])
+    mark(db.session, student_ids, academic_year(datetime.utcnow()))
+    return change_points_many(
+        student_ids,
+        level + quality + place,
+        'reward',
+        reason=f"Участие в конкурсе: {name}",
+        comment=comment,
+        awarded_by_id=awarded_by_id
+    )
@@ -0,0 +1,168 @@
+import re
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from app import db
+from app.daily_points import WINDOWS, get_window_leaderboard
+from app.leaderboard import get_leaderboard
+from app.synthetic import SYNTHETIC_PASSWORD
+
+# Таблицы, которые растут вместе с числом учеников и журналом.
+# Полный просмотр маленьких справочников (groups, schema_version) допустим.
+HOT_TABLES = {'users', 'transactions', 'weekly_performances', 'competitions',
+              'daily_points', 'user_year_summaries', 'yearly_performances'}
+
+# SCAN в плане SQLite — проход по всей таблице, в том числе в порядке индекса
+# (SCAN t USING [COVERING] INDEX i): без условия поиска (col=? / col>?) индекс
+# только задаёт порядок, а читаются все строки. \b не даёт регулярке укоротить
+# имя таблицы (users -> user), чтобы обойти отрицательную проверку.
+_SQLITE_SCAN = re.compile(r'\bSCAN (\w+)\b(?![^\n]*\(\w+[<>=])')
+# Проход в порядке индекса под LIMIT останавливается после LIMIT строк (страница журнала)
+_SQLITE_ORDERED_SCAN = re.compile(r'\bSCAN (\w+) USING (?:COVERING )?INDEX \w+$')
+_LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+# Общее число строк для пагинации читает таблицу целиком, но не чаще раза
+# в PAGINATION_COUNT_TTL секунд на процесс (pagination.cached_count)
+_CACHED_COUNT = re.compile(r'^\s*SELECT count\(\*\) AS count_1\s', re.IGNORECASE)
+_POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def _week_start():
+    today = date.today()
+    return (today - timedelta(days=today.weekday())).isoformat()
+
+
+# Маршруты блюпринта, которые прогоняются под нагрузочными данными: (логин, метод, url, данные)
+def hot_routes():
+    week_start = _week_start()
+    return [
+        ('teacher', 'GET', '/top_users', None),
+        ('teacher', 'GET', '/top_users?group_id=1&page=2', None),
+        ('teacher', 'GET', '/top_users?window=week&group_id=1', None),
+        ('teacher', 'GET', '/points', None),
+        ('teacher', 'GET', '/transactions', None),
+        ('teacher', 'GET', '/transactions?format=json', None),
+        ('teacher', 'GET', f'/weekly_performance?date={week_start}', None),
+        ('teacher', 'GET', f'/weekly_performance?date={week_start}&group_id=1', None),
+        ('teacher', 'GET', '/reward_punish', None),
+        ('teacher', 'GET', '/award_points', None),
+        ('teacher', 'GET', '/user/5/awards', None),
+        ('teacher', 'GET', '/user/5/awards?history=competitions', None),
+        ('teacher', 'GET', '/api/v1/leaderboard?group_id=1', None),
+        ('teacher', 'GET', '/api/v1/users/5/transactions?limit=5', None),
+        ('teacher', 'GET', f'/api/v1/weeks/{week_start}?group_id=1', None),
+        ('teacher', 'GET', '/api/v1/groups/1/roster?fields=id,full_name', None),
+        ('teacher', 'POST', '/update_weekly_performance_batch', {'json': {
+            'week_start': week_start,
+            'edits': [{'student_id': 5, 'field': 'mentoring', 'value': 1}],
+        }}),
+        ('teacher', 'POST', '/submit_reward_penalty', {'json': {
+            'student_id': 5, 'action': 'reward', 'points': 1, 'reason': 'query plan check',
+        }}),
+        ('teacher', 'POST', '/award_points', {'data': {
+            'user_id': 6, 'points': 1, 'reason': 'query plan check', 'transaction_type': 'award',
+        }}),
+        ('teacher', 'POST', '/reward_punish', {'data': {
+            'award_group_ids': ['1'], 'competition_name': 'query plan check', 'project_name': '-',
+            'level': 1, 'quality': 1, 'place': 1, 'comment': '',
+        }}),
+        ('admin', 'GET', '/confirm_users', None),
+    ]
+
+
+@contextmanager
+def capture_statements(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def explain(conn, statement, parameters):
+    if conn.dialect.name == 'sqlite':
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+        return [row[-1] for row in rows]
+    rows = conn.exec_driver_sql('EXPLAIN ' + statement, parameters).all()
+    return [row[0] for row in rows]
+
+
+def full_scans(dialect, plan, limited=False):
+    pattern = _SQLITE_SCAN if dialect == 'sqlite' else _POSTGRES_SCAN
+    return sorted({
+        match.group(1)
+        for line in plan
+        if not (limited and dialect == 'sqlite' and _SQLITE_ORDERED_SCAN.search(line))
+        for match in pattern.finditer(line)
+        if match.group(1) in HOT_TABLES
+    })
+
+
+def _login(client, username):
+    client.post('/login', data={'username': username, 'password': SYNTHETIC_PASSWORD})
+
+
+def _explain_all(engine, route, statements):
+    problems = []
+    with engine.connect() as conn:
+        if conn.dialect.name == 'postgresql':
+            # На маленьких таблицах Postgres и так выберет seq scan — запрещаем его,
+            # чтобы в плане он остался только там, где подходящего индекса нет
+            conn.exec_driver_sql('SET enable_seqscan = off')
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+                continue
+            if _CACHED_COUNT.match(statement):
+                continue
+            plan = explain(conn, statement, parameters)
+            tables = full_scans(conn.dialect.name, plan, limited=bool(_LIMIT.search(statement)))
+            if tables:
+                problems.append((route, statement, tables, plan))
+    return problems
+
+
+# Прогоняет маршруты через тестовый клиент, собирает все выполненные запросы
+# и строит для них план. Возвращает список (маршрут, запрос, таблицы, план)
+# для запросов, которые читают большую таблицу целиком, для упавших маршрутов
+# и для маршрутов с N+1 (одна форма запроса больше N_PLUS_ONE_THRESHOLD раз).
+def check_routes(app):
+    problems = []
+    clients = {}
+
+    with app.app_context():
+        engine = db.engine
+        # Индексы рейтингов строятся полным проходом по ученикам один раз, а не на каждом
+        # запросе маршрута. Что рейтинг за окно читает только строки окна, проверяет
+        # отдельный тест плана (tests/test_daily_points.py)
+        get_leaderboard()
+        for window in WINDOWS:
+            if window != 'all':
+                get_window_leaderboard(window)
+
+    for username, method, url, payload in hot_routes():
+        client = clients.get(username)
+        if client is None:
+            client = clients[username] = app.test_client()
+            with capture_statements(engine) as statements:
+                _login(client, username)
+            problems += _explain_all(engine, 'POST /login', statements)
+
+        # Приложение запущено с TESTING: исключения (в том числе NPlusOneDetected)
+        # долетают сюда, а не превращаются в 500
+        with capture_statements(engine) as statements:
+            try:
+                response = client.open(url, method=method, **(payload or {}))
+            except Exception as exc:
+                problems.append((f'{method} {url}', None, [], [f'{type(exc).__name__}: {exc}']))
+                continue
+        if response.status_code >= 500:
+            problems.append((f'{method} {url}', None, [], [f'HTTP {response.status_code}']))
+        problems += _explain_all(engine, f'{method} {url}', statements)
+    return problems
@@ -0,0 +1,150 @@
+from datetime import datetime
+
+from sqlalchemy import func, insert, literal, select, update
+
+from app import db
+from app.caching import bump
+from app.daily_points import refresh as refresh_daily_points
+from app.models import Transaction, User, UserYearSummary
+
+# Сверка денормализованного User.points с журналом транзакций.
+# Ожидаемый баланс — сумма Transaction.points пользователя. Пользователи читаются
+# пачками по id, для каждой пачки суммы считаются сгруппированными запросами по
+# диапазону id (индекс (user_id, created_at)), так что проход линейный по журналу
+# и не зависит от числа пользователей. Очки за конкурсы и недели берутся из
+# user_year_summaries и выводятся в отчёте для разбора расхождений.
+
+CHUNK_SIZE = 5000
+
+ADJUSTMENT_TYPE = 'adjustment'
+ADJUSTMENT_REASON = 'Сверка баланса с журналом'
+
+
+class Drift:
+    def __init__(self, user_id, full_name, points, ledger, competitions, weekly):
+        self.user_id = user_id
+        self.full_name = full_name
+        self.points = points
+        self.ledger = ledger
+        self.competitions = competitions
+        self.weekly = weekly
+        self.delta = points - ledger
+
+
+class ReconcileReport:
+    def __init__(self):
+        self.users = 0
+        self.drifts = []
+        self.repaired = 0
+
+    @property
+    def total_delta(self):
+        return sum(drift.delta for drift in self.drifts)
+
+
+def _sums(stmt):
+    return dict(db.session.execute(stmt).all())
+
+
+def _chunk_drifts(users):
+    low, high = users[0].id, users[-1].id
+    ledger = _sums(
+        select(Transaction.user_id, func.sum(Transaction.points))
+        .where(Transaction.user_id.between(low, high))
+        .group_by(Transaction.user_id)
+    )
+    awards = {
+        row.user_id: row
+        for row in db.session.execute(
+            select(
+                UserYearSummary.user_id,
+                func.sum(UserYearSummary.competitions_points).label('competitions'),
+                func.sum(UserYearSummary.weekly_points).label('weekly'),
+            )
+            .where(UserYearSummary.user_id.between(low, high))
+            .group_by(UserYearSummary.user_id)
+        )
+    }
+    drifts = []
+    for user in users:
+        expected = ledger.get(user.id) or 0
+        if (user.points or 0) == expected:
+            continue
+        award = awards.get(user.id)
+        drifts.append(Drift(
+            user.id, user.full_name, user.points or 0, expected,
+            award.competitions if award else 0,
+            award.weekly if award else 0,
+        ))
+    return drifts
+
+
+# Баланс := сумма журнала. Пересчёт одним UPDATE с коррелированным подзапросом,
+# поэтому транзакции, записанные после чтения пачки, тоже учитываются.
+def _repair_points(user_ids):
+    ledger = (
+        select(func.coalesce(func.sum(Transaction.points), 0))
+        .where(Transaction.user_id == User.id)
+        .scalar_subquery()
+    )
+    db.session.execute(update(User).where(User.id.in_(user_ids)).values(points=ledger))
+    bump(db.session, 'points')
+
+
+# Журнал := баланс. Для каждого расхождения пишется корректирующая транзакция
+# на разницу, сами балансы не меняются.
+def _repair_ledger(user_ids, awarded_by_id):
+    now = datetime.utcnow()
+    ledger = (
+        select(Transaction.user_id, func.sum(Transaction.points).label('total'))
+        .where(Transaction.user_id.in_(user_ids))
+        .group_by(Transaction.user_id)
+        .subquery()
+    )
+    delta = User.points - func.coalesce(ledger.c.total, 0)
+    db.session.execute(insert(Transaction).from_select(
+        ['user_id', 'points', 'transaction_type', 'reason', 'awarded_by_id', 'created_at'],
+        select(
+            User.id,
+            delta,
+            literal(ADJUSTMENT_TYPE),
+            literal(ADJUSTMENT_REASON),
+            literal(awarded_by_id, type_=User.id.type),
+            literal(now, type_=Transaction.created_at.type),
+        )
+        .select_from(User)
+        .outerjoin(ledger, ledger.c.user_id == User.id)
+        .where(User.id.in_(user_ids), delta != 0)
+    ))
+    refresh_daily_points(db.session, user_ids, now.date())
+    bump(db.session, 'transactions')
+
+
+# repair: None — только отчёт, 'points' — исправить балансы, 'ledger' — дописать журнал.
+# Каждая пачка проверяется и исправляется в своей транзакции.
+def reconcile(repair=None, chunk_size=CHUNK_SIZE, awarded_by_id=None):
+    report = ReconcileReport()
+    last_id = 0
+    while True:
+        users = db.session.execute(
+            select(User.id, User.full_name, User.points)
+            .where(User.id > last_id)
+            .order_by(User.id)
+            .limit(chunk_size)
+        ).all()
+        if not users:
+            break
+        last_id = users[-1].id
+        report.users += len(users)
+
+        drifts = _chunk_drifts(users)
+        report.drifts.extend(drifts)
+        if drifts and repair:
+            user_ids = [drift.user_id for drift in drifts]
+            if repair == 'points':
+                _repair_points(user_ids)
+            else:
+                _repair_ledger(user_ids, awarded_by_id)
+            report.repaired += len(user_ids)
+        db.session.commit()
+    return report
@@ -1,11 +1,24 @@
 from flask import jsonify, Blueprint, render_template, request, redirect, url_for, flash, session
 from flask_login import login_user, login_required, logout_user, current_user
 from app import db
-from app.models import User, Group, Transaction, WeeklyPerformance, Project
-from werkzeug.security import check_password_hash
-from sqlalchemy import func, desc
+from app.models import User, Group, Transaction, WeeklyPerformance, YearlyPerformance, Project
+from sqlalchemy import delete, or_, update
 from datetime import datetime, timedelta
-from app.models import Competition
+from markupsafe import Markup
+import io
+from app.models import Competition, DailyPoints, UserYearSummary
+from app import loading
+from app.caching import bump, cached_fragment, current_version, make_etag, not_modified, with_etag
+from app.daily_points import WINDOWS, get_window_leaderboard, window_start
+from app.database import read_only
+from app.leaderboard import get_leaderboard
+from app.identity import get_cache as get_identity_cache
+from app.importer import import_students, import_weekly_scores
+from app.pagination import cached_count, decode_cursor, keyset_paginate, wants_json
+from app.passwords import PoolBusy, hash_password, verify_password
+from app.points import award_competition, change_points
+from app.performance import WEEK_FIELD_LIMITS, WEEK_FIELDS, apply_week_edits, load_week_grid, stage_cells, upsert_week_rows, week_row_json
+from app.summaries import HISTORY, YEARLY_FIELDS, history_page, summaries_for
 
 bp = Blueprint('main', __name__)
 
@@ -27,8 +40,12 @@ def register():
         
         group_id = request.form.get("group_id") if role == "student" else None
 
-        # Хеширование пароля с использованием werkzeug.security
-        hashed_password = generate_password_hash(password)
+        # Хеширование пароля в пуле процессов (app/passwords.py)
+        try:
+            hashed_password = hash_password(password)
+        except PoolBusy:
+            flash("Сервер перегружен, попробуйте ещё раз через несколько секунд.", "error")
+            return render_template("register.html", groups=groups), 503
 
         is_confirmed = True if role == "student" else False
 
@@ -50,8 +67,10 @@ def register():
 def award():
     if request.method == 'POST':
         award_type = request.form.get('award_type')
-        user_id = request.form.get('user_id')
-        user = User.query.get(user_id)
+        user_id = request.form.get('user_id', type=int)
+        if user_id is None or db.session.get(User, user_id) is None:
+            flash('Пользователь не найден', 'error')
+            return redirect(url_for('main.award'))
 
         if award_type == 'competition':
             competition = Competition(
@@ -65,44 +84,46 @@ def award():
             )
             db.session.add(competition)
             points = competition.level + competition.project_quality + competition.place + competition.communication
-            user.points += points
+            reason = f"Участие в конкурсе: {competition.name}"
 
         elif award_type == 'weekly':
-            week_start = datetime.strptime (request.form.get('week_start'), '%Y-%m-%d')
-            weekly_performance = WeeklyPerformance(
-                user_id=user_id,
-                week_start=week_start,
-                academic_performance=int(request.form.get('academic_performance')),
-                mentoring=int(request.form.get('mentoring')),
-                teamwork=int(request.form.get('teamwork')),
-                discipline=int(request.form.get('discipline')),
-                awarded_by_id=current_user.id
-            )
-            db.session.add(weekly_performance)
-            points = weekly_performance.academic_performance + weekly_performance.mentoring + weekly_performance.teamwork + weekly_performance.discipline
-            user.points += points
+            week_start = datetime.strptime(request.form.get('week_start'), '%Y-%m-%d').date()
+            week_start -= timedelta(days=week_start.weekday())
+            scores = {field: int(request.form.get(field)) for field in WEEK_FIELDS}
+            # Неделя могла быть уже оценена: строка недели перезаписывается,
+            # поэтому начисляется только разница с её прежними очками
+            previous = db.session.query(WeeklyPerformance.points).filter_by(
+                user_id=user_id, week_start=week_start
+            ).scalar() or 0
+            upsert_week_rows([dict(scores, user_id=user_id, week_start=week_start)])
+            points = sum(scores.values()) - previous
+            reason = f"Еженедельная успеваемость: {week_start}"
 
         elif award_type == 'yearly':
             year = int(request.form.get('year'))
+            scores = {field: int(request.form.get(field)) for field in YEARLY_FIELDS}
             yearly_performance = YearlyPerformance(
                 user_id=user_id,
                 year=year,
-                projects_score=int(request.form.get('projects_score')),
-                tech_dictation_score=int(request.form.get('tech_dictation_score')),
-                initial_monitoring_score=int(request.form.get('initial_monitoring_score')),
-                intermediate_certification_score=int(request.form.get('intermediate_certification_score')),
-                final_certification_score=int(request.form.get('final_certification_score')),
-                awarded_by_id=current_user.id
+                points=sum(scores.values()),
+                **scores
             )
             db.session.add(yearly_performance)
-            points = yearly_performance.projects_score + yearly_performance.tech_dictation_score + yearly_performance.initial_monitoring_score + yearly_performance.intermediate_certification_score + yearly_performance.final_certification_score
-            user.points += points
+            points = yearly_performance.points
+            reason = f"Годовая успеваемость: {year}"
+
+        else:
+            flash('Неизвестный тип награды', 'error')
+            return redirect(url_for('main.award'))
 
+        if points:
+            change_points(user_id, points, 'reward' if points > 0 else 'penalty',
+                          reason=reason, awarded_by_id=current_user.id)
         db.session.commit()
         flash('Награда успешно добавлена', 'success')
-        return redirect(url_for('users'))
+        return redirect(url_for('main.user_awards', user_id=user_id))
 
-    return render_template('award.html', users=User.query.all())
+    return render_template('award.html', users=User.query.options(*loading.user_list()).all())
 
 @bp.route("/login", methods=["GET", "POST"])
 def login():
@@ -110,7 +131,12 @@ def login():
         username = request.form["username"]
         password = request.form["password"]
         user = User.query.filter_by(username=username).first()
-        if user and check_password_hash(user.password_hash, password):
+        try:
+            valid = user is not None and verify_password(user.password_hash, password)
+        except PoolBusy:
+            flash("Сервер перегружен, попробуйте ещё раз через несколько секунд.", "error")
+            return render_template("login.html"), 503
+        if valid:
             login_user(user, remember=True)
             next_page = request.args.get('next')
             return redirect(next_page or url_for('main.top_users'))  # Изменено здесь
@@ -149,16 +175,74 @@ def add_points():
     
 
 @bp.route("/top_users")
+@read_only
 def top_users():
-    page = request.args.get('page', 1, type=int)
     per_page = 10
-    
-    top_users = User.query.order_by(User.points.desc()).paginate(page=page, per_page=per_page)
-    
+    selected_group_id = request.args.get('group_id', type=int)
+    after = decode_cursor(request.args.get('after'), [int, int])
+    before = decode_cursor(request.args.get('before'), [int, int])
+    page = request.args.get('page', 1, type=int)
+    window = request.args.get('window', 'all')
+    if window not in WINDOWS:
+        window = 'all'
+
+    # Пока версия 'points' не изменилась, повторные обновления страницы получают 304,
+    # а новые клиенты — таблицу из кэша фрагментов без запросов к БД.
+    # Рейтинги за период считаются по дневным суммам очков и зависят ещё от начала периода.
+    if window == 'all':
+        leaderboard = get_leaderboard()
+    else:
+        leaderboard = get_window_leaderboard(window)
+    start = window_start(window)
+    etag = make_etag('top_users', leaderboard.version, start, current_user.get_id(), request.full_path, wants_json())
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
+    user_rank = user_points = None
     if current_user.is_authenticated:
-        user_rank = db.session.query(func.count(User.id) + 1).filter(User.points > current_user.points).scalar()
-    
-    return render_template("top_users.html", top_users=top_users, user_rank=user_rank)
+        user_rank = leaderboard.rank(current_user.id, group_id=selected_group_id)
+        user_points = leaderboard.points_of(current_user.id)
+
+    if wants_json():
+        top_users = leaderboard.page(per_page, selected_group_id, after=after, before=before, page=page)
+        return with_etag(jsonify({
+            "items": [
+                {"rank": rank, "id": user.id, "full_name": user.full_name, "points": points}
+                for rank, user, points in zip(top_users.ranks, top_users.items, top_users.points)
+            ],
+            "window": window,
+            "next": top_users.next_cursor,
+            "prev": top_users.prev_cursor,
+            "total": top_users.total,
+            "user_rank": user_rank,
+            "user_points": user_points
+        }), etag)
+
+    def render_table():
+        return render_template(
+            "_top_users_table.html",
+            top_users=leaderboard.page(per_page, selected_group_id, after=after, before=before, page=page),
+            groups=Group.query.all(),
+            selected_group_id=selected_group_id,
+            windows=WINDOWS,
+            window=window
+        )
+
+    table = cached_fragment(
+        ('top_users', window, start, leaderboard.version, selected_group_id, after and tuple(after),
+         before and tuple(before), page),
+        render_table
+    )
+    return with_etag(render_template(
+        "top_users.html",
+        table=Markup(table),
+        user_rank=user_rank,
+        user_points=user_points,
+        window=window,
+        window_title=WINDOWS[window],
+        selected_group_id=selected_group_id
+    ), etag)
     
 
 @bp.route("/reward_punish", methods=["GET", "POST"])
@@ -169,7 +253,8 @@ def reward_punish():
         return redirect(url_for("main.index"))
 
     if request.method == "POST":
-        selected_students = request.form.getlist("selected_students")
+        selected_students = {int(student_id) for student_id in request.form.getlist("selected_students") if student_id.isdigit()}
+        award_group_ids = {int(group_id) for group_id in request.form.getlist("award_group_ids") if group_id.isdigit()}
         competition_name = request.form.get("competition_name")
         project_name = request.form.get("project_name")
         level = int(request.form.get("level"))
@@ -179,36 +264,38 @@ def reward_punish():
 
         total_points = level + quality + place
 
-        for student_id in selected_students:
-            student = User.query.get(student_id)
-            if student and student.role == 'student':
-                student.points += total_points
-                competition = Competition(
-                    name=competition_name,
-                    level=level,
-                    project_quality=quality,
-                    place=place,
-                    user_id=student.id,
-                    awarded_by_id=current_user.id
-                )
-                db.session.add(competition)
-                
-                transaction = Transaction(
-                    user_id=student.id,
-                    points=total_points,
-                    transaction_type='reward',
-                    reason=f"Участие в конкурсе: {competition_name}",
-                    comment=comment,
-                    awarded_by_id=current_user.id
+        # Один запрос на всех учеников: отмеченных вручную и из выбранных групп целиком
+        criteria = []
+        if selected_students:
+            criteria.append(User.id.in_(selected_students))
+        if award_group_ids:
+            criteria.append(User.group_id.in_(award_group_ids))
+
+        student_ids = []
+        if criteria:
+            student_ids = [
+                student_id for student_id, in db.session.query(User.id).filter(
+                    User.role == 'student',
+                    or_(*criteria)
                 )
-                db.session.add(transaction)
+            ]
+
+        award_competition(
+            student_ids,
+            competition_name,
+            level,
+            quality,
+            place,
+            comment=comment,
+            awarded_by_id=current_user.id
+        )
 
         db.session.commit()
         flash(f"Награждение выполнено успешно. Начислено {total_points} баллов.", "success")
         return redirect(url_for("main.reward_punish"))
 
     groups = Group.query.all()
-    students = User.query.filter_by(role='student').all()
+    students = User.query.options(*loading.user_list()).filter_by(role='student').all()
     
     return render_template(
         "reward_punish.html",
@@ -229,70 +316,82 @@ def update_weekly_performance():
     if current_user.role not in ['teacher', 'admin']:
         return jsonify({"error": "Недостаточно прав"}), 403
 
-    data = request.json
-    student_id = data.get('student_id')
+    data = request.get_json(silent=True) or {}
     field = data.get('field')
-    value = data.get('value')
-    week_start = datetime.strptime(data.get('week_start'), '%Y-%m-%d').date()
-
-    if not all([student_id, field, value is not None, week_start]):
+    if field not in WEEK_FIELDS:
+        return jsonify({"error": f"Некорректное поле: {field}"}), 400
+    try:
+        week_start = datetime.strptime(data.get('week_start'), '%Y-%m-%d').date()
+        student_id, value = int(data.get('student_id')), int(data.get('value'))
+    except (TypeError, ValueError):
         return jsonify({"error": "Не все необходимые данные предоставлены"}), 400
+    if not 0 <= value <= WEEK_FIELD_LIMITS[field]:
+        return jsonify({"error": f"Значение {field} должно быть от 0 до {WEEK_FIELD_LIMITS[field]}"}), 400
+    # Строки недели всегда хранятся с понедельника
+    week_start -= timedelta(days=week_start.weekday())
+
+    if not db.session.query(User.id).filter(User.id == student_id, User.role == 'student').first():
+        return jsonify({"error": "Ученик не найден"}), 404
+
+    try:
+        weekly_perf, = apply_week_edits(week_start, [(student_id, field, value)])
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify(dict(week_row_json(weekly_perf), success=True))
 
+@bp.route('/update_weekly_performance_batch', methods=['POST'])
+@login_required
+def update_weekly_performance_batch():
+    if current_user.role not in ['teacher', 'admin']:
+        return jsonify({"error": "Недостаточно прав"}), 403
+
+    data = request.get_json(silent=True) or {}
     try:
-        value = int(value)
-    except ValueError:
-        return jsonify({"error": "Некорректное значение"}), 400
-
-    weekly_perf = WeeklyPerformance.query.filter_by(
-        user_id=student_id,
-        week_start=week_start
-    ).first()
-
-    if not weekly_perf:
-        weekly_perf = WeeklyPerformance(
-            user_id=student_id,
-            week_start=week_start,
-            week=week_start.isocalendar()[1],
-            year=week_start.year,
-            points=0,
-            academic_performance=0,
-            mentoring=0,
-            teamwork=0,
-            discipline=0
+        week_start = datetime.strptime(data.get('week_start'), '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return jsonify({"error": "Некорректная дата начала недели"}), 400
+    # Строки недели всегда хранятся с понедельника
+    week_start -= timedelta(days=week_start.weekday())
+
+    edits = []
+    for edit in data.get('edits') or []:
+        field = edit.get('field')
+        if field not in WEEK_FIELDS:
+            return jsonify({"error": f"Некорректное поле: {field}"}), 400
+        try:
+            student_id, value = int(edit.get('student_id')), int(edit.get('value'))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Некорректное значение"}), 400
+        if not 0 <= value <= WEEK_FIELD_LIMITS[field]:
+            return jsonify({"error": f"Значение {field} должно быть от 0 до {WEEK_FIELD_LIMITS[field]}"}), 400
+        edits.append((student_id, field, value))
+
+    if not edits:
+        return jsonify({"error": "Не все необходимые данные предоставлены"}), 400
+
+    student_ids = {student_id for student_id, _, _ in edits}
+    known_ids = {
+        user_id for user_id, in db.session.query(User.id).filter(
+            User.id.in_(student_ids),
+            User.role == 'student'
         )
-        db.session.add(weekly_perf)
-
-    # Обновляем соответствующее поле
-    setattr(weekly_perf, field, value)
-
-    # Убедимся, что все значения определены перед сложением
-    academic_performance = weekly_perf.academic_performance or 0
-    mentoring = weekly_perf.mentoring or 0
-    teamwork = weekly_perf.teamwork or 0
-    discipline = weekly_perf.discipline or 0
-
-    # Пересчитываем общие очки
-    weekly_perf.points = (
-        academic_performance +
-        mentoring +
-        teamwork +
-        discipline
-    )
+    }
+    if student_ids - known_ids:
+        return jsonify({"error": "Ученик не найден"}), 404
 
     try:
-        db.session.commit()
-        return jsonify({
-            "success": True, 
-            "points": weekly_perf.points,
-            "academic_performance": academic_performance,
-            "mentoring": mentoring,
-            "teamwork": teamwork,
-            "discipline": discipline
-        })
+        touched = apply_week_edits(week_start, edits)
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+    return jsonify({
+        "success": True,
+        "rows": [week_row_json(weekly_perf) for weekly_perf in touched]
+    })
+
 @bp.route('/weekly_performance', methods=['GET', 'POST'])
 @login_required
 def weekly_performance():
@@ -310,40 +409,27 @@ def weekly_performance():
     week_start = selected_date - timedelta(days=selected_date.weekday())
     week_end = week_start + timedelta(days=6)
 
-    groups = Group.query.all()
     selected_group_id = request.args.get('group_id', type=int)
 
-    if selected_group_id:
-        students = User.query.filter_by(role='student', group_id=selected_group_id).all()
-    else:
-        students = User.query.filter_by(role='student').all()
-
-    student_performances = []
-
-    for student in students:
-        # Ищем существующую запись производительности для данной недели
-        weekly_perf = WeeklyPerformance.query.filter_by(
-            user_id=student.id,
-            week_start=week_start.date()
-        ).first()
-
-        # Если записи нет, создаем новую
-        if not weekly_perf:
-            weekly_perf = WeeklyPerformance(
-                user_id=student.id,
-                week_start=week_start.date(),
-                week=week_start.isocalendar()[1],
-                year=week_start.year,
-                points=0,
-                academic_performance=0,
-                mentoring=0,
-                teamwork=0,
-                discipline=0
-            )
-            db.session.add(weekly_perf)
-            db.session.commit()
+    # Опрос сетки без SSE: пока версия 'grid' та же, ответ — 304 без запросов к сетке
+    if wants_json():
+        etag = make_etag('weekly_performance', current_version('grid'), week_start.date(), request.full_path)
+        response = not_modified(etag)
+        if response is not None:
+            return response
 
-        student_performances.append((student, weekly_perf))
+    students_query = User.query.options(*loading.user_list()).filter_by(role='student')
+    if selected_group_id:
+        students_query = students_query.filter_by(group_id=selected_group_id)
+
+    student_performances = load_week_grid(students_query, week_start.date())
+    if wants_json():
+        return with_etag(jsonify({
+            "week_start": week_start.date().isoformat(),
+            "rows": [week_row_json(performance) for _, performance in student_performances]
+        }), etag)
+    # Группы читаем после сетки: её коммит истёк бы загруженные объекты
+    groups = Group.query.all()
 
     return render_template(
         'weekly_performance.html',
@@ -373,8 +459,39 @@ def confirm_users():
     return render_template("confirm_users.html", users=unconfirmed_users)
 
 
+@bp.route("/import", methods=["GET", "POST"])
+@login_required
+def import_data():
+    if current_user.role != 'admin':
+        flash("У вас нет доступа к этой странице.", "error")
+        return redirect(url_for("main.login"))
+
+    report = None
+    if request.method == "POST":
+        upload = request.files.get("file")
+        kind = request.form.get("kind")
+        if not upload or not upload.filename:
+            flash("Выберите CSV-файл.", "error")
+            return redirect(url_for("main.import_data"))
+
+        stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig")
+        if kind == "weekly":
+            try:
+                selected_date = datetime.strptime(request.form.get("week_start"), '%Y-%m-%d')
+            except (TypeError, ValueError):
+                flash("Укажите неделю для оценок.", "error")
+                return redirect(url_for("main.import_data"))
+            week_start = (selected_date - timedelta(days=selected_date.weekday())).date()
+            report = import_weekly_scores(stream, week_start)
+        else:
+            report = import_students(stream)
+
+    return render_template("import.html", report=report)
+
+
 @bp.route("/transactions", methods=["GET"])
 @login_required
+@read_only
 def transactions():
     # Удалите эту строку:
     # current_user = current_user
@@ -383,12 +500,52 @@ def transactions():
         flash("У вас нет доступа к этой странице.", "error")
         return redirect(url_for('main.index'))
 
-    page = request.args.get('page', 1, type=int)
     per_page = 20  # Количество транзакций на странице
-
-    transactions = Transaction.query.order_by(desc(Transaction.created_at)).paginate(page=page, per_page=per_page)
-
-    return render_template("transactions.html", transactions=transactions)
+    after = request.args.get('after')
+    before = request.args.get('before')
+
+    # В журнале видны имена учеников, поэтому страница зависит и от версии 'points'
+    versions = (current_version('transactions'), current_version('points'))
+    etag = make_etag('transactions', versions, current_user.get_id(), request.full_path, wants_json())
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
+    def load_page():
+        page = keyset_paginate(
+            Transaction.query.options(*loading.ledger()),
+            [(Transaction.created_at, True), (Transaction.id, True)],
+            per_page,
+            after=after,
+            before=before
+        )
+        page.total = cached_count('transactions', Transaction.query)
+        return page
+
+    if wants_json():
+        transactions = load_page()
+        return with_etag(jsonify({
+            "items": [
+                {
+                    "id": transaction.id,
+                    "created_at": transaction.created_at.isoformat(),
+                    "user_id": transaction.user_id,
+                    "points": transaction.points,
+                    "transaction_type": transaction.transaction_type,
+                    "reason": transaction.reason
+                }
+                for transaction in transactions.items
+            ],
+            "next": transactions.next_cursor,
+            "prev": transactions.prev_cursor,
+            "total": transactions.total
+        }), etag)
+
+    table = cached_fragment(
+        ('transactions', versions, after, before),
+        lambda: render_template("_transactions_table.html", transactions=load_page())
+    )
+    return with_etag(render_template("transactions.html", table=Markup(table)), etag)
 
 
 @bp.route("/award_points", methods=["GET", "POST"])
@@ -404,65 +561,112 @@ def award_points():
         reason = request.form.get('reason')
         transaction_type = request.form.get('transaction_type')
 
-        user = User.query.get(user_id)
+        delta = -points if transaction_type == 'penalty' else points
+        user = change_points(user_id, delta, transaction_type, reason=reason,
+                             awarded_by_id=current_user.id)
         if user:
-            if transaction_type == 'award':
-                user.points += points
-            elif transaction_type == 'penalty':
-                user.points -= points
-
-            transaction = Transaction(user_id=user.id, points=points, 
-                                      transaction_type=transaction_type, reason=reason)
-            db.session.add(transaction)
             db.session.commit()
 
             flash(f"{'Начислено' if transaction_type == 'award' else 'Списано'} {points} очков пользователю {user.full_name}", "success")
         else:
             flash("Пользователь не найден", "error")
 
-        return redirect(url_for('award_points'))
+        return redirect(url_for('main.award_points'))
 
-    users = User.query.filter(User.role == 'student').all()
+    users = User.query.options(*loading.user_list()).filter(User.role == 'student').all()
     return render_template("award_points.html", users=users)
 
 @bp.route("/manage_users")
 @login_required
 def manage_users():
-    current_user = current_user
-    if not g.current_user or g.current_user.role != 'admin':
+    if current_user.role != 'admin':
         flash("У вас нет доступа к этой странице.", "error")
         return redirect(url_for('main.points'))
 
-    users = User.query.filter(User.role != 'admin').all()
+    # Группа через JOIN и число транзакций подзапросом — один запрос на всю таблицу
+    users = (
+        db.session.query(User, loading.transaction_count())
+        .options(*loading.user_admin_list())
+        .filter(User.role != 'admin')
+        .order_by(User.id)
+        .all()
+    )
     return render_template("manage_users.html", users=users)
 
 @bp.route("/delete_user/<int:user_id>", methods=["POST"])
 @login_required
 def delete_user(user_id):
-    if g.current_user.role != 'admin':
+    if current_user.role != 'admin':
         flash("У вас нет прав для выполнения этого действия.", "error")
         return redirect(url_for('index'))
 
     user = User.query.get_or_404(user_id)
     if user.role == 'admin':
         flash("Нельзя удалить администратора.", "error")
+    elif db.session.query(Competition.id).filter_by(awarded_by_id=user.id).first() is not None:
+        flash("Нельзя удалить пользователя, который награждал за конкурсы.", "error")
     else:
+        _delete_user_rows(user.id)
         db.session.delete(user)
         db.session.commit()
         flash(f"Пользователь {user.full_name} был успешно удален.", "success")
 
-    return redirect(url_for('manage_users'))
+    return redirect(url_for('main.manage_users'))
+
+# Зависимые строки удаляются явно: внешние ключи NOT NULL, и ORM не может
+# просто обнулить user_id у конкурсов, недель и итогов ученика
+def _delete_user_rows(user_id):
+    for model in (Transaction, Competition, WeeklyPerformance, YearlyPerformance,
+                  UserYearSummary, DailyPoints, Project):
+        db.session.execute(delete(model).where(model.user_id == user_id))
+    db.session.execute(
+        update(Transaction).where(Transaction.awarded_by_id == user_id).values(awarded_by_id=None)
+    )
+    # Удаление мимо ORM: кэши по версиям данных должны сброситься
+    bump(db.session, 'transactions')
+
+@bp.route("/identity_cache")
+@login_required
+def identity_cache_stats():
+    if current_user.role != 'admin':
+        return jsonify({"error": "Недостаточно прав"}), 403
+    return jsonify(get_identity_cache().stats())
 
 @bp.route('/user/<int:user_id>/awards')
 @login_required
+@read_only
 def user_awards(user_id):
-    user = User.query.get(user_id)
-    competitions = Competition.query.filter_by(user_id=user_id).all()
-    weekly_performances = WeeklyPerformance.query.filter_by(user_id=user_id).all()
-    yearly_performances = YearlyPerformance.query.filter_by(user_id=user_id).all()
-    return render_template('user_awards.html', user=user, competitions=competitions, weekly_performances=weekly_performances, yearly_performances=yearly_performances)
+    user = db.session.get(User, user_id)
+    if user is None:
+        flash("Пользователь не найден.", "error")
+        return redirect(url_for('main.top_users'))
+
+    # Итоги по учебным годам — одна выборка по индексу (user_id, academic_year);
+    # полная история загружается только по запросу и постранично
+    summaries = summaries_for(user_id)
+    history_kind = request.args.get('history')
+    history = None
+    if history_kind in HISTORY:
+        history = history_page(
+            user_id,
+            history_kind,
+            per_page=20,
+            after=request.args.get('after'),
+            before=request.args.get('before')
+        )
+    else:
+        history_kind = None
+
+    return render_template(
+        'user_awards.html',
+        user=user,
+        summaries=summaries,
+        history_kind=history_kind,
+        history=history
+    )
 
 @bp.route('/submit_reward_penalty', methods=['POST'])
+@login_required
 def submit_reward_penalty():
     data = request.get_json()
     if not data:
@@ -476,30 +680,18 @@ def submit_reward_penalty():
     # Определяем тип транзакции
     transaction_type = 'reward' if action == 'reward' else 'penalty'
 
-    # Получаем пользователя из базы данных
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-
-    # Создаем новую запись о транзакции
-    new_transaction = Transaction(
-        user_id=user_id,
-        points=points if action == 'reward' else -points,  # Отрицательные очки для штрафов
-        transaction_type=transaction_type,
+    # Штраф не опускает баланс ниже нуля
+    user = change_points(
+        user_id,
+        points if action == 'reward' else -points,  # Отрицательные очки для штрафов
+        transaction_type,
         reason=reason,
-        awarded_by_id=current_user.id  # Добавляем ID пользователя, который выдал награду/штраф
+        awarded_by_id=current_user.id,  # ID пользователя, который выдал награду/штраф
+        floor=0
     )
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
 
-    # Обновляем очки пользователя
-    if action == 'reward':
-        user.points += points  # Увеличиваем очки
-    elif action == 'penalty':
-        user.points -= points  # Уменьшаем очки
-        if user.points < 0:
-            user.points = 0  # Не допускаем отрицательных значений
-
-    # Добавляем запись о транзакции в базу данных
-    db.session.add(new_transaction)
     db.session.commit()
 
     return jsonify({
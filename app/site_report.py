@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import Blueprint, abort, current_app, jsonify, render_template
+from flask_login import current_user, login_required
+from sqlalchemy import func, select
+
+from app import db
+from app.daily_points import window_start
+from app.database import DEFAULT_SITE, current_site, site_names, use_site
+from app.models import DailyPoints, Group, User
+from app.pagination import wants_json
+
+# Сводка по всем площадкам для администратора. Запросы к базам площадок идут
+# параллельно, каждый в своём потоке, контексте приложения и соединении из пула
+# своей площадки, так что время отчёта — это время самой медленной базы, а не сумма.
+# Площадка, не ответившая за SITE_REPORT_TIMEOUT секунд или упавшая с ошибкой,
+# попадает в отчёт с текстом ошибки, остальные считаются как обычно.
+# Отчёт видят только администраторы площадки по умолчанию: администратор кампуса
+# управляет своей базой и не должен читать данные других кампусов.
+
+bp = Blueprint('site_report', __name__, url_prefix='/admin')
+
+TOP_SIZE = 10
+TOTAL_FIELDS = ('students', 'teachers', 'admins', 'groups', 'points', 'week_points', 'week_active')
+
+
+def _site_summary(app, site):
+    started = time.perf_counter()
+    with use_site(app, site):
+        roles = {
+            role: (count, points)
+            for role, count, points in db.session.execute(
+                select(User.role, func.count(), func.coalesce(func.sum(User.points), 0)).group_by(User.role)
+            )
+        }
+        groups = db.session.execute(select(func.count()).select_from(Group)).scalar()
+        week_points, week_active = db.session.execute(
+            select(func.coalesce(func.sum(DailyPoints.points), 0), func.count(DailyPoints.user_id.distinct()))
+            .where(DailyPoints.day >= window_start('week'))
+        ).one()
+        top = db.session.execute(
+            select(User.id, User.full_name, User.points, Group.name.label('group_name'))
+            .outerjoin(Group, Group.id == User.group_id)
+            .where(User.role == 'student')
+            .order_by(User.points.desc(), User.id)
+            .limit(TOP_SIZE)
+        ).all()
+    return {
+        'site': site,
+        'error': None,
+        'students': roles.get('student', (0, 0))[0],
+        'teachers': roles.get('teacher', (0, 0))[0],
+        'admins': roles.get('admin', (0, 0))[0],
+        'groups': groups,
+        'points': roles.get('student', (0, 0))[1],
+        'week_points': week_points,
+        'week_active': week_active,
+        'top': [dict(row._mapping, site=site) for row in top],
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def collect(app, sites=None, timeout=None):
+    sites = list(sites or site_names(app))
+    timeout = timeout if timeout is not None else app.config.get('SITE_REPORT_TIMEOUT', 10)
+    executor = ThreadPoolExecutor(max_workers=app.config.get('SITE_REPORT_WORKERS', len(sites)))
+    try:
+        futures = {site: executor.submit(_site_summary, app, site) for site in sites}
+        wait(futures.values(), timeout=timeout)
+    finally:
+        # Зависшую базу не ждём: её поток доработает сам, результат будет отброшен
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for site, future in futures.items():
+        if not future.done():
+            results.append({'site': site, 'error': f'no answer in {timeout}s'})
+        elif future.exception() is not None:
+            results.append({'site': site, 'error': str(future.exception())})
+        else:
+            results.append(future.result())
+    return merge(results)
+
+
+def merge(results):
+    answered = [result for result in results if result['error'] is None]
+    totals = {field: sum(result[field] for result in answered) for field in TOTAL_FIELDS}
+    top = sorted(
+        (entry for result in answered for entry in result['top']),
+        key=lambda entry: (-(entry['points'] or 0), entry['site'], entry['id'])
+    )[:TOP_SIZE]
+    return {'sites': results, 'totals': totals, 'top': top}
+
+
+@bp.app_template_global()
+def can_view_sites():
+    return current_user.is_authenticated and current_user.role == 'admin' and current_site() == DEFAULT_SITE
+
+
+@bp.route('/sites')
+@login_required
+def sites_report():
+    if not can_view_sites():
+        abort(403)
+    report = collect(current_app._get_current_object())
+    if wants_json():
+        return jsonify(report)
+    return render_template('site_report.html', report=report)
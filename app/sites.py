@@ -0,0 +1,109 @@
+from flask import current_app
+from flask.sessions import SecureCookieSessionInterface
+from flask_login import COOKIE_NAME
+
+from app.database import DEFAULT_SITE, SITE_ENVIRON_KEY, current_site
+
+# Выбор площадки для запроса. Сначала по хосту (north.example.com), затем по
+# префиксу пути (/north/...): префикс переносится в SCRIPT_NAME, так что маршруты
+# приложения не меняются, а url_for сам строит адреса с префиксом.
+# Всё, что процесс держит в памяти (рейтинг, кэши, версии данных, SSE-хаб),
+# хранится отдельно для каждой площадки — см. site_state.
+
+
+class SiteMiddleware:
+    def __init__(self, wsgi_app, sites, remember_cookie):
+        self.wsgi_app = wsgi_app
+        self.remember_cookie = remember_cookie
+        self.hosts = {
+            host.lower(): name
+            for name, site in sites.items()
+            for host in site.get('hosts', ())
+        }
+        self.prefixes = sorted(
+            ((site['prefix'].rstrip('/'), name) for name, site in sites.items() if site.get('prefix')),
+            key=lambda item: -len(item[0])
+        )
+
+    def __call__(self, environ, start_response):
+        site = self.hosts.get(environ.get('HTTP_HOST', '').rsplit(':', 1)[0].lower())
+        if site is None:
+            site = DEFAULT_SITE
+            path = environ.get('PATH_INFO', '')
+            for prefix, name in self.prefixes:
+                if path == prefix or path.startswith(prefix + '/'):
+                    environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + prefix
+                    environ['PATH_INFO'] = path[len(prefix):] or '/'
+                    site = name
+                    break
+        environ[SITE_ENVIRON_KEY] = site
+        if site != DEFAULT_SITE:
+            start_response = self._remember_cookie(environ, start_response, site)
+        return self.wsgi_app(environ, start_response)
+
+    # Cookie «запомнить меня» своя на каждой площадке. Flask-Login знает только одно
+    # имя, поэтому на входе cookie площадки подставляется под этим именем (чужая
+    # отбрасывается), а на выходе Set-Cookie переименовывается обратно
+    def _remember_cookie(self, environ, start_response, site):
+        name = self.remember_cookie
+        site_name = f'{name}_{site}'
+        cookies = []
+        for part in environ.get('HTTP_COOKIE', '').split(';'):
+            key, _, value = part.strip().partition('=')
+            if key == name:
+                continue
+            cookies.append(f'{name}={value}' if key == site_name else part.strip())
+        environ['HTTP_COOKIE'] = '; '.join(cookie for cookie in cookies if cookie)
+
+        def site_start_response(status, headers, exc_info=None):
+            headers = [
+                (header, site_name + value[len(name):])
+                if header.lower() == 'set-cookie' and value.startswith(name + '=') else (header, value)
+                for header, value in headers
+            ]
+            return start_response(status, headers, exc_info)
+        return site_start_response
+
+
+# Своя cookie сессии на каждой площадке: при префиксах все площадки живут на одном
+# хосте, и вход в одну не должен выкидывать из другой
+class SiteSessionInterface(SecureCookieSessionInterface):
+    def get_cookie_name(self, app):
+        name = super().get_cookie_name(app)
+        site = current_site()
+        return name if site == DEFAULT_SITE else f'{name}_{site}'
+
+
+# Идентификатор для Flask-Login включает площадку: id пользователей в разных базах
+# пересекаются, и cookie входа одной площадки не должна подходить к другой.
+# На площадке по умолчанию остаётся просто id, чтобы не разлогинить всех при переходе.
+def login_id(user_id):
+    site = current_site()
+    return str(user_id) if site == DEFAULT_SITE else f'{site}:{user_id}'
+
+
+# id пользователя или None, если идентификатор выдан другой площадкой
+def parse_login_id(value):
+    site, _, user_id = value.rpartition(':')
+    if (site or DEFAULT_SITE) != current_site():
+        return None
+    return int(user_id)
+
+
+# Состояние процесса для текущей площадки: current_app.extensions[name][site]
+def site_state(name, factory):
+    states = current_app.extensions.setdefault(name, {})
+    site = current_site()
+    state = states.get(site)
+    if state is None:
+        state = states.setdefault(site, factory())
+    return state
+
+
+def init_sites(app):
+    app.session_interface = SiteSessionInterface()
+    sites = app.config.get('SITES')
+    if sites:
+        app.wsgi_app = SiteMiddleware(
+            app.wsgi_app, sites, app.config.get('REMEMBER_COOKIE_NAME', COOKIE_NAME)
+        )
@@ -0,0 +1,246 @@
+from datetime import date, datetime
+
+from sqlalchemy import case, delete, event, extract, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.database import site_engine
+from app.models import Competition, UserYearSummary, WeeklyPerformance, YearlyPerformance
+from app.pagination import keyset_paginate
+
+# Итоги по ученику за учебный год (с 1 сентября по 31 августа) в таблице user_year_summaries.
+# Запись конкурсов и оценок помечает пару (ученик, учебный год) как изменённую,
+# а перед коммитом итоги этих пар пересчитываются сгруппированными запросами
+# по индексам (user_id, дата) и записываются одним INSERT ... ON CONFLICT.
+# Пересчитываются только затронутые пары, поэтому стоимость не растёт с историей.
+
+YEAR_START_MONTH = 9
+CHUNK_SIZE = 500
+
+WEEKLY_FIELDS = ('academic_performance', 'mentoring', 'teamwork', 'discipline')
+YEARLY_FIELDS = ('projects_score', 'tech_dictation_score', 'initial_monitoring_score',
+                 'intermediate_certification_score', 'final_certification_score')
+SUMMARY_FIELDS = (('competitions_count', 'competitions_points', 'weeks_count')
+                  + WEEKLY_FIELDS + ('weekly_points',) + YEARLY_FIELDS + ('yearly_points',))
+
+
+def academic_year(value):
+    return value.year if value.month >= YEAR_START_MONTH else value.year - 1
+
+
+def year_bounds(year):
+    return date(year, YEAR_START_MONTH, 1), date(year + 1, YEAR_START_MONTH, 1)
+
+
+def _academic_year_column(column):
+    year = extract('year', column)
+    return case((extract('month', column) >= YEAR_START_MONTH, year), else_=year - 1)
+
+
+def _competition_points():
+    return (func.coalesce(Competition.level, 0) + func.coalesce(Competition.project_quality, 0)
+            + func.coalesce(Competition.place, 0) + func.coalesce(Competition.communication, 0))
+
+
+# Сгруппированные итоги {(user_id, учебный год): {поле: значение}}.
+# Без user_ids — по всем ученикам, без year — за все годы.
+def _aggregate(conn, user_ids=None, year=None):
+    totals = {}
+
+    def add(rows, fields):
+        for row in rows:
+            entry = totals.setdefault((row.user_id, int(row.academic_year)), dict.fromkeys(SUMMARY_FIELDS, 0))
+            for field in fields:
+                entry[field] = int(getattr(row, field) or 0)
+
+    competition_year = _academic_year_column(Competition.date)
+    stmt = select(
+        Competition.user_id,
+        competition_year.label('academic_year'),
+        func.count().label('competitions_count'),
+        func.sum(_competition_points()).label('competitions_points'),
+    ).group_by(Competition.user_id, competition_year)
+    if user_ids is not None:
+        stmt = stmt.where(Competition.user_id.in_(user_ids))
+    if year is not None:
+        start, end = year_bounds(year)
+        stmt = stmt.where(
+            Competition.date >= datetime.combine(start, datetime.min.time()),
+            Competition.date < datetime.combine(end, datetime.min.time()),
+        )
+    add(conn.execute(stmt), ('competitions_count', 'competitions_points'))
+
+    week_year = _academic_year_column(WeeklyPerformance.week_start)
+    stmt = select(
+        WeeklyPerformance.user_id,
+        week_year.label('academic_year'),
+        func.sum(case((WeeklyPerformance.points > 0, 1), else_=0)).label('weeks_count'),
+        *(func.sum(getattr(WeeklyPerformance, field)).label(field) for field in WEEKLY_FIELDS),
+        func.sum(WeeklyPerformance.points).label('weekly_points'),
+    ).group_by(WeeklyPerformance.user_id, week_year)
+    if user_ids is not None:
+        stmt = stmt.where(WeeklyPerformance.user_id.in_(user_ids))
+    if year is not None:
+        start, end = year_bounds(year)
+        stmt = stmt.where(WeeklyPerformance.week_start >= start, WeeklyPerformance.week_start < end)
+    add(conn.execute(stmt), ('weeks_count',) + WEEKLY_FIELDS + ('weekly_points',))
+
+    stmt = select(
+        YearlyPerformance.user_id,
+        YearlyPerformance.year.label('academic_year'),
+        *(func.sum(getattr(YearlyPerformance, field)).label(field) for field in YEARLY_FIELDS),
+        func.sum(YearlyPerformance.points).label('yearly_points'),
+    ).group_by(YearlyPerformance.user_id, YearlyPerformance.year)
+    if user_ids is not None:
+        stmt = stmt.where(YearlyPerformance.user_id.in_(user_ids))
+    if year is not None:
+        stmt = stmt.where(YearlyPerformance.year == year)
+    add(conn.execute(stmt), YEARLY_FIELDS + ('yearly_points',))
+    return totals
+
+
+def _upsert_statement():
+    if site_engine(db).dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(UserYearSummary.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=['user_id', 'academic_year'],
+        set_=dict({field: stmt.excluded[field] for field in SUMMARY_FIELDS}, updated_at=stmt.excluded.updated_at)
+    )
+
+
+def _write(conn, totals):
+    now = datetime.utcnow()
+    rows = [
+        dict(fields, user_id=user_id, academic_year=year, updated_at=now)
+        for (user_id, year), fields in sorted(totals.items())
+    ]
+    for start in range(0, len(rows), CHUNK_SIZE):
+        conn.execute(_upsert_statement(), rows[start:start + CHUNK_SIZE])
+
+
+# Пересчитывает итоги для пар (user_id, учебный год); пары без данных обнуляются
+def refresh(conn, keys):
+    by_year = {}
+    for user_id, year in keys:
+        by_year.setdefault(year, set()).add(user_id)
+    for year, user_ids in sorted(by_year.items()):
+        user_ids = sorted(user_ids)
+        for start in range(0, len(user_ids), CHUNK_SIZE):
+            chunk = user_ids[start:start + CHUNK_SIZE]
+            totals = _aggregate(conn, chunk, year)
+            for user_id in chunk:
+                totals.setdefault((user_id, year), dict.fromkeys(SUMMARY_FIELDS, 0))
+            _write(conn, totals)
+
+
+# Полная перестройка таблицы: миграция, синтетические данные, сверка
+def rebuild(conn):
+    conn.execute(delete(UserYearSummary.__table__))
+    _write(conn, _aggregate(conn))
+
+
+# Перестройка итогов одного учебного года (годовое подведение итогов)
+def rebuild_year(conn, year):
+    conn.execute(delete(UserYearSummary.__table__).where(UserYearSummary.academic_year == year))
+    _write(conn, _aggregate(conn, year=year))
+
+
+def summaries_for(user_id):
+    return (
+        UserYearSummary.query
+        .filter_by(user_id=user_id)
+        .order_by(UserYearSummary.academic_year.desc())
+        .all()
+    )
+
+
+HISTORY = {
+    'competitions': (Competition, Competition.date),
+    'weekly': (WeeklyPerformance, WeeklyPerformance.week_start),
+    'yearly': (YearlyPerformance, YearlyPerformance.year),
+}
+
+
+# Полная история ученика постранично, от новых записей к старым
+def history_page(user_id, kind, per_page, after=None, before=None):
+    model, column = HISTORY[kind]
+    return keyset_paginate(
+        model.query.filter(model.user_id == user_id),
+        [(column, True), (model.id, True)],
+        per_page,
+        after=after,
+        before=before
+    )
+
+
+# Пары, изменённые в сессии, копятся в session.info и пересчитываются перед коммитом
+def _stage(session, keys):
+    session.info.setdefault('summaries_dirty', set()).update(keys)
+
+
+# Для пакетных записей через Core, мимо событий ORM
+def mark(session, user_ids, year):
+    _stage(session, {(user_id, year) for user_id in user_ids})
+
+
+def _keys(target, history_values=False):
+    if isinstance(target, Competition):
+        column = 'date'
+        to_year = lambda value: academic_year(value or datetime.utcnow())
+    elif isinstance(target, WeeklyPerformance):
+        column = 'week_start'
+        to_year = academic_year
+    else:
+        column = 'year'
+        to_year = int
+    # До перезагрузки объекта user_id может оставаться строкой из формы.
+    # Строка без ученика (user_id обнулили) ничьих итогов не меняет.
+    def pair(user_id, value):
+        return None if user_id is None else (int(user_id), to_year(value))
+
+    keys = {pair(target.user_id, getattr(target, column))}
+    if history_values:
+        # При переносе записи на другого ученика или в другой год старая пара тоже меняется
+        state = inspect(target)
+        old_user = state.attrs.user_id.history.deleted
+        old_value = state.attrs[column].history.deleted
+        if old_user or old_value:
+            keys.add(pair(
+                old_user[0] if old_user else target.user_id,
+                old_value[0] if old_value else getattr(target, column),
+            ))
+    keys.discard(None)
+    return keys
+
+
+@event.listens_for(Competition, 'after_insert')
+@event.listens_for(WeeklyPerformance, 'after_insert')
+@event.listens_for(YearlyPerformance, 'after_insert')
+@event.listens_for(Competition, 'after_delete')
+@event.listens_for(WeeklyPerformance, 'after_delete')
+@event.listens_for(YearlyPerformance, 'after_delete')
+def _row_written(mapper, connection, target):
+    _stage(object_session(target), _keys(target))
+
+
+@event.listens_for(Competition, 'before_update')
+@event.listens_for(WeeklyPerformance, 'before_update')
+@event.listens_for(YearlyPerformance, 'before_update')
+def _row_updated(mapper, connection, target):
+    _stage(object_session(target), _keys(target, True))
+
+
+@event.listens_for(Session, 'before_commit')
+def _refresh_dirty(session):
+    session.flush()
+    keys = session.info.pop('summaries_dirty', None)
+    if keys:
+        refresh(session, keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_dirty(session):
+    session.info.pop('summaries_dirty', None)
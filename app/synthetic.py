@@ -0,0 +1,124 @@
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import bindparam, insert, update
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import Competition, Group, Transaction, User, WeeklyPerformance
+from app.daily_points import rebuild as rebuild_daily_points
+from app.summaries import rebuild as rebuild_summaries
+
+SYNTHETIC_PASSWORD = 'password'
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _bulk_insert(model, rows, chunk_size):
+    for chunk in _chunks(rows, chunk_size):
+        db.session.execute(insert(model.__table__), chunk)
+
+
+# Наполняет пустую БД правдоподобными данными: группы, ученики, учитель и администратор,
+# журнал транзакций, конкурсы и недельные оценки. Баланс учеников сходится с журналом.
+# У всех пользователей пароль SYNTHETIC_PASSWORD; логины teacher, admin, student<N>.
+def generate(groups=10, students_per_group=30, transactions_per_student=20, weeks=10,
+             competitions_per_student=2, seed=0, chunk_size=5000):
+    rnd = random.Random(seed)
+    password_hash = generate_password_hash(SYNTHETIC_PASSWORD)
+    today = date.today()
+    first_week = today - timedelta(days=today.weekday(), weeks=weeks)
+
+    db.session.execute(insert(Group.__table__), [{'name': f'Группа {i + 1}'} for i in range(groups)])
+    group_ids = [group_id for group_id, in db.session.query(Group.id).order_by(Group.id)]
+
+    staff = [
+        dict(username='teacher', full_name='Teacher', email='teacher@example.com',
+             password_hash=password_hash, role='teacher', points=0, is_confirmed=True, group_id=None),
+        dict(username='admin', full_name='Administrator', email='admin@example.com',
+             password_hash=password_hash, role='admin', points=0, is_confirmed=True, group_id=None),
+    ]
+    students = [
+        dict(username=f'student{n}', full_name=f'Student {n}', email=f'student{n}@example.com',
+             password_hash=password_hash, role='student', points=0, is_confirmed=True,
+             group_id=group_ids[n % groups])
+        for n in range(groups * students_per_group)
+    ]
+    _bulk_insert(User, staff + students, chunk_size)
+
+    teacher_id = db.session.query(User.id).filter_by(username='teacher').scalar()
+    student_ids = [
+        user_id for user_id, in db.session.query(User.id).filter_by(role='student').order_by(User.id)
+    ]
+
+    balances = dict.fromkeys(student_ids, 0)
+    span = timedelta(weeks=weeks).total_seconds()
+    start = datetime.combine(first_week, datetime.min.time())
+
+    transactions = []
+    competitions = []
+    for student_id in student_ids:
+        for _ in range(transactions_per_student):
+            points = rnd.choice((1, 2, 3, 5, -1, -2))
+            balances[student_id] += points
+            transactions.append(dict(
+                user_id=student_id,
+                points=points,
+                transaction_type='reward' if points > 0 else 'penalty',
+                reason='Синтетическая запись',
+                awarded_by_id=teacher_id,
+                created_at=start + timedelta(seconds=rnd.uniform(0, span))
+            ))
+        for number in range(competitions_per_student):
+            level, quality, place = rnd.randint(0, 4), rnd.randint(0, 3), rnd.randint(0, 3)
+            competitions.append(dict(
+                name=f'Конкурс {number + 1}',
+                level=level,
+                project_quality=quality,
+                place=place,
+                user_id=student_id,
+                awarded_by_id=teacher_id,
+                date=start + timedelta(seconds=rnd.uniform(0, span))
+            ))
+    _bulk_insert(Transaction, transactions, chunk_size)
+    _bulk_insert(Competition, competitions, chunk_size)
+
+    weekly = []
+    for week in range(weeks):
+        week_start = first_week + timedelta(weeks=week)
+        for student_id in student_ids:
+            scores = dict(
+                academic_performance=rnd.randint(0, 2),
+                mentoring=rnd.randint(0, 2),
+                teamwork=rnd.randint(0, 1),
+                discipline=rnd.randint(0, 1)
+            )
+            weekly.append(dict(
+                user_id=student_id,
+                week_start=week_start,
+                week=week_start.isocalendar()[1],
+                year=week_start.year,
+                points=sum(scores.values()),
+                **scores
+            ))
+    _bulk_insert(WeeklyPerformance, weekly, chunk_size)
+
+    for chunk in _chunks(list(balances.items()), chunk_size):
+        db.session.execute(
+            update(User.__table__).where(User.__table__.c.id == bindparam('user_id')),
+            [{'user_id': user_id, 'points': points} for user_id, points in chunk]
+        )
+
+    rebuild_summaries(db.session)
+    rebuild_daily_points(db.session)
+    db.session.commit()
+    return {
+        'groups': len(group_ids),
+        'students': len(student_ids),
+        'transactions': len(transactions),
+        'competitions': len(competitions),
+        'weekly_performances': len(weekly),
+    }
@@ -0,0 +1,138 @@
+# Пропускная способность входа с пулом хеширования и без него.
+# Поднимает приложение на многопоточном werkzeug-сервере, параллельные клиенты
+# логинятся в цикле, а отдельный клиент замеряет задержку лёгкой страницы —
+# насколько вход мешает остальным запросам. С --import-rows параллельно идёт
+# хеширование паролей импорта — проверка, что импорт не забирает весь пул.
+#
+#   python benchmarks/bench_login.py [--clients 16] [--seconds 10] [--pool-workers N]
+#                                    [--import-rows N]
+
+import argparse
+import http.client
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app, db
+from app.migrations import upgrade
+from app.models import User
+from app.passwords import hash_password, hash_passwords
+
+PASSWORD = 'bench-password'
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log(self, *args):
+        pass
+
+
+def login_loop(port, index, deadline, counts):
+    body = urlencode({'username': f'bench{index}', 'password': PASSWORD})
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    done = busy = 0
+    while time.monotonic() < deadline:
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        conn.request('POST', '/login', body, headers)
+        response = conn.getresponse()
+        response.read()
+        conn.close()
+        if response.status == 302:
+            done += 1
+        else:
+            busy += 1
+    counts[index] = (done, busy)
+
+
+def import_loop(app, rows, deadline, imported):
+    # Как /import: весь пакет паролей одним вызовом hash_passwords
+    with app.app_context():
+        while time.monotonic() < deadline:
+            imported.append(len(hash_passwords([PASSWORD] * rows)))
+
+
+def probe_loop(port, deadline, latencies):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        conn.request('GET', '/login')
+        conn.getresponse().read()
+        conn.close()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.05)
+
+
+def run(pool_workers, clients, seconds, import_rows=0):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'PASSWORD_POOL_WORKERS': pool_workers,
+            'PASSWORD_POOL_QUEUE': clients * 2,
+            'PASSWORD_POOL_WAIT': 30,
+        })
+        with app.app_context():
+            upgrade()
+            password_hash = hash_password(PASSWORD)
+            db.session.add_all([
+                User(username=f'bench{i}', full_name=f'Bench {i}', email=f'bench{i}@example.com',
+                     password_hash=password_hash, role='student')
+                for i in range(clients)
+            ])
+            db.session.commit()
+
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+
+        counts = [(0, 0)] * clients
+        latencies = []
+        imported = []
+        deadline = time.monotonic() + seconds
+        threads = [threading.Thread(target=login_loop, args=(server.port, i, deadline, counts))
+                   for i in range(clients)]
+        threads.append(threading.Thread(target=probe_loop, args=(server.port, deadline, latencies)))
+        if import_rows:
+            threads.append(threading.Thread(target=import_loop, args=(app, import_rows, deadline, imported)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        server.shutdown()
+
+    latencies.sort()
+    return {
+        'logins_per_second': sum(done for done, _ in counts) / seconds,
+        'logins_failed': sum(busy for _, busy in counts),
+        'imported_per_second': sum(imported) / seconds,
+        'probe_p50_ms': statistics.median(latencies) * 1000 if latencies else None,
+        'probe_p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--pool-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--import-rows', type=int, default=0)
+    args = parser.parse_args()
+
+    for label, workers in (('inline', 0), (f'pool x{args.pool_workers}', args.pool_workers)):
+        result = run(workers, args.clients, args.seconds, args.import_rows)
+        line = (f"{label:>10}: {result['logins_per_second']:.1f} logins/s "
+                f"({result['logins_failed']} failed), "
+                f"other requests p50 {result['probe_p50_ms']:.1f} ms, p95 {result['probe_p95_ms']:.1f} ms")
+        if args.import_rows:
+            line += f", import {result['imported_per_second']:.1f} passwords/s"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# Сравнение награждения 1000 учеников: старый цикл по одному ученику
+# против пакетного пути app.points.award_competition.
+#
+#   python benchmarks/bench_reward_punish.py [--students 1000] [--repeat 3]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Competition, Group, Transaction, User
+from app.points import award_competition
+
+
+def seed(students):
+    db.drop_all()
+    db.create_all()
+    group = Group(name='Bench Group')
+    teacher = User(username='teacher', full_name='Teacher', email='teacher@example.com',
+                   password_hash='-', role='teacher')
+    db.session.add_all([group, teacher])
+    db.session.flush()
+    db.session.add_all([
+        User(username=f'student{i}', full_name=f'Student {i}', email=f'student{i}@example.com',
+             password_hash='-', role='student', group_id=group.id, points=0)
+        for i in range(students)
+    ])
+    db.session.commit()
+    student_ids = [user_id for user_id, in db.session.query(User.id).filter(User.role == 'student')]
+    return teacher.id, group.id, student_ids
+
+
+# Прежняя реализация reward_punish: запрос и два ORM-объекта на каждого ученика
+def legacy_award(student_ids, teacher_id):
+    for student_id in student_ids:
+        student = db.session.get(User, student_id)
+        if student and student.role == 'student':
+            student.points += 6
+            db.session.add(Competition(name='Bench', level=1, project_quality=2, place=3,
+                                       user_id=student.id, awarded_by_id=teacher_id))
+            db.session.add(Transaction(user_id=student.id, points=6, transaction_type='reward',
+                                       reason='Участие в конкурсе: Bench', awarded_by_id=teacher_id))
+    db.session.commit()
+
+
+def bulk_award(group_id, teacher_id):
+    student_ids = [
+        student_id for student_id, in db.session.query(User.id).filter(
+            User.role == 'student',
+            User.group_id == group_id
+        )
+    ]
+    award_competition(student_ids, 'Bench', 1, 2, 3, awarded_by_id=teacher_id)
+    db.session.commit()
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}"})
+        with app.app_context():
+            teacher_id, group_id, student_ids = seed(args.students)
+            legacy = measure(lambda: legacy_award(student_ids, teacher_id), args.repeat)
+            db.session.expunge_all()
+            bulk = measure(lambda: bulk_award(group_id, teacher_id), args.repeat)
+
+    print(f"students: {args.students}")
+    print(f"legacy loop: {legacy * 1000:.1f} ms")
+    print(f"bulk award:  {bulk * 1000:.1f} ms")
+    print(f"speedup:     {legacy / bulk:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+# Замер маршрутов блюпринта на синтетических данных разного объёма.
+# Для каждого размера строится отдельная SQLite-база (app.synthetic.generate),
+# каждый маршрут прогоняется тестовым клиентом: перцентили задержки и число SQL-запросов.
+# Холодный замер (cold) перед каждым запросом сбрасывает кэш фрагментов и версии
+# данных, тёплый — нет: иначе после прогрева закэшированные страницы показывают 0 SQL.
+# Нагрузочный режим запускает несколько процессов-воркеров на одной базе.
+# Результат пишется в JSON; с --baseline прогон сравнивается с сохранённым
+# и завершается с кодом 1, если маршрут стал заметно медленнее или делает больше запросов.
+#
+#   python benchmarks/bench_routes.py --sizes small,medium --output results.json
+#   python benchmarks/bench_routes.py --sizes small --baseline results.json
+#   python benchmarks/bench_routes.py --sizes large --load-workers 4 --load-seconds 20
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.caching import get_clock, get_fragment_cache
+from app.leaderboard import get_leaderboard
+from app.migrations import upgrade
+from app.query_plans import _login, _week_start, hot_routes
+from app.synthetic import generate
+
+# Размеры данных: параметры app.synthetic.generate
+SIZES = {
+    'tiny': dict(groups=2, students_per_group=10, transactions_per_student=10, weeks=4),
+    'small': dict(groups=10, students_per_group=30, transactions_per_student=20, weeks=10),
+    'medium': dict(groups=20, students_per_group=50, transactions_per_student=100, weeks=52),
+    'large': dict(groups=40, students_per_group=50, transactions_per_student=500, weeks=156),
+    'xlarge': dict(groups=50, students_per_group=100, transactions_per_student=400, weeks=260),
+}
+
+
+# Все маршруты app/routes.py, которые можно безопасно повторять: чтения и идемпотентные
+# или аддитивные записи. register, import и delete_user меняют состав данных и не замеряются,
+# /users не замеряется, пока у него нет шаблона.
+def bench_routes():
+    week_start = _week_start()
+    return hot_routes() + [
+        ('teacher', 'GET', '/transactions?page=3', None),
+        ('teacher', 'GET', '/award', None),
+        ('admin', 'GET', '/manage_users', None),
+        ('teacher', 'POST', '/update_weekly_performance', {'json': {
+            'week_start': week_start, 'student_id': 5, 'field': 'teamwork', 'value': 1,
+        }}),
+    ]
+
+
+# Маршруты только на чтение для нагрузочного режима
+def load_routes():
+    return [route for route in bench_routes() if route[1] == 'GET']
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(latencies):
+    return {
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p90_ms': round(percentile(latencies, 0.90) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+    }
+
+
+def make_app(path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'PASSWORD_POOL_WORKERS': 0,
+    })
+    # Ошибки маршрутов видны по статусу в отчёте, трассировки и журнал медленных
+    # запросов (в том числе вставки генератора) только засоряют вывод
+    app.logger.setLevel(logging.CRITICAL)
+    return app
+
+
+def build_database(path, size):
+    app = make_app(path)
+    with app.app_context():
+        upgrade()
+        started = time.perf_counter()
+        counts = generate(**SIZES[size])
+        counts['seconds'] = round(time.perf_counter() - started, 1)
+        db.engine.dispose()
+    return counts
+
+
+# Кэши процесса, из-за которых повторный запрос не доходит до БД
+def drop_caches(app):
+    with app.app_context():
+        get_fragment_cache().clear()
+        get_clock().expire()
+
+
+def measure(app, repeat, warmup):
+    with app.app_context():
+        engine = db.engine
+        get_leaderboard()
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    clients = {}
+    results = {}
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        for username, method, url, payload in bench_routes():
+            client = clients.get(username)
+            if client is None:
+                client = clients[username] = app.test_client()
+                _login(client, username)
+
+            runs = {'cold': ([], []), 'warm': ([], [])}
+            statuses = set()
+            plan = ['warmup'] * warmup + ['cold'] * repeat + ['warm'] * repeat
+            for kind in plan:
+                if kind == 'cold':
+                    drop_caches(app)
+                statements[0] = 0
+                started = time.perf_counter()
+                response = client.open(url, method=method, **(payload or {}))
+                response.get_data()
+                elapsed = time.perf_counter() - started
+                if kind != 'warmup':
+                    latencies, queries = runs[kind]
+                    latencies.append(elapsed)
+                    queries.append(statements[0])
+                    statuses.add(response.status_code)
+
+            latencies, queries = runs['warm']
+            cold_latencies, cold_queries = runs['cold']
+            results[f'{method} {url}'] = dict(
+                summarize(latencies),
+                queries=int(statistics.median(queries)),
+                status=sorted(statuses),
+                cold=dict(summarize(cold_latencies), queries=int(statistics.median(cold_queries))),
+            )
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return results
+
+
+def _load_worker(path, seconds, seed):
+    app = make_app(path)
+    client = app.test_client()
+    _login(client, 'teacher')
+    routes = load_routes()
+    rnd = random.Random(seed)
+    latencies = {}
+    errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        _, method, url, payload = rnd.choice(routes)
+        started = time.perf_counter()
+        response = client.open(url, method=method, **(payload or {}))
+        response.get_data()
+        latencies.setdefault(f'{method} {url}', []).append(time.perf_counter() - started)
+        if response.status_code >= 500:
+            errors += 1
+    return latencies, errors
+
+
+def load_test(path, workers, seconds):
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(workers) as pool:
+        started = time.perf_counter()
+        parts = pool.starmap(_load_worker, [(path, seconds, seed) for seed in range(workers)])
+        elapsed = time.perf_counter() - started
+
+    merged = {}
+    errors = 0
+    for latencies, worker_errors in parts:
+        errors += worker_errors
+        for route, values in latencies.items():
+            merged.setdefault(route, []).extend(values)
+    everything = [value for values in merged.values() for value in values]
+    return {
+        'workers': workers,
+        'seconds': seconds,
+        'requests': len(everything),
+        'requests_per_second': round(len(everything) / elapsed, 1),
+        'errors': errors,
+        'overall': summarize(everything) if everything else {},
+        'routes': {route: dict(summarize(values), requests=len(values)) for route, values in merged.items()},
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Регрессия: p50 вырос больше чем на tolerance (и больше чем на min_delta_ms),
+# маршрут стал делать больше SQL-запросов или начал падать с 5xx
+def compare(results, baseline, tolerance, min_delta_ms):
+    regressions = []
+    for size, routes in results['sizes'].items():
+        base_routes = baseline.get('sizes', {}).get(size, {}).get('routes', {})
+        for route, current in routes['routes'].items():
+            base = base_routes.get(route)
+            if base is None:
+                continue
+            # Тёплый и холодный замеры сравниваются отдельно; в старых отчётах холодного нет
+            for label, now, then in (('', current, base), (' cold', current.get('cold'), base.get('cold'))):
+                if now is None or then is None:
+                    continue
+                delta = now['p50_ms'] - then['p50_ms']
+                if delta > min_delta_ms and now['p50_ms'] > then['p50_ms'] * (1 + tolerance):
+                    regressions.append(f"{size} {route}:{label} p50 {then['p50_ms']} -> {now['p50_ms']} ms")
+                if now['queries'] > then['queries']:
+                    regressions.append(f"{size} {route}:{label} queries {then['queries']} -> {now['queries']}")
+            if max(current['status']) >= 500 > max(base['status']):
+                regressions.append(f"{size} {route}: status {base['status']} -> {current['status']}")
+    return regressions
+
+
+def print_table(size, routes):
+    print(f'\n== {size}')
+    print(f"{'route':<60} {'p50':>8} {'p95':>8} {'p99':>8} {'sql':>5} {'cold p50':>9} {'cold sql':>8}  status")
+    for route, result in routes.items():
+        cold = result['cold']
+        print(f"{route[:60]:<60} {result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8} "
+              f"{result['queries']:>5} {cold['p50_ms']:>9} {cold['queries']:>8}  {','.join(map(str, result['status']))}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='tiny,small', help=f"через запятую: {', '.join(SIZES)}")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--output', default='bench_routes.json')
+    parser.add_argument('--baseline', help='JSON предыдущего прогона для сравнения')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимый рост p50, доля')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='рост p50 меньше этого игнорируется')
+    parser.add_argument('--load-workers', type=int, default=0, help='число процессов нагрузочного режима')
+    parser.add_argument('--load-seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"неизвестные размеры: {', '.join(unknown)}")
+
+    results = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+        },
+        'sizes': {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f'{size}.db')
+            print(f'building {size} dataset...', flush=True)
+            data = build_database(path, size)
+            app = make_app(path)
+            routes = measure(app, args.repeat, args.warmup)
+            with app.app_context():
+                db.engine.dispose()
+            entry = {'data': data, 'routes': routes}
+            if args.load_workers:
+                print(f'load test: {args.load_workers} workers x {args.load_seconds}s', flush=True)
+                entry['load'] = load_test(path, args.load_workers, args.load_seconds)
+            results['sizes'][size] = entry
+
+            print_table(size, routes)
+            if 'load' in entry:
+                load = entry['load']
+                print(f"load: {load['requests_per_second']} req/s, errors {load['errors']}, "
+                      f"p50 {load['overall'].get('p50_ms')} ms, p99 {load['overall'].get('p99_ms')} ms")
+
+    with open(args.output, 'w', encoding='utf-8') as handle:
+        json.dump(results, handle, ensure_ascii=False, indent=2)
+    print(f'\nresults written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) against {args.baseline}:')
+            for line in regressions:
+                print('  ' + line)
+            sys.exit(1)
+        print(f'\nno regressions against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+# Холодный старт: от запуска процесса до первого ответа сервера.
+# Процесс-сервер повторяет запуск app.py (create_app + bootstrap) и поднимает
+# werkzeug на свободном порту; замер идёт от Popen до первого 200 на /login.
+# Первый запуск — на пустой базе (схема и начальные данные), остальные — рестарты
+# на уже актуальной базе, где bootstrap сводится к одной проверке версий.
+#
+#   python benchmarks/bench_startup.py [--restarts 10] [--output bench_startup.json]
+#   python benchmarks/bench_startup.py --baseline bench_startup.json
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log(self, *args):
+        pass
+
+
+def serve():
+    # Импорт приложения — часть замеряемого старта
+    from app import create_app
+    from app.bootstrap import bootstrap
+    from app.database import site_names, use_site
+
+    app = create_app()
+    for site in site_names(app):
+        with use_site(app, site):
+            bootstrap()
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    print(server.port, flush=True)
+    server.serve_forever()
+
+
+def _first_response(port, deadline):
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/login')
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError('server did not answer in time')
+
+
+def start(database_url, timeout=60):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve'],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True, start_new_session=True
+    )
+    try:
+        port = int(process.stdout.readline())
+        listening = time.perf_counter()
+        _first_response(port, time.monotonic() + timeout)
+        answered = time.perf_counter()
+    finally:
+        # Вместе с сервером завершаются процессы пула хеширования паролей
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+    return {
+        'listening_ms': round((listening - started) * 1000, 1),
+        'first_response_ms': round((answered - started) * 1000, 1),
+    }
+
+
+def summarize(runs):
+    values = sorted(run['first_response_ms'] for run in runs)
+    return {
+        'runs': len(values),
+        'p50_ms': round(statistics.median(values), 1),
+        'max_ms': values[-1],
+        'listening_p50_ms': round(statistics.median(run['listening_ms'] for run in runs), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--restarts', type=int, default=10)
+    parser.add_argument('--output', default='bench_startup.json')
+    parser.add_argument('--baseline', help='JSON предыдущего прогона для сравнения')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимый рост p50, доля')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve()
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        cold = [start(database_url)]
+        restarts = [start(database_url) for _ in range(args.restarts)]
+
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'empty_database': summarize(cold),
+        'restart': summarize(restarts),
+    }
+    for label in ('empty_database', 'restart'):
+        result = results[label]
+        print(f"{label:>15}: first response p50 {result['p50_ms']} ms, max {result['max_ms']} ms "
+              f"(listening after {result['listening_p50_ms']} ms)")
+
+    with open(args.output, 'w', encoding='utf-8') as handle:
+        json.dump(results, handle, ensure_ascii=False, indent=2)
+    print(f'\nresults written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        regressions = [
+            f"{label}: p50 {baseline[label]['p50_ms']} -> {results[label]['p50_ms']} ms"
+            for label in ('empty_database', 'restart')
+            if label in baseline
+            and results[label]['p50_ms'] > baseline[label]['p50_ms'] * (1 + args.tolerance)
+        ]
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) against {args.baseline}:')
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+        print(f'\nno regressions against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
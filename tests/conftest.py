@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+
+import pytest
+
+from app import create_app, db
+from app.migrations import upgrade
+from app.query_plans import capture_statements
+from app.synthetic import SYNTHETIC_PASSWORD, generate
+
+
+# Приложение на SQLite в памяти с синтетическими данными (логины teacher, admin, student<N>)
+@pytest.fixture
+def make_app():
+    def factory(config=None, **sizes):
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'SECRET_KEY': 'test',
+            'TESTING': True,
+            'PASSWORD_POOL_WORKERS': 0,
+            **(config or {}),
+        })
+        with app.app_context():
+            upgrade()
+            generate(**{'groups': 2, 'students_per_group': 5, 'transactions_per_student': 3, 'weeks': 2, **sizes})
+        return app
+    return factory
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+# Клиент, вошедший под синтетическим пользователем: login(app, 'teacher')
+@pytest.fixture
+def login():
+    def login(app, username):
+        client = app.test_client()
+        response = client.post('/login', data={'username': username, 'password': SYNTHETIC_PASSWORD})
+        assert response.status_code == 302, response.text
+        return client
+    return login
+
+
+# Все SQL-запросы, выполненные внутри блока: with count_queries(app) as statements
+@pytest.fixture
+def count_queries():
+    @contextmanager
+    def count_queries(app):
+        with app.app_context():
+            engine = db.engine
+        with capture_statements(engine) as statements:
+            yield statements
+    return count_queries
@@ -0,0 +1,92 @@
+import pytest
+
+from app import db
+from app.models import Group, Transaction, User
+
+
+def _walk(client, url):
+    items, cursor = [], None
+    while True:
+        response = client.get(url + (f'&after={cursor}' if cursor else ''))
+        assert response.status_code == 200, response.text
+        items.extend(response.json['items'])
+        cursor = response.json['next']
+        if cursor is None:
+            return items
+
+
+@pytest.mark.parametrize('url', [
+    '/api/v1/leaderboard?fields=id,password_hash',
+    '/api/v1/leaderboard?fields=,',
+    '/api/v1/leaderboard?window=decade',
+    '/api/v1/users/3/transactions?fields=points,user_id',
+    '/api/v1/weeks/2026-09-07?fields=email',
+    '/api/v1/weeks/last-monday',
+    '/api/v1/groups/1/roster?fields=password_hash',
+])
+def test_bad_requests_are_400(app, login, url):
+    response = login(app, 'teacher').get(url)
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+
+def test_field_projection(app, login):
+    client = login(app, 'teacher')
+    items = client.get('/api/v1/leaderboard?fields=points,id').json['items']
+    assert items and all(set(item) == {'points', 'id'} for item in items)
+    items = client.get('/api/v1/groups/1/roster?fields=full_name').json['items']
+    assert items and all(set(item) == {'full_name'} for item in items)
+
+
+@pytest.mark.parametrize('username, url, status', [
+    (None, '/api/v1/users/3/transactions', 401),
+    (None, '/api/v1/groups', 401),
+    ('student3', '/api/v1/users/{own}/transactions', 200),
+    ('student3', '/api/v1/users/{other}/transactions', 403),
+    ('student3', '/api/v1/weeks/2026-09-07', 403),
+    ('student3', '/api/v1/groups/1/roster', 403),
+    ('teacher', '/api/v1/users/4/transactions', 200),
+    ('teacher', '/api/v1/groups/999/roster', 404),
+    (None, '/api/v1/leaderboard', 200),
+])
+def test_roles(app, login, username, url, status):
+    with app.app_context():
+        own = db.session.query(User.id).filter_by(username='student3').scalar()
+        other = db.session.query(User.id).filter(User.role == 'student', User.id != own).first()[0]
+    client = login(app, username) if username else app.test_client()
+    response = client.get(url.format(own=own, other=other))
+    assert response.status_code == status
+    assert response.is_json
+
+
+def test_cursor_paging_covers_each_endpoint(make_app, login):
+    app = make_app(students_per_group=8, transactions_per_student=7)
+    client = login(app, 'teacher')
+    with app.app_context():
+        ledger = [row.id for row in db.session.query(Transaction.id).filter_by(user_id=3)
+                  .order_by(Transaction.created_at.desc(), Transaction.id.desc())]
+        students = [row.id for row in db.session.query(User.id).filter_by(role='student').order_by(User.id)]
+        group_id = db.session.query(Group.id).order_by(Group.id).first()[0]
+        roster = [row.id for row in db.session.query(User.id).filter_by(role='student', group_id=group_id)
+                  .order_by(User.id)]
+        everyone = db.session.query(User).count()
+
+    assert [item['id'] for item in _walk(client, '/api/v1/users/3/transactions?limit=3&fields=id')] == ledger
+    assert [item['user_id'] for item in _walk(client, '/api/v1/weeks/2026-09-09?limit=4')] == students
+    assert [item['id'] for item in _walk(client, f'/api/v1/groups/{group_id}/roster?limit=3')] == roster
+
+    board = _walk(client, '/api/v1/leaderboard?limit=5')
+    assert len({item['id'] for item in board}) == len(board) == everyone
+    assert [item['rank'] for item in board] == sorted(item['rank'] for item in board)
+
+    # Назад от второй страницы — первая
+    first = client.get('/api/v1/users/3/transactions?limit=3').json
+    second = client.get(f"/api/v1/users/3/transactions?limit=3&after={first['next']}").json
+    assert client.get(f"/api/v1/users/3/transactions?limit=3&before={second['prev']}").json['items'] == first['items']
+
+
+def test_limit_is_capped(make_app, login):
+    app = make_app({'API_MAX_PAGE_SIZE': 4})
+    client = login(app, 'teacher')
+    response = client.get('/api/v1/weeks/2026-09-07?limit=1000').json
+    assert len(response['items']) == 4 and response['next']
@@ -0,0 +1,72 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, url_for
+
+from app.assets import DIST, MANIFEST, IMMUTABLE_MAX_AGE, build, init_assets
+
+CSS = 'body { background: url(img/dot.svg); }'
+SVG = '<svg xmlns="http://www.w3.org/2000/svg"></svg>' * 20
+
+
+# Отдельное Flask-приложение со своей папкой статики: сборка не трогает app/static
+@pytest.fixture
+def assets_app(tmp_path):
+    (tmp_path / 'img').mkdir()
+    (tmp_path / 'img' / 'dot.svg').write_text(SVG)
+    (tmp_path / 'style.css').write_text(CSS)
+    build(str(tmp_path))
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path='/static')
+    init_assets(app)
+    return app
+
+
+def _manifest(app):
+    with open(f'{app.static_folder}/{DIST}/{MANIFEST}', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def test_manifest_resolves_hashed_names(assets_app):
+    manifest = _manifest(assets_app)
+    assert set(manifest) == {'style.css', 'img/dot.svg'}
+    with assets_app.test_request_context():
+        assert url_for('static', filename='style.css') == f"/static/{manifest['style.css']}"
+        assert url_for('static', filename='missing.css') == '/static/missing.css'
+
+    # Ссылки в CSS ведут на хэшированные имена относительно самого CSS
+    response = assets_app.test_client().get(f"/static/{manifest['style.css']}")
+    assert manifest['img/dot.svg'].removeprefix(f'{DIST}/') in response.text
+
+
+def test_hashed_files_are_immutable(assets_app):
+    name = _manifest(assets_app)['img/dot.svg']
+    client = assets_app.test_client()
+    response = client.get(f'/static/{name}')
+    assert response.status_code == 200
+    assert response.cache_control.immutable
+    assert response.cache_control.public
+    assert response.cache_control.max_age == IMMUTABLE_MAX_AGE
+    assert 'Accept-Encoding' in response.vary
+
+    # Исходные файлы по старым адресам не кэшируются навсегда
+    response = client.get('/static/img/dot.svg')
+    assert response.status_code == 200
+    assert not response.cache_control.immutable
+    response.close()
+
+
+@pytest.mark.parametrize('accept, encoding', [
+    ('gzip, deflate', 'gzip'),
+    ('gzip;q=0, identity', None),
+    ('br;q=0', None),
+    ('', None),
+])
+def test_encoding_negotiation(assets_app, accept, encoding):
+    name = _manifest(assets_app)['img/dot.svg']
+    response = assets_app.test_client().get(f'/static/{name}', headers={'Accept-Encoding': accept})
+    assert response.headers.get('Content-Encoding') == encoding
+    assert response.mimetype == 'image/svg+xml'
+    assert '.gz' not in response.headers.get('Content-Disposition', '')
+    body = gzip.decompress(response.data) if encoding == 'gzip' else response.data
+    assert body.decode() == SVG
@@ -0,0 +1,56 @@
+from datetime import date
+
+from app import db
+from app.models import Transaction, User, WeeklyPerformance
+
+
+def test_unknown_award_type_redirects_back(app, login):
+    with app.app_context():
+        before = db.session.query(Transaction).count()
+
+    response = login(app, 'teacher').post('/award', data={'award_type': 'medal', 'user_id': '3'})
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/award')
+    with app.app_context():
+        assert db.session.query(Transaction).count() == before
+
+
+def _weekly(client, user_id, week_start, **scores):
+    data = {'award_type': 'weekly', 'user_id': str(user_id), 'week_start': week_start,
+            'academic_performance': 0, 'mentoring': 0, 'teamwork': 0, 'discipline': 0}
+    return client.post('/award', data=dict(data, **scores))
+
+
+def _points(app, user_id):
+    with app.app_context():
+        return db.session.get(User, user_id).points
+
+
+# Повторная оценка недели начисляет только разницу, а не всю сумму ещё раз
+def test_weekly_award_twice_credits_the_difference(app, login):
+    client = login(app, 'teacher')
+    before = _points(app, 3)
+    assert _weekly(client, 3, '2026-09-09', academic_performance=2, mentoring=1).status_code == 302
+    assert _points(app, 3) == before + 3
+    _weekly(client, 3, '2026-09-07', academic_performance=2, mentoring=1)
+    assert _points(app, 3) == before + 3
+    _weekly(client, 3, '2026-09-07', academic_performance=1)
+    assert _points(app, 3) == before + 1
+
+    with app.app_context():
+        rows = WeeklyPerformance.query.filter_by(user_id=3).filter(
+            WeeklyPerformance.week_start.between(date(2026, 9, 7), date(2026, 9, 13))
+        ).all()
+        assert [(row.week_start, row.points) for row in rows] == [(date(2026, 9, 7), 1)]
+
+
+def test_award_for_unknown_user_is_rejected(app, login):
+    with app.app_context():
+        before = db.session.query(Transaction).count()
+
+    response = _weekly(login(app, 'teacher'), 99999, '2026-09-07', mentoring=1)
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/award')
+    with app.app_context():
+        assert db.session.query(Transaction).count() == before
+        assert WeeklyPerformance.query.filter_by(user_id=99999).count() == 0
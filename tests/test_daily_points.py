@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from sqlalchemy import insert, select
+
+from app import db
+from app.daily_points import _window_rows, today, window_start
+from app.models import DailyPoints, User
+from app.query_plans import capture_statements, explain, full_scans
+
+
+def _add_history(days):
+    student_ids = db.session.execute(select(User.id).where(User.role == 'student')).scalars().all()
+    first = today() - timedelta(days=days)
+    db.session.execute(insert(DailyPoints).prefix_with('OR IGNORE'), [
+        dict(user_id=user_id, day=first + timedelta(days=offset), points=1)
+        for user_id in student_ids
+        for offset in range(days)
+    ])
+    db.session.commit()
+
+
+# Рейтинг за неделю читает из индекса только строки недели, а не всю историю
+def test_week_window_reads_only_the_window(app):
+    with app.app_context():
+        _add_history(400)
+        start = window_start('week')
+        with capture_statements(db.engine) as statements:
+            rows = _window_rows(start)
+        with db.engine.connect() as conn:
+            plan = explain(conn, *next(item for item in statements if 'daily_points' in item[0]))
+
+        assert 'daily_points' not in full_scans('sqlite', plan), plan
+        assert any('SEARCH daily_points' in line and '(day>?)' in line for line in plan), plan
+
+        expected = dict(db.session.execute(
+            select(DailyPoints.user_id, db.func.sum(DailyPoints.points))
+            .where(DailyPoints.day >= start)
+            .group_by(DailyPoints.user_id)
+        ).all())
+        assert {user_id: points for user_id, points, _ in rows if points} == expected
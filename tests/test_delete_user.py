@@ -0,0 +1,62 @@
+from app import db
+from app.leaderboard import get_leaderboard
+from app.models import (Competition, DailyPoints, Transaction, User, UserYearSummary, WeeklyPerformance,
+                        YearlyPerformance)
+from app.points import change_points
+
+DEPENDENTS = (Transaction, Competition, WeeklyPerformance, YearlyPerformance, UserYearSummary, DailyPoints)
+
+
+def _student_with_history(app):
+    with app.app_context():
+        student = User.query.filter_by(role='student').order_by(User.id).first()
+        db.session.add(Competition(name='Olympiad', level=1, project_quality=1, place=1, communication=1,
+                                   user_id=student.id, awarded_by_id=2))
+        db.session.add(YearlyPerformance(user_id=student.id, year=2025, points=3, projects_score=3))
+        change_points(student.id, 4, 'reward', reason='test', awarded_by_id=2)
+        db.session.commit()
+        assert all(model.query.filter_by(user_id=student.id).count() for model in DEPENDENTS)
+        return student.id
+
+
+def test_delete_student_removes_dependent_rows(app, login):
+    student_id = _student_with_history(app)
+    with app.app_context():
+        assert get_leaderboard().points_of(student_id) is not None
+
+    response = login(app, 'admin').post(f'/delete_user/{student_id}')
+    assert response.status_code == 302
+
+    with app.app_context():
+        assert db.session.get(User, student_id) is None
+        assert [model.__name__ for model in DEPENDENTS if model.query.filter_by(user_id=student_id).count()] == []
+        assert get_leaderboard().points_of(student_id) is None
+
+
+def test_delete_teacher_keeps_awarded_transactions(app, login):
+    student_id = _student_with_history(app)
+    with app.app_context():
+        teacher = User(username='substitute', full_name='Substitute', email='substitute@example.com',
+                       password_hash='-', role='teacher', points=0, is_confirmed=True)
+        db.session.add(teacher)
+        db.session.flush()
+        change_points(student_id, 2, 'reward', reason='from substitute', awarded_by_id=teacher.id)
+        db.session.commit()
+        teacher_id = teacher.id
+
+    assert login(app, 'admin').post(f'/delete_user/{teacher_id}').status_code == 302
+    with app.app_context():
+        assert db.session.get(User, teacher_id) is None
+        transaction = Transaction.query.filter_by(reason='from substitute').one()
+        assert transaction.user_id == student_id and transaction.awarded_by_id is None
+
+
+# Конкурс без награждающего не сохранить: такого учителя удалять нельзя
+def test_teacher_who_awarded_competitions_is_kept(app, login):
+    with app.app_context():
+        teacher_id = User.query.filter_by(username='teacher').one().id
+        assert Competition.query.filter_by(awarded_by_id=teacher_id).count()
+
+    assert login(app, 'admin').post(f'/delete_user/{teacher_id}').status_code == 302
+    with app.app_context():
+        assert db.session.get(User, teacher_id) is not None
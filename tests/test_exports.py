@@ -0,0 +1,38 @@
+import json
+from datetime import datetime
+
+from app import db
+from app.models import Transaction, User, YearlyPerformance
+from app.summaries import YEARLY_FIELDS
+
+
+def _ndjson(response):
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_date_to_includes_the_whole_day(app, login):
+    with app.app_context():
+        user_id = db.session.query(User.id).filter_by(role='student').limit(1).scalar()
+        Transaction.query.delete()
+        db.session.add_all([
+            Transaction(user_id=user_id, points=1, transaction_type='reward', created_at=datetime(2026, 5, 10, 15, 30)),
+            Transaction(user_id=user_id, points=2, transaction_type='reward', created_at=datetime(2026, 5, 11, 0, 0)),
+        ])
+        db.session.commit()
+
+    rows = _ndjson(login(app, 'teacher').get(
+        '/export/transactions?format=ndjson&date_from=2026-05-10&date_to=2026-05-10'
+    ))
+    assert [row['points'] for row in rows] == [1]
+
+
+def test_yearly_export_has_score_columns(app, login):
+    with app.app_context():
+        user_id = db.session.query(User.id).filter_by(role='student').limit(1).scalar()
+        scores = {field: number for number, field in enumerate(YEARLY_FIELDS, 1)}
+        db.session.add(YearlyPerformance(user_id=user_id, year=2030, points=sum(scores.values()), **scores))
+        db.session.commit()
+
+    rows = _ndjson(login(app, 'teacher').get('/export/yearly_performances?format=ndjson&date_from=2030-01-01'))
+    assert [{field: row[field] for field in YEARLY_FIELDS} for row in rows] == [scores]
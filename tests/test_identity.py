@@ -0,0 +1,45 @@
+from app import db
+from app.identity import get_cache, load_identity
+from app.models import User
+
+
+def _student_id(app):
+    with app.app_context():
+        return db.session.query(User.id).filter_by(username='student3').scalar()
+
+
+def test_identity_is_served_from_cache(app, count_queries):
+    student_id = _student_id(app)
+    with app.app_context():
+        assert load_identity(student_id).role == 'student'
+        with count_queries(app) as statements:
+            assert load_identity(student_id).username == 'student3'
+        assert statements == []
+        stats = get_cache().stats()
+        assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+def test_role_change_invalidates_after_commit(app):
+    student_id = _student_id(app)
+    with app.app_context():
+        assert load_identity(student_id).role == 'student'
+        db.session.get(User, student_id).role = 'teacher'
+        db.session.flush()
+        # До коммита в кэше остаётся прежняя роль
+        assert load_identity(student_id).role == 'student'
+        db.session.commit()
+        assert load_identity(student_id).role == 'teacher'
+        assert get_cache().stats()['invalidations'] == 1
+
+
+# Сессия удалённого пользователя перестаёт действовать со следующего запроса
+def test_deleted_user_is_logged_out(app, login):
+    student_id = _student_id(app)
+    student = login(app, 'student3')
+    assert student.get('/points').status_code == 200
+
+    assert login(app, 'admin').post(f'/delete_user/{student_id}').status_code == 302
+    response = student.get('/points')
+    assert response.status_code in (302, 401)
+    with app.app_context():
+        assert get_cache().get(student_id) is None
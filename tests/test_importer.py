@@ -0,0 +1,78 @@
+import io
+from datetime import date
+
+from sqlalchemy import event, func
+
+from app import db, importer
+from app.importer import import_students, import_weekly_scores
+from app.models import Group, User, WeeklyPerformance
+
+HEADER = 'username,full_name,email,password,group\n'
+
+
+def _students(*rows):
+    return io.StringIO(HEADER + ''.join(f'{row}\n' for row in rows))
+
+
+def test_student_validation_errors(app):
+    with app.app_context():
+        existing = db.session.query(User.email).filter_by(username='student3').scalar()
+        report = import_students(_students(
+            'new1,New One,new1@example.com,pw,Imported',
+            ',No Name,noname@example.com,pw,',
+            'bad,Bad Email,not-an-email,pw,',
+            'dup,Duplicate,NEW1@example.com,pw,',
+            f'clash,Clash,{existing.upper()},pw,',
+        ))
+        assert report.created == 1
+        assert [line for line, _ in report.errors] == [3, 4, 5, 6]
+        assert 'уже существует' in report.errors[-1][1]
+        assert db.session.query(User.group_id).filter_by(username='new1').scalar() == \
+            db.session.query(Group.id).filter_by(name='Imported').scalar()
+
+
+def test_missing_columns_are_reported(app):
+    with app.app_context():
+        report = import_students(io.StringIO('username,email\nx,x@example.com\n'))
+        assert report.created == 0
+        assert report.errors == [(1, 'Нет колонок: full_name, password, group')]
+
+
+# Каждая пачка — своя вставка и свой коммит
+def test_students_are_committed_in_chunks(app, monkeypatch):
+    monkeypatch.setattr(importer, 'CHUNK_SIZE', 2)
+    with app.app_context():
+        commits = []
+
+        def committed(session):
+            commits.append(session)
+
+        before = db.session.query(func.count(User.id)).scalar()
+        db.session.commit()
+        event.listen(db.session, 'after_commit', committed)
+        try:
+            report = import_students(_students(*(
+                f'chunk{i},Chunk {i},chunk{i}@example.com,pw,' for i in range(5)
+            )))
+        finally:
+            event.remove(db.session, 'after_commit', committed)
+        assert (report.created, report.errors) == (5, [])
+        assert db.session.query(func.count(User.id)).scalar() == before + 5
+        # Пачки 2 + 2 + 1
+        assert len(commits) == 3
+
+
+def test_weekly_scores_match_email_case_insensitively(app):
+    week_start = date(2026, 9, 7)
+    with app.app_context():
+        student_id, email = db.session.query(User.id, User.email).filter_by(username='student3').one()
+        report = import_weekly_scores(io.StringIO(
+            'email,academic_performance,mentoring,teamwork,discipline\n'
+            f'{email.upper()},2,1,1,0\n'
+            'nobody@example.com,1,1,1,1\n'
+            f'{email},3,0,0,0\n'
+        ), week_start)
+        assert report.updated == 1
+        assert [line for line, _ in report.errors] == [3, 4]
+        row = WeeklyPerformance.query.filter_by(user_id=student_id, week_start=week_start).one()
+        assert (row.academic_performance, row.mentoring, row.teamwork, row.points) == (2, 1, 1, 4)
@@ -0,0 +1,116 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select, update
+
+from app import db
+from app.jobs import HANDLERS, _claim, enqueue, run_pending, schedule_periodic
+from app.models import Job, User, WeeklyPerformance
+
+
+@pytest.fixture
+def failing(monkeypatch):
+    def fail():
+        raise RuntimeError('boom')
+    monkeypatch.setitem(HANDLERS, 'fail', fail)
+    monkeypatch.setitem(HANDLERS, 'noop', lambda: None)
+
+
+def _jobs():
+    return db.session.execute(select(Job).order_by(Job.id)).scalars().all()
+
+
+def test_idempotency_key_enqueues_once(app, failing):
+    with app.app_context():
+        for _ in range(3):
+            enqueue('noop', key='noop:once')
+        enqueue('noop')
+        db.session.commit()
+        assert [job.idempotency_key for job in _jobs()] == ['noop:once', None]
+
+
+def test_failed_job_backs_off_then_fails(app, failing):
+    app.config['JOB_RETRY_SECONDS'] = 10
+    with app.app_context():
+        enqueue('fail', max_attempts=3)
+        db.session.commit()
+        delays = []
+        for _ in range(3):
+            job, = _jobs()
+            # Подводим срок вручную, чтобы не ждать задержку
+            db.session.execute(update(Job).values(run_at=datetime.now()))
+            db.session.commit()
+            started = datetime.now()
+            assert run_pending('test') == 1
+            db.session.refresh(job)
+            delays.append(round((job.run_at - started).total_seconds()))
+        assert delays[:2] == [10, 20]
+        assert (job.status, job.attempts) == ('failed', 3)
+        assert 'boom' in job.last_error
+        assert run_pending('test') == 0
+
+
+# Другой воркер забрал задачу между SELECT и UPDATE: условный UPDATE ничего
+# не меняет, и задача не выполняется второй раз
+def test_claim_race_loses_to_other_worker(app, failing):
+    with app.app_context():
+        enqueue('noop')
+        db.session.commit()
+        job_id = _jobs()[0].id
+        engine = db.engine
+        stolen = []
+
+        def steal(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('UPDATE jobs') and not stolen:
+                stolen.append(job_id)
+                conn.execute(update(Job).where(Job.id == job_id)
+                             .values(status='running', locked_by='other', locked_at=datetime.now()))
+
+        event.listen(engine, 'before_cursor_execute', steal)
+        try:
+            assert _claim('test', datetime.now()) is None
+        finally:
+            event.remove(engine, 'before_cursor_execute', steal)
+        assert stolen == [job_id]
+        job = db.session.get(Job, job_id, populate_existing=True)
+        assert (job.locked_by, job.attempts) == ('other', 0)
+
+
+def test_stale_running_job_is_reclaimed_only_with_attempts_left(app, failing):
+    app.config['JOB_LOCK_TIMEOUT'] = 60
+    with app.app_context():
+        enqueue('noop', max_attempts=3)
+        enqueue('noop', max_attempts=3)
+        db.session.commit()
+        retry, exhausted = _jobs()
+        long_ago = datetime.now() - timedelta(minutes=5)
+        db.session.execute(update(Job).where(Job.id == retry.id)
+                           .values(status='running', locked_by='dead', locked_at=long_ago, attempts=1))
+        db.session.execute(update(Job).where(Job.id == exhausted.id)
+                           .values(status='running', locked_by='dead', locked_at=long_ago, attempts=3))
+        db.session.commit()
+
+        assert run_pending('test') == 1
+        db.session.refresh(retry)
+        db.session.refresh(exhausted)
+        assert (retry.status, retry.attempts, retry.locked_by) == ('done', 2, 'test')
+        assert (exhausted.status, exhausted.attempts) == ('failed', 3)
+
+
+def test_week_rollover_precreates_rows(app):
+    today = date(2026, 10, 14)
+    monday = date(2026, 10, 12)
+    with app.app_context():
+        schedule_periodic(today)
+        schedule_periodic(today)
+        assert sorted(job.idempotency_key for job in _jobs() if job.name == 'week_rollover') == [
+            'week_rollover:2026-10-12', 'week_rollover:2026-10-19'
+        ]
+        # Следующая неделя ещё не наступила и ждёт своего срока
+        db.session.execute(update(Job).where(Job.name == 'yearly_rollup').values(run_at=datetime.now() + timedelta(days=1)))
+        db.session.commit()
+        assert run_pending('test') == 1
+
+        students = User.query.filter_by(role='student').count()
+        assert WeeklyPerformance.query.filter_by(week_start=monday).count() == students
+        assert WeeklyPerformance.query.filter_by(week_start=monday + timedelta(days=7)).count() == 0
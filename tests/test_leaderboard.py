@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from app import db
+from app.caching import current_version, get_clock
+from app.daily_points import get_window_leaderboard
+from app.leaderboard import RankIndex, get_leaderboard
+from app.models import User
+from app.points import change_points
+
+
+def _expected(points):
+    order = sorted(points, key=lambda user_id: (-points[user_id], user_id))
+    ranks = {user_id: 1 + sum(1 for other in points.values() if other > points[user_id]) for user_id in points}
+    return order, ranks
+
+
+def test_rank_index_matches_sorting_with_huge_point_spread():
+    rng = random.Random(3)
+    index = RankIndex()
+    points = {}
+    for _ in range(2000):
+        user_id = rng.randrange(200)
+        if rng.random() < 0.1:
+            index.remove(user_id)
+            points.pop(user_id, None)
+            continue
+        # Крупные награды и штрафы не должны раздувать индекс
+        value = rng.choice([rng.randrange(-5, 5), rng.randrange(-10 ** 9, 10 ** 9)])
+        index.set(user_id, value)
+        points[user_id] = value
+
+    order, ranks = _expected(points)
+    assert len(index) == len(points)
+    assert [user_id for _, user_id in index.slice(0, len(order))] == order
+    assert [rank for rank, _ in index.slice(10, 5)] == [ranks[user_id] for user_id in order[10:15]]
+    for user_id in points:
+        assert index.rank(user_id) == ranks[user_id]
+        assert index.position(user_id) == order.index(user_id)
+    assert len(index.keys) == len(points)
+
+
+def test_rank_index_ties_share_rank():
+    index = RankIndex([(1, 10), (2, 10), (3, 5), (4, None)])
+    assert index.slice(0, 10) == [(1, 1), (1, 2), (3, 3), (4, 4)]
+    assert index.position_of(10, 2) == 1
+    assert index.position_of(7, 0) == 2
+
+
+def _student_id():
+    return db.session.query(User.id).filter_by(role='student').order_by(User.id).limit(1).scalar()
+
+
+# Свои коммиты применяются к уже построенным индексам без пересборки
+def test_local_award_updates_boards_in_place(app):
+    with app.app_context():
+        student_id = _student_id()
+        board, week = get_leaderboard(), get_window_leaderboard('week')
+        before, week_before = board.points_of(student_id), week.points_of(student_id)
+        change_points(student_id, 7, 'reward', reason='test')
+        db.session.commit()
+
+        assert get_leaderboard() is board and get_window_leaderboard('week') is week
+        assert board.points_of(student_id) == before + 7
+        assert week.points_of(student_id) == week_before + 7
+
+
+# Версия, сдвинутая другим процессом, не пересобирает индекс на каждом чтении
+@pytest.mark.parametrize('window', [None, 'week'])
+def test_foreign_version_rebuilds_after_staleness_threshold(make_app, window):
+    app = make_app({'LEADERBOARD_STALE_SECONDS': 60})
+    load = get_leaderboard if window is None else (lambda: get_window_leaderboard(window))
+    with app.app_context():
+        board = load()
+        get_clock().observe('points', current_version('points') + 1)
+        assert load() is board
+
+        app.config['LEADERBOARD_STALE_SECONDS'] = 0
+        rebuilt = load()
+        assert rebuilt is not board and rebuilt.version == current_version('points')
@@ -0,0 +1,45 @@
+import sys
+import types
+
+from app import db
+from app.models import User
+
+
+def test_sse_is_off_without_async_workers(app):
+    client = app.test_client()
+    assert client.get('/events/leaderboard').status_code == 404
+    page = client.get('/top_users').text
+    assert 'EventSource' not in page and 'If-None-Match' in page
+
+
+def test_sse_when_enabled(make_app):
+    app = make_app({'SSE_ENABLED': True})
+    page = app.test_client().get('/top_users').text
+    assert 'EventSource' in page
+
+
+# Под gevent SSE включается без настройки, а явный SSE_ENABLED=False сильнее
+def test_sse_follows_gevent_workers(make_app, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'gevent.monkey',
+                        types.SimpleNamespace(is_module_patched=lambda name: name == 'socket'))
+    assert 'EventSource' in make_app().test_client().get('/top_users').text
+    assert 'EventSource' not in make_app({'SSE_ENABLED': False}).test_client().get('/top_users').text
+
+
+def test_grid_poll_answers_304_until_a_cell_changes(app, login):
+    with app.app_context():
+        student_id = db.session.query(User.id).filter_by(role='student').order_by(User.id).limit(1).scalar()
+    client = login(app, 'teacher')
+    url = '/weekly_performance?date=2026-09-07&format=json'
+
+    first = client.get(url)
+    assert first.status_code == 200 and first.json['week_start'] == '2026-09-07'
+    etag = first.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    client.post('/update_weekly_performance_batch', json={
+        'week_start': '2026-09-07', 'edits': [{'student_id': student_id, 'field': 'teamwork', 'value': 1}]
+    })
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert {row['student_id']: row['teamwork'] for row in changed.json['rows']}[student_id] == 1
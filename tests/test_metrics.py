@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.metrics import Histogram, _parameter_shape
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('app_test_seconds', 'Test', ('endpoint',), (0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(('main.index',), value)
+    lines = histogram.render()
+    assert lines[:2] == ['# HELP app_test_seconds Test', '# TYPE app_test_seconds histogram']
+    assert lines[2:] == [
+        'app_test_seconds_bucket{endpoint="main.index",le="0.1"} 2',
+        'app_test_seconds_bucket{endpoint="main.index",le="1"} 3',
+        'app_test_seconds_bucket{endpoint="main.index",le="+Inf"} 4',
+        'app_test_seconds_sum{endpoint="main.index"} 3.65',
+        'app_test_seconds_count{endpoint="main.index"} 4',
+    ]
+
+
+def test_metrics_endpoint_is_admin_only(app, login):
+    assert app.test_client().get('/metrics').status_code == 401
+    assert login(app, 'student3').get('/metrics').status_code == 403
+
+    client = login(app, 'admin')
+    client.get('/top_users')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.text
+    assert 'app_requests_total{endpoint="main.top_users",method="GET",status="200"} 1' in body
+    assert 'app_request_sql_statements_count{endpoint="main.top_users"} 1' in body
+
+
+@pytest.mark.parametrize('parameters, executemany, shape', [
+    ({'username': 'admin', 'password_hash': 'secret'}, False, '{username: str, password_hash: str}'),
+    (('admin', 5, None), False, '(str, int, NoneType)'),
+    ([('a', 1), ('b', 2)], True, '2 x (str, int)'),
+    ([], True, '[]'),
+])
+def test_parameter_shape_hides_values(parameters, executemany, shape):
+    assert _parameter_shape(parameters, executemany) == shape
+
+
+def test_slow_query_log_keeps_values_out(app, caplog):
+    app.config['SLOW_QUERY_SECONDS'] = 0
+    with app.app_context(), caplog.at_level(logging.WARNING, logger='app.slow_query'):
+        db.session.execute(text('SELECT :secret'), {'secret': 'hunter2'})
+    messages = [record.getMessage() for record in caplog.records]
+    assert any('SELECT ? | params (str)' in message for message in messages)
+    assert not any('hunter2' in message for message in messages)
+
+
+# Упавший запрос не оставляет отметок на соединении и не ломает учёт следующих
+def test_failed_statement_does_not_skew_timing(app, caplog):
+    app.config['SLOW_QUERY_SECONDS'] = 0
+    with app.app_context(), caplog.at_level(logging.WARNING, logger='app.slow_query'):
+        with db.engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM missing_table'))
+            conn.execute(text('SELECT 1'))
+            assert not any(key.startswith('metrics') for key in conn.info)
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 1 and 'SELECT 1' in messages[0]
@@ -0,0 +1,31 @@
+import logging
+
+from sqlalchemy import text
+
+from app import db
+from app.database import site_engine
+from app.migrations import _drop_duplicate_weeks
+
+
+# Дубли недели, оставшиеся от времени без уникального индекса
+def test_duplicate_weeks_keep_the_latest_row_and_log_the_rest(app, caplog):
+    with app.app_context():
+        engine = site_engine(db)
+        with engine.begin() as conn:
+            conn.execute(text('DROP INDEX ux_weekly_performances_user_id_week_start'))
+            conn.execute(text('DELETE FROM weekly_performances'))
+            for mentoring in (1, 2, 0):
+                conn.execute(text(
+                    "INSERT INTO weekly_performances (user_id, week_start, week, year, points, academic_performance, "
+                    "mentoring, teamwork, discipline) VALUES (3, '2026-09-07', 37, 2026, :m, 0, :m, 0, 0)"
+                ), {'m': mentoring})
+
+        with caplog.at_level(logging.WARNING, logger='app.migrations'), engine.begin() as conn:
+            dropped = _drop_duplicate_weeks(conn)
+        with engine.connect() as conn:
+            rows = conn.execute(text('SELECT id, mentoring FROM weekly_performances')).all()
+
+    assert [row.mentoring for row in rows] == [0]
+    assert sorted(row.id for row in dropped) == [rows[0].id - 2, rows[0].id - 1]
+    assert caplog.text.count('dropped duplicate row') == 2
+    assert 'scores 0/2/0/0' in caplog.text
@@ -0,0 +1,51 @@
+import logging
+
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from app import db, loading
+from app.models import User
+from app.nplusone import NPlusOneDetected, statement_shape
+
+
+def _add_lazy_route(app):
+    # Ленивая загрузка в цикле: запрос на каждого пользователя
+    def lazy():
+        users = User.query.order_by(User.id).limit(10).all()
+        return {'transactions': [user.transactions.count() for user in users]}
+    app.add_url_rule('/lazy', 'lazy', lazy)
+
+
+def test_statement_shape_folds_parameters_and_in_lists():
+    assert statement_shape('SELECT * FROM users WHERE id IN (?, ?,  ?) AND role = ?') == \
+        statement_shape('SELECT * FROM users\n WHERE id IN (?) AND role = ?')
+
+
+def test_loop_of_lazy_loads_raises_under_testing(app):
+    _add_lazy_route(app)
+    with pytest.raises(NPlusOneDetected, match='ran 6 times'):
+        app.test_client().get('/lazy')
+
+
+def test_log_mode_only_warns(make_app, caplog):
+    app = make_app({'N_PLUS_ONE': 'log'})
+    _add_lazy_route(app)
+    with caplog.at_level(logging.WARNING, logger='app.nplusone'):
+        response = app.test_client().get('/lazy')
+    assert response.status_code == 200
+    assert 'possible N+1' in caplog.text
+
+
+def test_threshold_is_configurable(make_app):
+    app = make_app({'N_PLUS_ONE_THRESHOLD': 20})
+    _add_lazy_route(app)
+    assert app.test_client().get('/lazy').status_code == 200
+
+
+# Профиль загрузки запрещает связи, которые представление не заказало
+def test_loading_profile_raises_on_unplanned_relationship(app):
+    with app.app_context():
+        user = db.session.query(User).options(*loading.user_list()).filter_by(role='student').first()
+        assert user.full_name
+        with pytest.raises(InvalidRequestError):
+            user.group
@@ -0,0 +1,98 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import Transaction
+from app.pagination import decode_cursor, encode_cursor
+
+
+def _token(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _walk(client, url, direction='next', cursor=None):
+    pages = []
+    while True:
+        query = f'&{"after" if direction == "next" else "before"}={cursor}' if cursor else ''
+        response = client.get(f'{url}{query}')
+        assert response.status_code == 200
+        pages.append([item['id'] for item in response.json['items']])
+        cursor = response.json[direction]
+        if cursor is None:
+            return pages, response.json
+
+
+def test_cursor_round_trip():
+    values = [datetime(2026, 9, 7, 12, 30), 42]
+    assert decode_cursor(encode_cursor(values), [datetime, int]) == values
+
+
+@pytest.mark.parametrize('token', [
+    '!!!', _token('not json'), _token('{"a": 1, "b": 2}'), _token('[1]'), _token('[1, 2, 3]'),
+    _token('["yesterday", 5]'), _token('[null, null]'), _token('[[1], {}]'),
+])
+def test_tampered_cursor_is_ignored(token):
+    assert decode_cursor(token, [datetime, int]) is None
+
+
+# Подделанный курсор даёт первую страницу, а не 500
+@pytest.mark.parametrize('url', ['/transactions?format=json', '/top_users?format=json', '/transactions'])
+@pytest.mark.parametrize('param', ['after', 'before'])
+def test_routes_fall_back_to_first_page(app, login, url, param):
+    client = login(app, 'teacher')
+    first = client.get(url)
+    for token in ('!!!', _token('[1]'), _token('["x", "y"]')):
+        response = client.get(f'{url}&{param}={token}' if '?' in url else f'{url}?{param}={token}')
+        assert response.status_code == 200
+        if url.endswith('json'):
+            assert response.json['items'] == first.json['items']
+
+
+def test_transaction_pages_cover_the_ledger_once(make_app, login):
+    app = make_app(transactions_per_student=10)
+    with app.app_context():
+        expected = [row.id for row in db.session.query(Transaction.id).order_by(
+            Transaction.created_at.desc(), Transaction.id.desc())]
+    client = login(app, 'teacher')
+    pages, last = _walk(client, '/transactions?format=json')
+    assert [item for page in pages for item in page] == expected
+    assert all(len(page) == 20 for page in pages[:-1])
+    assert last['total'] == len(expected)
+
+    # Назад от последней страницы — те же страницы в обратном порядке
+    back, _ = _walk(client, '/transactions?format=json', 'prev', last['prev'])
+    assert back == pages[-2::-1]
+
+
+# Новая запись в журнале не сдвигает уже открытые страницы: курсор привязан к ключу, а не к номеру
+def test_cursor_pages_are_stable_under_inserts(make_app, login):
+    app = make_app(transactions_per_student=10)
+    client = login(app, 'teacher')
+    first = client.get('/transactions?format=json').json
+    second = client.get(f"/transactions?format=json&after={first['next']}").json
+
+    with app.app_context():
+        db.session.add(Transaction(user_id=3, points=1, transaction_type='reward', reason='late'))
+        db.session.commit()
+
+    again = client.get(f"/transactions?format=json&after={first['next']}").json
+    assert again['items'] == second['items']
+    back = client.get(f"/transactions?format=json&before={second['prev']}").json
+    assert [item['id'] for item in back['items']] == [item['id'] for item in first['items']]
+
+
+def test_leaderboard_pages(make_app, login):
+    app = make_app(students_per_group=15)
+    client = login(app, 'teacher')
+    pages, last = _walk(client, '/top_users?format=json')
+    ids = [item for page in pages for item in page]
+    assert len(ids) == len(set(ids)) == last['total']
+    assert len(pages) > 2
+
+    points = [item['points'] for item in client.get('/top_users?format=json').json['items']]
+    assert points == sorted(points, reverse=True)
+    back, _ = _walk(client, '/top_users?format=json', 'prev', last['prev'])
+    assert back == pages[-2::-1]
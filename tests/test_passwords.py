@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from app.passwords import PasswordPool, PoolBusy
+
+
+@pytest.fixture
+def pool():
+    pool = PasswordPool(workers=1, queue_size=3, wait=0.2, batch=1)
+    yield pool
+    pool.executor.shutdown(cancel_futures=True)
+
+
+# Очередь заполнена дольше PASSWORD_POOL_WAIT — вход получает PoolBusy, а не ждёт
+def test_run_raises_pool_busy_when_queue_is_full(pool):
+    futures = [pool._submit(time.sleep, 1) for _ in range(3)]
+    started = time.monotonic()
+    with pytest.raises(PoolBusy):
+        pool.run(abs, -1)
+    assert time.monotonic() - started < 1
+    for future in futures:
+        future.result()
+    assert pool.run(abs, -1) == 1
+
+
+# Пакет занимает не больше batch мест, поэтому вход во время импорта проходит
+def test_batch_leaves_room_for_logins(pool):
+    in_queue = []
+    done = threading.Event()
+
+    def batch():
+        pool.map(time.sleep, [0.05] * 20)
+        done.set()
+
+    thread = threading.Thread(target=batch)
+    thread.start()
+    while not done.is_set():
+        # Свободных мест в очереди: всего 3, пакету доступно только одно
+        in_queue.append(3 - pool.slots._value)
+        assert pool.run(abs, -2) == 2
+    thread.join()
+    assert max(in_queue) <= 1
+
+
+def test_batch_keeps_order():
+    pool = PasswordPool(workers=2, queue_size=8, wait=1, batch=3)
+    try:
+        assert pool.map(abs, range(-10, 0)) == list(range(10, 0, -1))
+    finally:
+        pool.executor.shutdown()
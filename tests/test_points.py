@@ -0,0 +1,78 @@
+import threading
+
+from app import db
+from app.leaderboard import get_leaderboard
+from app.models import Transaction, User
+from app.points import change_points, change_points_many
+
+
+def _set_points(user_id, points):
+    db.session.get(User, user_id).points = points
+    db.session.commit()
+
+
+def _last_delta(user_id):
+    return db.session.query(Transaction.points).filter_by(user_id=user_id).order_by(Transaction.id.desc()).first()[0]
+
+
+# Штраф не уводит баланс ниже нуля, а в журнал попадает фактически снятое
+def test_floor_logs_applied_delta(app):
+    with app.app_context():
+        _set_points(3, 4)
+        row = change_points(3, -10, 'penalty', reason='test', floor=0)
+        db.session.commit()
+        assert row.points == 0
+        assert _last_delta(3) == -4
+        assert get_leaderboard().points_of(3) == 0
+
+        row = change_points(3, -5, 'penalty', reason='test')
+        db.session.commit()
+        assert row.points == -5 and _last_delta(3) == -5
+
+
+def test_floor_applies_per_user_in_batches(app):
+    with app.app_context():
+        _set_points(3, 1)
+        _set_points(4, 10)
+        balances = change_points_many([3, 4], -3, 'penalty', reason='batch', floor=0)
+        db.session.commit()
+        assert balances == {3: 0, 4: 7}
+        assert (_last_delta(3), _last_delta(4)) == (-1, -3)
+
+
+def test_unknown_user_changes_nothing(app):
+    with app.app_context():
+        before = db.session.query(Transaction).count()
+        assert change_points(9999, 5, 'reward') is None
+        db.session.commit()
+        assert db.session.query(Transaction).count() == before
+
+
+# Параллельные начисления не теряют друг друга: UPDATE points = points + delta
+def test_concurrent_changes_are_not_lost(make_app, tmp_path):
+    app = make_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'points.db'}"})
+    with app.app_context():
+        before = db.session.get(User, 3).points
+        logged = db.session.query(Transaction).filter_by(user_id=3).count()
+    errors = []
+
+    def award():
+        try:
+            with app.app_context():
+                for _ in range(5):
+                    change_points(3, 1, 'reward', reason='parallel')
+                    db.session.commit()
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=award) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with app.app_context():
+        assert db.session.get(User, 3).points == before + 20
+        assert db.session.query(Transaction).filter_by(user_id=3).count() == logged + 20
+        assert get_leaderboard().points_of(3) == before + 20
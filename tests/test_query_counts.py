@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+
+import pytest
+
+
+def _monday(weeks_ahead=0):
+    today = date.today()
+    return (today - timedelta(days=today.weekday()) + timedelta(weeks=weeks_ahead)).isoformat()
+
+
+def _grid_queries(app, week, login, count_queries):
+    client = login(app, 'teacher')
+    with count_queries(app) as statements:
+        response = client.get(f'/weekly_performance?date={week}')
+    assert response.status_code == 200
+    return len(statements)
+
+
+# Недельная сетка делает одно и то же число запросов независимо от размера группы:
+# и когда строки недели уже есть, и когда их нужно создать
+@pytest.mark.parametrize('weeks_ahead', [0, 4])
+def test_weekly_grid_query_count_does_not_depend_on_students(make_app, weeks_ahead, login, count_queries):
+    week = _monday(weeks_ahead)
+    small = _grid_queries(make_app(groups=1, students_per_group=5), week, login, count_queries)
+    large = _grid_queries(make_app(groups=1, students_per_group=50), week, login, count_queries)
+    assert small == large
+    assert large <= 6, large
@@ -0,0 +1,34 @@
+from app.query_plans import check_routes, full_scans
+
+
+def _format(problems):
+    return '\n'.join(f'{route}: {tables} {statement}\n  {plan}' for route, statement, tables, plan in problems)
+
+
+# Горячие маршруты не читают большие таблицы целиком (то же, что flask check-query-plans)
+def test_hot_routes_use_indexes(make_app):
+    app = make_app(groups=4, students_per_group=20, transactions_per_student=5)
+    problems = check_routes(app)
+    assert not problems, _format(problems)
+
+
+def test_full_scans_only_reports_hot_tables():
+    plan = ['SCAN users', 'SCAN groups', 'SEARCH transactions USING INDEX ix_transactions_user_id_created_at (user_id=?)']
+    assert full_scans('sqlite', plan) == ['users']
+    assert full_scans('postgresql', ['Seq Scan on transactions', 'Seq Scan on groups']) == ['transactions']
+
+
+# Проход в порядке индекса без условия поиска читает всю таблицу
+def test_full_scans_reports_index_order_scans():
+    plan = ['SCAN users USING COVERING INDEX ix_users_role_points',
+            'SCAN weekly_performances USING INDEX ux_weekly_performances_user_id_week_start',
+            'SCAN daily_points USING INDEX ux_daily_points_user_id_day',
+            'SEARCH daily_points USING COVERING INDEX ix_daily_points_day_user_id (day>?)']
+    assert full_scans('sqlite', plan) == ['daily_points', 'users', 'weekly_performances']
+
+
+# Страница журнала в порядке индекса под LIMIT читает только LIMIT строк
+def test_full_scans_allows_index_order_scan_under_limit():
+    plan = ['SCAN transactions USING INDEX ix_transactions_created_at', 'SCAN users']
+    assert full_scans('sqlite', plan, limited=True) == ['users']
+    assert full_scans('sqlite', plan) == ['transactions', 'users']
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import func, select, update
+
+from app import db
+from app.models import Transaction, User
+from app.reconcile import ADJUSTMENT_TYPE, reconcile
+
+
+def _ledger(user_id):
+    return db.session.execute(
+        select(func.coalesce(func.sum(Transaction.points), 0)).where(Transaction.user_id == user_id)
+    ).scalar()
+
+
+# Балансы, разошедшиеся с журналом мимо app.points: +5 у одного, -2 у другого
+def _drift(app):
+    with app.app_context():
+        assert not reconcile().drifts
+        ids = db.session.execute(select(User.id).where(User.role == 'student').order_by(User.id)).scalars().all()
+        drifted = {ids[0]: 5, ids[-1]: -2}
+        for user_id, delta in drifted.items():
+            db.session.execute(update(User).where(User.id == user_id).values(points=User.points + delta))
+        db.session.commit()
+        return drifted
+
+
+# Маленькие пачки: расхождения находятся и на границах диапазонов id
+@pytest.mark.parametrize('chunk_size', [1, 3, 5000])
+def test_report_finds_drift_in_every_chunk(app, chunk_size):
+    drifted = _drift(app)
+    with app.app_context():
+        report = reconcile(chunk_size=chunk_size)
+        assert report.users == db.session.query(User).count()
+        assert {drift.user_id: drift.delta for drift in report.drifts} == drifted
+        assert report.total_delta == 3 and report.repaired == 0
+        # Отчёт ничего не меняет
+        assert len(reconcile(chunk_size=chunk_size).drifts) == 2
+
+
+def test_repair_points_sets_balance_to_ledger(app):
+    drifted = _drift(app)
+    with app.app_context():
+        transactions = db.session.query(Transaction).count()
+        report = reconcile(repair='points', chunk_size=3)
+        assert report.repaired == 2
+        for user_id in drifted:
+            assert db.session.get(User, user_id).points == _ledger(user_id)
+        assert db.session.query(Transaction).count() == transactions
+        assert not reconcile().drifts
+
+
+def test_repair_ledger_writes_adjustments(app):
+    drifted = _drift(app)
+    with app.app_context():
+        balances = {user_id: db.session.get(User, user_id).points for user_id in drifted}
+        report = reconcile(repair='ledger', chunk_size=3, awarded_by_id=2)
+        assert report.repaired == 2
+        adjustments = dict(db.session.execute(
+            select(Transaction.user_id, Transaction.points).where(Transaction.transaction_type == ADJUSTMENT_TYPE)
+        ).all())
+        assert adjustments == drifted
+        assert {user_id: db.session.get(User, user_id).points for user_id in drifted} == balances
+        assert not reconcile().drifts
@@ -0,0 +1,86 @@
+import shutil
+
+import pytest
+from flask import g
+from sqlalchemy import event, select, update
+
+from app import db
+from app.models import Transaction, User
+
+
+# Основная база и реплика — два файла SQLite; реплика — копия после генерации данных
+@pytest.fixture
+def replica_app(make_app, tmp_path):
+    primary, replica = tmp_path / 'primary.db', tmp_path / 'replica.db'
+    app = make_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{primary}',
+        'SQLALCHEMY_BINDS': {'replica': f'sqlite:///{replica}'},
+    })
+    with app.app_context():
+        db.engine.dispose()
+    shutil.copy(primary, replica)
+    return app
+
+
+@pytest.fixture
+def routed(replica_app):
+    engines = {}
+    with replica_app.app_context():
+        engines = {'primary': db.engine, 'replica': db.engines['replica']}
+    seen = []
+    listeners = []
+    for name, engine in engines.items():
+        def record(conn, cursor, statement, parameters, context, executemany, name=name):
+            seen.append((name, statement.split()[0].upper()))
+        event.listen(engine, 'before_cursor_execute', record)
+        listeners.append((engine, record))
+    yield seen
+    for engine, record in listeners:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def test_read_only_route_reads_from_replica(replica_app, login, routed):
+    client = login(replica_app, 'teacher')
+    routed.clear()
+    assert client.get('/transactions?format=json').status_code == 200
+    # Пользователь загружается до входа в маршрут (login_required снаружи read_only),
+    # всё остальное читается с реплики
+    assert routed[1:] and {name for name, _ in routed[1:]} == {'replica'}
+
+    routed.clear()
+    assert client.get('/award').status_code == 200
+    assert {name for name, _ in routed} == {'primary'}
+
+
+def test_flush_and_writes_go_to_primary(replica_app, routed):
+    with replica_app.test_request_context():
+        g.read_only_db = True
+        assert db.session.execute(select(User.points).where(User.id == 3)).scalar() is not None
+        assert routed[-1] == ('replica', 'SELECT')
+
+        db.session.add(Transaction(user_id=3, points=1, transaction_type='reward', reason='replica test'))
+        db.session.flush()
+        assert ('primary', 'INSERT') in routed
+        assert ('replica', 'INSERT') not in routed
+
+        # После записи чтения этой транзакции видят её — они идут в основную базу
+        routed.clear()
+        count = db.session.query(Transaction).filter_by(reason='replica test').count()
+        assert count == 1 and {name for name, _ in routed} == {'primary'}
+        db.session.commit()
+
+        # Новая транзакция снова читает с реплики
+        routed.clear()
+        db.session.execute(select(User.id).limit(1)).all()
+        assert {name for name, _ in routed} == {'replica'}
+        db.session.rollback()
+
+
+def test_core_update_sticks_to_primary(replica_app, routed):
+    with replica_app.test_request_context():
+        g.read_only_db = True
+        db.session.execute(update(User).where(User.id == 3).values(points=User.points + 1))
+        routed.clear()
+        db.session.execute(select(User.points).where(User.id == 3)).scalar()
+        assert {name for name, _ in routed} == {'primary'}
+        db.session.rollback()
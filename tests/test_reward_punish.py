@@ -0,0 +1,58 @@
+from sqlalchemy import func
+
+from app import db
+from app.models import Competition, Group, Transaction, User
+
+
+def _form(**extra):
+    form = {'competition_name': 'Olympiad', 'project_name': '', 'level': '2', 'quality': '1',
+            'place': '3', 'comment': 'cohort'}
+    form.update(extra)
+    return form
+
+
+def _balances(app):
+    with app.app_context():
+        return dict(db.session.query(User.id, User.points).filter_by(role='student'))
+
+
+# Группа целиком и отмеченные вручную ученики: каждый получает награду один раз
+def test_cohort_award_totals(app, login):
+    with app.app_context():
+        group_id = db.session.query(Group.id).order_by(Group.id).first()[0]
+        in_group = {user_id for user_id, in db.session.query(User.id).filter_by(role='student', group_id=group_id)}
+        outsider = db.session.query(User.id).filter(User.role == 'student', User.group_id != group_id).first()[0]
+        teacher_id = db.session.query(User.id).filter_by(username='teacher').scalar()
+    before = _balances(app)
+
+    response = login(app, 'teacher').post('/reward_punish', data=_form(
+        award_group_ids=[str(group_id)],
+        selected_students=[str(next(iter(in_group))), str(outsider), str(teacher_id)],
+    ))
+    assert response.status_code == 302
+
+    awarded = in_group | {outsider}
+    after = _balances(app)
+    assert {user_id for user_id in after if after[user_id] != before[user_id]} == awarded
+    assert all(after[user_id] - before[user_id] == 6 for user_id in awarded)
+    with app.app_context():
+        competitions = dict(db.session.query(Competition.user_id, func.count()).filter_by(name='Olympiad')
+                            .group_by(Competition.user_id))
+        assert competitions == {user_id: 1 for user_id in awarded}
+        logged = db.session.query(func.count(Transaction.id), func.sum(Transaction.points)).filter_by(
+            reason='Участие в конкурсе: Olympiad').one()
+        assert tuple(logged) == (len(awarded), 6 * len(awarded))
+
+
+# Число запросов не зависит от размера когорты
+def test_cohort_award_is_set_based(make_app, login, count_queries):
+    counts = []
+    for students_per_group in (3, 30):
+        app = make_app(students_per_group=students_per_group)
+        client = login(app, 'teacher')
+        with app.app_context():
+            group_ids = [str(group_id) for group_id, in db.session.query(Group.id)]
+        with count_queries(app) as statements:
+            assert client.post('/reward_punish', data=_form(award_group_ids=group_ids)).status_code == 302
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
@@ -0,0 +1,101 @@
+import logging
+
+from app import db
+from app.bootstrap import bootstrap
+from app.database import use_site
+from app.models import User
+from app.passwords import hash_password, verify_password
+
+
+def _sites(tmp_path, **north):
+    return {'SITES': {
+        'north': dict({'url': f"sqlite:///{tmp_path / 'north.db'}", 'prefix': '/north'}, **north),
+        'south': {'url': f"sqlite:///{tmp_path / 'south.db'}", 'prefix': '/south'},
+    }}
+
+
+def _admin_hash(app, site):
+    with use_site(app, site):
+        return db.session.query(User.password_hash).filter_by(username='admin').scalar()
+
+
+def test_bootstrap_gives_each_site_its_own_admin_password(make_app, tmp_path, capsys, caplog):
+    app = make_app(_sites(tmp_path, admin_password='north-secret'))
+    with caplog.at_level(logging.WARNING):
+        for site in ('north', 'south'):
+            with use_site(app, site):
+                bootstrap()
+
+    # Сгенерированный пароль печатается один раз и не попадает в журнал
+    printed = [line for line in capsys.readouterr().out.splitlines() if 'Created user admin' in line]
+    assert len(printed) == 1 and printed[0].startswith('[south]')
+    generated = printed[0].rsplit(' ', 1)[1]
+    assert not any(generated in record.getMessage() for record in caplog.records)
+
+    south = _admin_hash(app, 'south')
+    with app.app_context():
+        assert verify_password(_admin_hash(app, 'north'), 'north-secret')
+        assert not verify_password(south, 'admin')
+        assert verify_password(south, generated)
+
+
+def test_site_report_and_remember_cookie_are_per_site(make_app, tmp_path):
+    app = make_app(_sites(tmp_path, admin_password='north-secret'))
+    with use_site(app, 'north'):
+        bootstrap()
+
+    north = app.test_client()
+    response = north.post('/north/login', data={'username': 'admin', 'password': 'north-secret'})
+    assert response.status_code == 302
+    cookies = {cookie.key for cookie in north._cookies.values()}
+    assert 'remember_token_north' in cookies and 'remember_token' not in cookies
+    # Администратор кампуса не видит чужие базы
+    assert north.get('/north/admin/sites').status_code == 403
+
+    default = app.test_client()
+    default.post('/login', data={'username': 'admin', 'password': 'password'})
+    assert default.get('/admin/sites?format=json').status_code == 200
+
+
+# Cookie «запомнить меня» одной площадки не входит в другую, даже если id совпадают
+def test_remember_cookie_does_not_cross_sites(make_app, tmp_path):
+    app = make_app(_sites(tmp_path, admin_password='north-secret'))
+    with use_site(app, 'north'):
+        bootstrap()
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'password'})
+    remember = client.get_cookie('remember_token').value
+    client.delete_cookie('session')
+
+    fresh = app.test_client()
+    fresh.set_cookie('remember_token', remember)
+    assert fresh.get('/points').status_code == 200
+    assert fresh.get('/north/points').status_code in (302, 401)
+    fresh.set_cookie('remember_token_north', remember)
+    assert fresh.get('/north/points').status_code in (302, 401)
+
+
+def test_data_written_on_one_site_is_not_visible_on_another(make_app, tmp_path):
+    app = make_app(_sites(tmp_path, admin_password='north-secret'))
+    for site in ('north', 'south'):
+        with use_site(app, site):
+            bootstrap()
+    with use_site(app, 'north'):
+        db.session.add(User(username='northerner', full_name='Only North', email='north@example.com',
+                            password_hash=hash_password('north-pass'), role='student', points=7,
+                            is_confirmed=True))
+        db.session.commit()
+
+    with use_site(app, 'south'):
+        assert db.session.query(User.id).filter_by(username='northerner').first() is None
+    with app.app_context():
+        assert db.session.query(User.id).filter_by(username='northerner').first() is None
+
+    client = app.test_client()
+    assert client.post('/south/login', data={'username': 'northerner', 'password': 'north-pass'}).status_code == 200
+    assert client.post('/login', data={'username': 'northerner', 'password': 'north-pass'}).status_code == 200
+    assert client.post('/north/login', data={'username': 'northerner', 'password': 'north-pass'}).status_code == 302
+    # Рейтинг площадки строится из её базы
+    response = client.get('/north/top_users?format=json')
+    assert [item['full_name'] for item in response.json['items']] == ['Only North', 'Administrator']
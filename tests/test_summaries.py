@@ -0,0 +1,14 @@
+from app import db
+from app.models import WeeklyPerformance
+from app.summaries import _keys, academic_year
+
+
+# Запись отвязали от ученика: пересчитываются только итоги прежнего владельца
+def test_keys_without_user_keep_only_the_old_pair(app):
+    with app.app_context():
+        row = WeeklyPerformance.query.first()
+        user_id, year = row.user_id, academic_year(row.week_start)
+        row.user_id = None
+        assert _keys(row) == set()
+        assert _keys(row, True) == {(user_id, year)}
+        db.session.rollback()
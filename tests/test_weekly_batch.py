@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+
+from app import db
+from app.models import User, WeeklyPerformance
+
+
+def _student_id(app):
+    with app.app_context():
+        return db.session.query(User.id).filter_by(role='student').order_by(User.id).limit(1).scalar()
+
+
+def _post(client, week_start, edits):
+    return client.post('/update_weekly_performance_batch', json={'week_start': week_start, 'edits': edits})
+
+
+def test_batch_normalizes_week_start_to_monday(app, login):
+    student_id = _student_id(app)
+    monday = date(2026, 9, 7)
+    response = _post(login(app, 'teacher'), (monday + timedelta(days=3)).isoformat(),
+                     [{'student_id': student_id, 'field': 'mentoring', 'value': 2}])
+    assert response.status_code == 200, response.text
+    with app.app_context():
+        rows = WeeklyPerformance.query.filter_by(user_id=student_id).filter(
+            WeeklyPerformance.week_start >= monday, WeeklyPerformance.week_start < monday + timedelta(days=7)
+        ).all()
+        assert [(row.week_start, row.mentoring) for row in rows] == [(monday, 2)]
+
+
+def test_batch_rejects_values_out_of_range(app, login):
+    student_id = _student_id(app)
+    client = login(app, 'teacher')
+    for field, value in (('teamwork', 2), ('academic_performance', 3), ('discipline', -1)):
+        response = _post(client, '2026-09-07', [{'student_id': student_id, 'field': field, 'value': value}])
+        assert response.status_code == 400, (field, value)
+    with app.app_context():
+        assert WeeklyPerformance.query.filter_by(user_id=student_id, week_start=date(2026, 9, 7)).count() == 0
+
+
+# Запись недели вставил параллельный запрос уже после того, как мы решили её
+# создавать: вставка пропускается, правка ложится поверх чужой записи
+def test_edits_merge_into_row_inserted_concurrently(app, login):
+    student_id = _student_id(app)
+    monday = date(2026, 9, 14)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(WeeklyPerformance.__table__.insert(), dict(
+                user_id=student_id, week_start=monday, week=38, year=2026, points=2,
+                academic_performance=0, mentoring=2, teamwork=0, discipline=0
+            ))
+    response = _post(login(app, 'teacher'), monday.isoformat(),
+                     [{'student_id': student_id, 'field': 'teamwork', 'value': 1}])
+    assert response.status_code == 200, response.text
+    assert response.json['rows'][0]['points'] == 3
+    with app.app_context():
+        rows = WeeklyPerformance.query.filter_by(user_id=student_id, week_start=monday).all()
+        assert [(row.mentoring, row.teamwork, row.points) for row in rows] == [(2, 1, 3)]
+
+
+def test_legacy_update_validates_field_and_range(app, login):
+    student_id = _student_id(app)
+    client = login(app, 'teacher')
+    for field, value in (('points', 1), ('password_hash', 0), ('teamwork', 2), ('mentoring', -1)):
+        response = client.post('/update_weekly_performance', json={
+            'student_id': student_id, 'field': field, 'value': value, 'week_start': '2026-09-21'
+        })
+        assert response.status_code == 400, (field, value)
+    assert client.post('/update_weekly_performance', json={'field': 'teamwork'}).status_code == 400
+
+    response = client.post('/update_weekly_performance', json={
+        'student_id': student_id, 'field': 'mentoring', 'value': 1, 'week_start': '2026-09-23'
+    })
+    assert response.status_code == 200, response.text
+    assert response.json['points'] == 1
+    with app.app_context():
+        rows = WeeklyPerformance.query.filter_by(user_id=student_id).filter(
+            WeeklyPerformance.week_start >= date(2026, 9, 21), WeeklyPerformance.week_start < date(2026, 9, 28)
+        ).all()
+        assert [(row.week_start, row.mentoring) for row in rows] == [(date(2026, 9, 21), 1)]